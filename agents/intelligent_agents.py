@@ -1,76 +1,273 @@
 import json
 import os
+import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import threading
+from string import Template
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Any
 import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 
+import orjson
 from google.cloud import pubsub_v1
 from google.cloud import bigquery
+from google.cloud import bigquery_storage
 from google.cloud import firestore
 from google.cloud import storage
 import vertexai
-from vertexai.generative_models import GenerativeModel
+from vertexai.generative_models import GenerationConfig, GenerativeModel
 from vertexai.language_models import TextEmbeddingModel
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Number of agent tasks processed concurrently by the orchestrator. Tasks
+# spend nearly all their time waiting on BigQuery and Vertex AI, so this
+# can be raised well past the CPU count
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "32"))
+
+# Model used by agents whose LLM calls are not latency critical
+DEFAULT_LLM_MODEL = "gemini-1.5-pro"
+
+# Low time-to-first-token model for the notification and summary paths
+FAST_LLM_MODEL = "gemini-1.5-flash"
+
+# How long a generated LLM response may be served from the Firestore cache
+LLM_CACHE_TTL = timedelta(hours=1)
+
+# Google Cloud clients shared by every agent in the process, so that all
+# agents multiplex one set of channels and one publisher batch queue
+_shared_clients: Dict[tuple, Any] = {}
+_shared_clients_lock = threading.Lock()
+
+def shared_client(kind: str, project_id: str, factory: Callable[[], Any]) -> Any:
+    """Return the process-wide client of the given kind, creating it on first use"""
+    with _shared_clients_lock:
+        key = (kind, project_id)
+        if key not in _shared_clients:
+            _shared_clients[key] = factory()
+        return _shared_clients[key]
+
+def create_publisher() -> pubsub_v1.PublisherClient:
+    """Create a publisher that batches messages before sending
+    
+    Publishing blocks once too many messages are waiting on the server,
+    so a slow Pub/Sub backend throttles agents instead of growing memory.
+    """
+    return pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(
+            max_messages=100,
+            max_bytes=1_000_000,
+            max_latency=0.05,
+        ),
+        publisher_options=pubsub_v1.types.PublisherOptions(
+            flow_control=pubsub_v1.types.PublishFlowControl(
+                message_limit=1000,
+                byte_limit=10 * 1024 * 1024,
+                limit_exceeded_behavior=pubsub_v1.types.LimitExceededBehavior.BLOCK,
+            )
+        )
+    )
+
+_json_decoder = json.JSONDecoder()
+
+def parse_llm_json(text: str) -> Any:
+    """Parse JSON emitted by the LLM, tolerating raw control characters in strings"""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text, strict=False)
+
+def extract_json_value(partial_text: str, key: str) -> Optional[Any]:
+    """Return the value of a top-level key from partially streamed JSON, or None if incomplete"""
+    key_pos = partial_text.find(f'"{key}"')
+    if key_pos == -1:
+        return None
+    colon_pos = partial_text.find(':', key_pos + len(key) + 2)
+    if colon_pos == -1:
+        return None
+    value_pos = colon_pos + 1
+    while value_pos < len(partial_text) and partial_text[value_pos].isspace():
+        value_pos += 1
+    try:
+        value, _ = _json_decoder.raw_decode(partial_text, value_pos)
+    except ValueError:
+        return None
+    return value
+
 class BaseAgent(ABC):
     """Base class for all intelligent agents"""
     
-    def __init__(self, project_id: str, agent_name: str):
+    def __init__(self, project_id: str, agent_name: str, model_name: str = DEFAULT_LLM_MODEL):
         self.project_id = project_id
         self.agent_name = agent_name
-        self.bq_client = bigquery.Client(project=project_id)
-        self.firestore_client = firestore.Client(project=project_id)
-        self.publisher = pubsub_v1.PublisherClient()
+        self.bq_client = shared_client("bigquery", project_id, lambda: bigquery.Client(
+            project=project_id,
+            default_job_creation_mode="JOB_CREATION_OPTIONAL"
+        ))
+        self.bqstorage_client = shared_client("bigquery_storage", project_id, bigquery_storage.BigQueryReadClient)
+        self.firestore_client = shared_client("firestore", project_id, lambda: firestore.Client(project=project_id))
+        self.publisher = shared_client("publisher", project_id, create_publisher)
         
         # Initialize Vertex AI
         vertexai.init(project=project_id, location="asia-south1")
-        self.llm_model = GenerativeModel("gemini-1.5-pro")
+        self.llm_model = GenerativeModel(model_name)
         
         # Topic paths
         self.notification_topic = self.publisher.topic_path(project_id, "notification-stream")
         self.analytics_topic = self.publisher.topic_path(project_id, "analytics-stream")
         
+        self.task_handlers = self._build_task_handlers()
+        
     @abstractmethod
+    def _build_task_handlers(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        """Map each task type this agent handles to its bound handler"""
+        pass
+    
     def process_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process a specific task"""
-        pass
+        task_type = task_data.get("task_type")
+        handler = self.task_handlers.get(task_type)
+        if handler is None:
+            logger.warning(f"Unknown {self.agent_name} task type: {task_type}")
+            return {"status": "error", "message": "Unknown task type"}
+        return handler(task_data)
+    
+    def submit_query(self, sql: str, params: Optional[List[Any]] = None) -> bigquery.QueryJob:
+        """Start a BigQuery job without waiting for it to finish"""
+        job_config = bigquery.QueryJobConfig(query_parameters=params or [], use_query_cache=True)
+        return self.bq_client.query(sql, job_config=job_config, job_id_prefix=f"{self.agent_name}_")
+    
+    def run_query(self, sql: str, params: Optional[List[Any]] = None) -> List[bigquery.Row]:
+        """Run a short query and wait for its rows
+        
+        Small queries run in short query mode, which skips creating a job
+        and returns rows with the response instead of after job polling.
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params or [], use_query_cache=True)
+        return list(self.bq_client.query_and_wait(sql, job_config=job_config))
+    
+    def fetch_rows(self, job: bigquery.QueryJob) -> List[Dict[str, Any]]:
+        """Wait for a job and download its rows as columnar Arrow via the Storage Read API"""
+        table = job.result().to_arrow(bqstorage_client=self.bqstorage_client)
+        return table.to_pylist()
+    
+    def generate_json(self, prompt: str, response_schema: Dict[str, Any],
+                      on_partial: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Generate a JSON response, reusing a cached one for an identical prompt
+        
+        Decoding is constrained to response_schema, so the text is always
+        bare JSON. When on_partial is given the response is streamed and the
+        callback receives the accumulated text after every chunk.
+        """
+        cache_key = hashlib.sha256(f"{self.agent_name}:{prompt}".encode('utf-8')).hexdigest()
+        cache_ref = self.firestore_client.collection('llm_response_cache').document(cache_key)
+        
+        cached = cache_ref.get()
+        if cached.exists and cached.get('expires_at') > datetime.now(timezone.utc):
+            return cached.get('response')
+        
+        generation_config = GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=response_schema
+        )
+        if on_partial:
+            text = ""
+            for chunk in self.llm_model.generate_content(prompt, generation_config=generation_config, stream=True):
+                text += chunk.text
+                on_partial(text)
+        else:
+            text = self.llm_model.generate_content(prompt, generation_config=generation_config).text
+        response = parse_llm_json(text)
+        
+        # expires_at doubles as the Firestore TTL policy field
+        cache_ref.set({
+            "agent_name": self.agent_name,
+            "response": response,
+            "expires_at": datetime.now(timezone.utc) + LLM_CACHE_TTL
+        })
+        return response
+    
+    def publish_event(self, topic: str, data: Dict[str, Any]):
+        """Publish an event without blocking on the server confirm"""
+        future = self.publisher.publish(topic, orjson.dumps(data))
+        future.add_done_callback(self._log_publish_failure)
+        return future
     
-    def log_agent_activity(self, task_id: str, status: str, details: Dict[str, Any]):
-        """Log agent activity to Firestore"""
+    def _log_publish_failure(self, future):
+        """Log publishes that the server rejected"""
+        error = future.exception()
+        if error:
+            logger.error(f"{self.agent_name} failed to publish event: {error}")
+    
+    def log_agent_activity(self, task_id: str, status: str, details: Dict[str, Any],
+                           batch: Optional[firestore.WriteBatch] = None):
+        """Log agent activity to Firestore, as part of batch when one is given"""
         activity_ref = self.firestore_client.collection('agent_activities').document()
-        activity_ref.set({
+        activity = {
             "agent_name": self.agent_name,
             "task_id": task_id,
             "status": status,
             "details": details,
             "timestamp": firestore.SERVER_TIMESTAMP
-        })
+        }
+        if batch is not None:
+            batch.set(activity_ref, activity)
+        else:
+            activity_ref.set(activity)
 
 class NotificationAgent(BaseAgent):
     """Agent for handling notifications and alerts"""
     
+    NOTIFICATION_PROMPT = """
+    Generate a concise emergency notification for a {severity_level} severity {event_type} incident:
+    
+    Location: {location_name} (Ward {ward_number})
+    Description: {description}
+    Priority Score: {priority_score}/10
+    Estimated Duration: {estimated_duration}
+    
+    Create notifications for:
+    1. Emergency responders (urgent, actionable)
+    2. Affected departments: {departments}
+    3. Citizens in the area (informative, safety-focused)
+    """
+    
+    NOTIFICATION_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "emergency_responders": {"type": "string"},
+            "departments": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "department": {"type": "string"},
+                        "message": {"type": "string"}
+                    },
+                    "required": ["department", "message"]
+                }
+            },
+            "citizens": {"type": "string"}
+        },
+        "required": ["emergency_responders", "departments", "citizens"],
+        # Responders come first, so their alert can go out while the rest streams
+        "propertyOrdering": ["emergency_responders", "departments", "citizens"]
+    }
+    
     def __init__(self, project_id: str):
-        super().__init__(project_id, "notification_agent")
-        
-    def process_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process notification tasks"""
-        task_type = task_data.get("task_type")
-        
-        if task_type == "notification_blast":
-            return self._send_notification_blast(task_data)
-        elif task_type == "department_alert":
-            return self._send_department_alert(task_data)
-        elif task_type == "citizen_update":
-            return self._send_citizen_update(task_data)
-        else:
-            logger.warning(f"Unknown notification task type: {task_type}")
-            return {"status": "error", "message": "Unknown task type"}
+        super().__init__(project_id, "notification_agent", FAST_LLM_MODEL)
+        
+    def _build_task_handlers(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        """Map notification task types to their handlers"""
+        return {
+            "notification_blast": self._send_notification_blast,
+            "department_alert": self._send_department_alert,
+            "citizen_update": self._send_citizen_update
+        }
     
     def _send_notification_blast(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send high-priority notification blast"""
@@ -78,77 +275,102 @@ class NotificationAgent(BaseAgent):
         departments = task_data.get("departments", [])
         radius_km = task_data.get("radius_km", 2.0)
         
-        # Get incident details
-        incident_query = f"""
-            SELECT * FROM `{self.project_id}.bengaluru_events.real_time_incidents`
-            WHERE id = '{incident_id}'
-            LIMIT 1
-        """
-        
-        incident_result = list(self.bq_client.query(incident_query).result())
-        if not incident_result:
-            return {"status": "error", "message": "Incident not found"}
-        
-        incident = dict(incident_result[0])
-        
-        # Find nearby stakeholders
-        nearby_query = f"""
-            SELECT DISTINCT assigned_department, area_category, ward_number
-            FROM `{self.project_id}.bengaluru_events.real_time_incidents`
-            WHERE ST_DWITHIN(
-                ST_GEOGPOINT(longitude, latitude),
-                ST_GEOGPOINT({incident['longitude']}, {incident['latitude']}),
-                {radius_km * 1000}
+        # Get incident details and nearby stakeholders in a single job
+        blast_query = f"""
+            WITH incident AS (
+                SELECT id, coordinates[OFFSET(1)] AS longitude, coordinates[OFFSET(0)] AS latitude,
+                    severity_level, event_type, location_name,
+                    ward_number, description, priority_score, estimated_duration
+                FROM `{self.project_id}.bengaluru_events.real_time_incidents`
+                WHERE id = @incident_id
+                LIMIT 1
+            ),
+            nearby AS (
+                SELECT DISTINCT n.assigned_department, n.area_category, n.ward_number
+                FROM `{self.project_id}.bengaluru_events.stakeholder_cells` n, incident
+                WHERE n.day >= TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY), DAY)
+                AND ST_DWITHIN(
+                    ST_GEOGPOINTFROMGEOHASH(n.geohash),
+                    ST_GEOGPOINT(incident.longitude, incident.latitude),
+                    @radius_m
+                )
             )
-            AND timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)
+            SELECT incident.*, ARRAY(SELECT AS STRUCT * FROM nearby) AS nearby_stakeholders
+            FROM incident
         """
         
-        nearby_stakeholders = list(self.bq_client.query(nearby_query).result())
+        blast_result = self.run_query(blast_query, [
+            bigquery.ScalarQueryParameter("incident_id", "STRING", incident_id),
+            bigquery.ScalarQueryParameter("radius_m", "FLOAT64", radius_km * 1000),
+        ])
+        if not blast_result:
+            return {"status": "error", "message": "Incident not found"}
         
-        # Generate notification content using AI
-        notification_prompt = f"""
-        Generate a concise emergency notification for a {incident['severity_level']} severity {incident['event_type']} incident:
+        incident = blast_result[0]
+        nearby_stakeholders = incident.nearby_stakeholders
+        
+        incident_fields = {
+            "severity_level": incident.severity_level,
+            "event_type": incident.event_type,
+            "location_name": incident.location_name,
+            "ward_number": incident.ward_number,
+            "description": incident.description,
+            "priority_score": incident.priority_score,
+            "estimated_duration": incident.estimated_duration or 'Unknown',
+            "departments": ', '.join(departments)
+        }
         
-        Location: {incident['location_name']} (Ward {incident['ward_number']})
-        Description: {incident['description']}
-        Priority Score: {incident['priority_score']}/10
-        Estimated Duration: {incident.get('estimated_duration', 'Unknown')}
+        responders_sent = False
         
-        Create notifications for:
-        1. Emergency responders (urgent, actionable)
-        2. Affected departments: {', '.join(departments)}
-        3. Citizens in the area (informative, safety-focused)
-        
-        Format as JSON with keys: emergency_responders, departments, citizens
-        """
+        def publish_responders_early(partial_text: str):
+            # Responders get their alert as soon as that key is complete,
+            # without waiting for the department and citizen messages
+            nonlocal responders_sent
+            if responders_sent:
+                return
+            responders = extract_json_value(partial_text, "emergency_responders")
+            if responders is not None:
+                responders_sent = True
+                self._publish_responders_alert(incident_id, responders)
         
         try:
-            ai_response = self.llm_model.generate_content(notification_prompt)
-            notifications = json.loads(ai_response.text)
+            # Known event type and severity pairs are served from a stored
+            # template; only novel combinations go to the LLM
+            notifications = self._render_notification_template(incident_fields, departments)
+            if notifications is not None:
+                self._publish_responders_alert(incident_id, notifications["emergency_responders"])
+            else:
+                notifications = self.generate_json(
+                    self.NOTIFICATION_PROMPT.format_map(incident_fields),
+                    self.NOTIFICATION_SCHEMA,
+                    on_partial=publish_responders_early
+                )
+                # Cached responses are returned without streaming
+                if not responders_sent:
+                    self._publish_responders_alert(incident_id, notifications["emergency_responders"])
             
             # Send notifications
             notification_data = {
                 "type": "emergency_blast",
                 "incident_id": incident_id,
                 "notifications": notifications,
-                "stakeholders": [dict(s) for s in nearby_stakeholders],
+                "stakeholders": nearby_stakeholders,
                 "timestamp": datetime.utcnow().isoformat()
             }
             
             # Publish to notification stream
-            self.publisher.publish(
-                self.notification_topic,
-                json.dumps(notification_data).encode('utf-8')
-            )
-            
-            # Update Firestore for real-time UI
-            self.firestore_client.collection('notifications').add(notification_data)
+            self.publish_event(self.notification_topic, notification_data)
             
+            # Update Firestore for real-time UI and log in one commit
+            batch = self.firestore_client.batch()
+            batch.set(self.firestore_client.collection('notifications').document(), notification_data)
             self.log_agent_activity(
                 incident_id,
                 "completed",
-                {"notifications_sent": len(notifications), "stakeholders_notified": len(nearby_stakeholders)}
+                {"notifications_sent": len(notifications), "stakeholders_notified": len(nearby_stakeholders)},
+                batch=batch
             )
+            batch.commit()
             
             return {"status": "success", "notifications_sent": len(notifications)}
             
@@ -156,6 +378,44 @@ class NotificationAgent(BaseAgent):
             logger.error(f"Error generating notifications: {e}")
             return {"status": "error", "message": str(e)}
     
+    def _publish_responders_alert(self, incident_id: str, responders: Any):
+        """Publish the emergency responders' alert ahead of the full blast"""
+        self.publish_event(self.notification_topic, {
+            "type": "emergency_responders_alert",
+            "incident_id": incident_id,
+            "notification": responders,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    
+    def _render_notification_template(self, incident_fields: Dict[str, Any],
+                                      departments: List[str]) -> Optional[Dict[str, Any]]:
+        """Fill the stored template for this event type and severity, or return None if there is none
+        
+        Templates live in notification_templates/{event_type}_{severity_level}
+        with emergency_responders, department and citizens bodies in
+        string.Template syntax, e.g. "$event_type reported at $location_name".
+        The department body is rendered once per department with $department.
+        """
+        template_id = f"{incident_fields['event_type']}_{incident_fields['severity_level']}"
+        template_doc = self.firestore_client.collection('notification_templates').document(template_id).get()
+        if not template_doc.exists:
+            logger.info(f"No notification template for {template_id}, generating with the LLM")
+            return None
+        
+        template = template_doc.to_dict()
+        department_template = Template(template["department"])
+        return {
+            "emergency_responders": Template(template["emergency_responders"]).safe_substitute(incident_fields),
+            "departments": [
+                {
+                    "department": department,
+                    "message": department_template.safe_substitute(incident_fields, department=department)
+                }
+                for department in departments
+            ],
+            "citizens": Template(template["citizens"]).safe_substitute(incident_fields)
+        }
+    
     def _send_department_alert(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send targeted department alerts"""
         # Implementation for department-specific alerts
@@ -169,22 +429,47 @@ class NotificationAgent(BaseAgent):
 class TrendAnalysisAgent(BaseAgent):
     """Agent for analyzing trends and patterns"""
     
+    INSIGHTS_PROMPT = """
+    Analyze the following incident trends for {event_type} incidents in Bengaluru:
+    
+    Overall Statistics:
+    - Total incidents (30 days): {total_incidents}
+    - Average priority: {avg_priority:.2f}/10
+    - Affected areas: {affected_areas}
+    - Severity levels: {severity_levels}
+    
+    Peak Hours: {peak_hours}
+    
+    Top Hotspots: {hotspots}
+    
+    Provide:
+    1. Key trends and patterns
+    2. Risk assessment for the current incident
+    3. Preventive recommendations
+    4. Resource allocation suggestions
+    """
+    
+    INSIGHTS_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "trends": {"type": "array", "items": {"type": "string"}},
+            "risk_assessment": {"type": "string"},
+            "recommendations": {"type": "array", "items": {"type": "string"}},
+            "resource_allocation": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["trends", "risk_assessment", "recommendations", "resource_allocation"]
+    }
+    
     def __init__(self, project_id: str):
         super().__init__(project_id, "trend_analysis_agent")
         
-    def process_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process trend analysis tasks"""
-        task_type = task_data.get("task_type")
-        
-        if task_type == "trend_analysis":
-            return self._analyze_incident_trends(task_data)
-        elif task_type == "hotspot_detection":
-            return self._detect_hotspots(task_data)
-        elif task_type == "pattern_recognition":
-            return self._recognize_patterns(task_data)
-        else:
-            logger.warning(f"Unknown trend analysis task type: {task_type}")
-            return {"status": "error", "message": "Unknown task type"}
+    def _build_task_handlers(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        """Map trend analysis task types to their handlers"""
+        return {
+            "trend_analysis": self._analyze_incident_trends,
+            "hotspot_detection": self._detect_hotspots,
+            "pattern_recognition": self._recognize_patterns
+        }
     
     def _analyze_incident_trends(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze trends for specific incident types"""
@@ -205,7 +490,7 @@ class TrendAnalysisAgent(BaseAgent):
                     EXTRACT(HOUR FROM timestamp) as hour_of_day,
                     EXTRACT(DAYOFWEEK FROM timestamp) as day_of_week
                 FROM `{self.project_id}.bengaluru_events.real_time_incidents`
-                WHERE event_type = '{event_type}'
+                WHERE event_type = @event_type
                 AND timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)
             ),
             trend_stats AS (
@@ -245,33 +530,23 @@ class TrendAnalysisAgent(BaseAgent):
         """
         
         try:
-            result = list(self.bq_client.query(trend_query).result())[0]
+            result = self.run_query(trend_query, [
+                bigquery.ScalarQueryParameter("event_type", "STRING", event_type),
+            ])[0]
             
             # Generate AI insights
-            insights_prompt = f"""
-            Analyze the following incident trends for {event_type} incidents in Bengaluru:
-            
-            Overall Statistics:
-            - Total incidents (30 days): {result['trends']['total_incidents']}
-            - Average priority: {result['trends']['avg_priority']:.2f}/10
-            - Affected areas: {result['trends']['affected_areas']}
-            - Severity levels: {result['trends']['severity_levels']}
-            
-            Peak Hours: {[f"{h['hour_of_day']}:00 ({h['incident_count']} incidents)" for h in result['hourly_patterns']]}
-            
-            Top Hotspots: {[f"{h['area_category']} Ward-{h['ward_number']} ({h['incident_count']} incidents)" for h in result['hotspots']]}
-            
-            Provide:
-            1. Key trends and patterns
-            2. Risk assessment for the current incident
-            3. Preventive recommendations
-            4. Resource allocation suggestions
-            
-            Format as JSON with keys: trends, risk_assessment, recommendations, resource_allocation
-            """
+            insights_prompt = self.INSIGHTS_PROMPT.format_map({
+                **result['trends'],
+                "event_type": event_type,
+                "peak_hours": ', '.join(
+                    f"{h['hour_of_day']}:00 ({h['incident_count']} incidents)" for h in result['hourly_patterns']
+                ),
+                "hotspots": ', '.join(
+                    f"{h['area_category']} Ward-{h['ward_number']} ({h['incident_count']} incidents)" for h in result['hotspots']
+                )
+            })
             
-            ai_response = self.llm_model.generate_content(insights_prompt)
-            insights = json.loads(ai_response.text)
+            insights = self.generate_json(insights_prompt, self.INSIGHTS_SCHEMA)
             
             # Store insights
             trend_data = {
@@ -279,16 +554,17 @@ class TrendAnalysisAgent(BaseAgent):
                 "event_type": event_type,
                 "location": location,
                 "analysis_timestamp": datetime.utcnow().isoformat(),
-                "statistics": dict(result['trends']),
+                "statistics": result['trends'],
                 "patterns": {
-                    "hourly": [dict(h) for h in result['hourly_patterns']],
-                    "hotspots": [dict(h) for h in result['hotspots']]
+                    "hourly": result['hourly_patterns'],
+                    "hotspots": result['hotspots']
                 },
                 "ai_insights": insights
             }
             
             # Save to Firestore
-            self.firestore_client.collection('trend_analysis').add(trend_data)
+            batch = self.firestore_client.batch()
+            batch.set(self.firestore_client.collection('trend_analysis').document(), trend_data)
             
             # Publish analytics event
             analytics_event = {
@@ -302,16 +578,15 @@ class TrendAnalysisAgent(BaseAgent):
                 }
             }
             
-            self.publisher.publish(
-                self.analytics_topic,
-                json.dumps(analytics_event).encode('utf-8')
-            )
+            self.publish_event(self.analytics_topic, analytics_event)
             
             self.log_agent_activity(
                 incident_id,
                 "completed",
-                {"trends_analyzed": True, "insights_generated": True}
+                {"trends_analyzed": True, "insights_generated": True},
+                batch=batch
             )
+            batch.commit()
             
             return {"status": "success", "insights": insights}
             
@@ -332,20 +607,50 @@ class TrendAnalysisAgent(BaseAgent):
 class ResourceAllocationAgent(BaseAgent):
     """Agent for optimizing resource allocation"""
     
+    ALLOCATION_PROMPT = """
+    Optimize resource allocation for a {severity} severity incident (ID: {incident_id}):
+    
+    Current Department Workload:
+    {workload}
+    
+    New Incident Details:
+    - Severity: {severity}
+    - Estimated Duration: {estimated_duration}
+    
+    Provide resource allocation recommendations:
+    1. Primary department assignment
+    2. Support departments needed
+    3. Resource priority level (1-10)
+    4. Estimated personnel required
+    5. Equipment/vehicle requirements
+    6. Timeline for response
+    """
+    
+    ALLOCATION_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "primary_department": {"type": "string"},
+            "support_departments": {"type": "array", "items": {"type": "string"}},
+            "priority_level": {"type": "integer"},
+            "personnel_required": {"type": "integer"},
+            "equipment_needed": {"type": "array", "items": {"type": "string"}},
+            "response_timeline": {"type": "string"}
+        },
+        "required": [
+            "primary_department", "support_departments", "priority_level",
+            "personnel_required", "equipment_needed", "response_timeline"
+        ]
+    }
+    
     def __init__(self, project_id: str):
         super().__init__(project_id, "resource_allocation_agent")
         
-    def process_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process resource allocation tasks"""
-        task_type = task_data.get("task_type")
-        
-        if task_type == "resource_allocation":
-            return self._optimize_resource_allocation(task_data)
-        elif task_type == "capacity_planning":
-            return self._plan_capacity(task_data)
-        else:
-            logger.warning(f"Unknown resource allocation task type: {task_type}")
-            return {"status": "error", "message": "Unknown task type"}
+    def _build_task_handlers(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        """Map resource allocation task types to their handlers"""
+        return {
+            "resource_allocation": self._optimize_resource_allocation,
+            "capacity_planning": self._plan_capacity
+        }
     
     def _optimize_resource_allocation(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize resource allocation for incidents"""
@@ -380,33 +685,20 @@ class ResourceAllocationAgent(BaseAgent):
             ORDER BY active_incidents DESC
         """
         
+        resource_job = self.submit_query(resource_query)
+        
         try:
-            resource_data = [dict(row) for row in self.bq_client.query(resource_query).result()]
+            resource_data = self.fetch_rows(resource_job)
             
             # Generate resource allocation recommendations
-            allocation_prompt = f"""
-            Optimize resource allocation for a {severity} severity incident (ID: {incident_id}):
-            
-            Current Department Workload:
-            {json.dumps(resource_data, indent=2)}
-            
-            New Incident Details:
-            - Severity: {severity}
-            - Estimated Duration: {estimated_duration}
-            
-            Provide resource allocation recommendations:
-            1. Primary department assignment
-            2. Support departments needed
-            3. Resource priority level (1-10)
-            4. Estimated personnel required
-            5. Equipment/vehicle requirements
-            6. Timeline for response
-            
-            Format as JSON with keys: primary_department, support_departments, priority_level, personnel_required, equipment_needed, response_timeline
-            """
+            allocation_prompt = self.ALLOCATION_PROMPT.format(
+                severity=severity,
+                incident_id=incident_id,
+                workload=orjson.dumps(resource_data).decode(),
+                estimated_duration=estimated_duration
+            )
             
-            ai_response = self.llm_model.generate_content(allocation_prompt)
-            allocation_plan = json.loads(ai_response.text)
+            allocation_plan = self.generate_json(allocation_prompt, self.ALLOCATION_SCHEMA)
             
             # Store allocation plan
             allocation_data = {
@@ -417,14 +709,16 @@ class ResourceAllocationAgent(BaseAgent):
                 "allocation_plan": allocation_plan
             }
             
-            # Save to Firestore
-            self.firestore_client.collection('resource_allocations').add(allocation_data)
-            
+            # Save to Firestore and log in one commit
+            batch = self.firestore_client.batch()
+            batch.set(self.firestore_client.collection('resource_allocations').document(), allocation_data)
             self.log_agent_activity(
                 incident_id,
                 "completed",
-                {"allocation_optimized": True, "departments_analyzed": len(resource_data)}
+                {"allocation_optimized": True, "departments_analyzed": len(resource_data)},
+                batch=batch
             )
+            batch.commit()
             
             return {"status": "success", "allocation_plan": allocation_plan}
             
@@ -440,28 +734,69 @@ class ResourceAllocationAgent(BaseAgent):
 class NewsInsightsAgent(BaseAgent):
     """Agent for generating news insights and summaries"""
     
+    SUMMARY_PROMPT = """
+    Generate a comprehensive daily incident summary for Bengaluru on {target_date}:
+    
+    Daily Totals:
+    {daily_stats}
+    
+    Top Incident Groups (up to 5 per event type):
+    {daily_data}
+    
+    Create a news-style summary including:
+    1. Executive summary (2-3 sentences)
+    2. Key statistics and trends
+    3. Major incidents by area
+    4. Department performance
+    5. Citizen impact assessment
+    6. Recommendations for tomorrow
+    """
+    
+    SUMMARY_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "executive_summary": {"type": "string"},
+            "statistics": {"type": "array", "items": {"type": "string"}},
+            "major_incidents": {"type": "array", "items": {"type": "string"}},
+            "department_performance": {"type": "string"},
+            "citizen_impact": {"type": "string"},
+            "recommendations": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": [
+            "executive_summary", "statistics", "major_incidents",
+            "department_performance", "citizen_impact", "recommendations"
+        ]
+    }
+    
     def __init__(self, project_id: str):
-        super().__init__(project_id, "news_insights_agent")
-        
-    def process_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process news insights tasks"""
-        task_type = task_data.get("task_type")
-        
-        if task_type == "daily_summary":
-            return self._generate_daily_summary(task_data)
-        elif task_type == "hot_topics":
-            return self._identify_hot_topics(task_data)
-        elif task_type == "impact_analysis":
-            return self._analyze_impact(task_data)
-        else:
-            logger.warning(f"Unknown news insights task type: {task_type}")
-            return {"status": "error", "message": "Unknown task type"}
+        super().__init__(project_id, "news_insights_agent", FAST_LLM_MODEL)
+        
+    def _build_task_handlers(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        """Map news insights task types to their handlers"""
+        return {
+            "daily_summary": self._generate_daily_summary,
+            "hot_topics": self._identify_hot_topics,
+            "impact_analysis": self._analyze_impact
+        }
     
     def _generate_daily_summary(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate daily incident summary"""
         target_date = task_data.get("date", datetime.utcnow().date())
         
-        # Query daily incidents
+        # Day-wide totals, so the prompt only needs the leading groups
+        daily_stats_query = f"""
+            SELECT
+                COUNT(*) as total_incidents,
+                COUNT(DISTINCT event_type) as event_types,
+                COUNT(DISTINCT area_category) as affected_areas,
+                COUNTIF(severity_level = 'high') as high_severity_incidents,
+                AVG(priority_score) as avg_priority,
+                APPROX_QUANTILES(priority_score, 4) as priority_quartiles
+            FROM `{self.project_id}.bengaluru_events.real_time_incidents`
+            WHERE DATE(timestamp) = @target_date
+        """
+        
+        # Query daily incidents, keeping the top 5 groups per event type
         daily_query = f"""
             SELECT 
                 event_type,
@@ -472,51 +807,48 @@ class NewsInsightsAgent(BaseAgent):
                 AVG(priority_score) as avg_priority,
                 STRING_AGG(DISTINCT location_name, ', ' LIMIT 10) as locations
             FROM `{self.project_id}.bengaluru_events.real_time_incidents`
-            WHERE DATE(timestamp) = '{target_date}'
+            WHERE DATE(timestamp) = @target_date
             GROUP BY event_type, severity_level, area_category, assigned_department
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY event_type ORDER BY incident_count DESC) <= 5
             ORDER BY incident_count DESC
         """
         
+        date_params = [bigquery.ScalarQueryParameter("target_date", "DATE", target_date)]
+        daily_stats_job = self.submit_query(daily_stats_query, date_params)
+        daily_job = self.submit_query(daily_query, date_params)
+        
         try:
-            daily_data = [dict(row) for row in self.bq_client.query(daily_query).result()]
+            daily_stats = dict(list(daily_stats_job.result())[0])
+            daily_data = self.fetch_rows(daily_job)
             
             # Generate AI summary
-            summary_prompt = f"""
-            Generate a comprehensive daily incident summary for Bengaluru on {target_date}:
-            
-            Incident Data:
-            {json.dumps(daily_data, indent=2)}
-            
-            Create a news-style summary including:
-            1. Executive summary (2-3 sentences)
-            2. Key statistics and trends
-            3. Major incidents by area
-            4. Department performance
-            5. Citizen impact assessment
-            6. Recommendations for tomorrow
-            
-            Format as JSON with keys: executive_summary, statistics, major_incidents, department_performance, citizen_impact, recommendations
-            """
+            summary_prompt = self.SUMMARY_PROMPT.format(
+                target_date=target_date,
+                daily_stats=orjson.dumps(daily_stats).decode(),
+                daily_data=orjson.dumps(daily_data).decode()
+            )
             
-            ai_response = self.llm_model.generate_content(summary_prompt)
-            summary = json.loads(ai_response.text)
+            summary = self.generate_json(summary_prompt, self.SUMMARY_SCHEMA)
             
             # Store summary
             summary_data = {
                 "date": str(target_date),
                 "generation_timestamp": datetime.utcnow().isoformat(),
+                "statistics": daily_stats,
                 "raw_data": daily_data,
                 "summary": summary
             }
             
-            # Save to Firestore
-            self.firestore_client.collection('daily_summaries').document(str(target_date)).set(summary_data)
-            
+            # Save to Firestore and log in one commit
+            batch = self.firestore_client.batch()
+            batch.set(self.firestore_client.collection('daily_summaries').document(str(target_date)), summary_data)
             self.log_agent_activity(
                 f"daily_summary_{target_date}",
                 "completed",
-                {"incidents_analyzed": len(daily_data), "summary_generated": True}
+                {"incidents_analyzed": daily_stats["total_incidents"], "summary_generated": True},
+                batch=batch
             )
+            batch.commit()
             
             return {"status": "success", "summary": summary}
             
@@ -550,27 +882,28 @@ class AgentOrchestrator:
             "news_insights_agent": NewsInsightsAgent(project_id)
         }
         
+        # Route each task type straight to the agent that handles it
+        self.task_routes = {
+            task_type: agent
+            for agent in self.agents.values()
+            for task_type in agent.task_handlers
+        }
+        
+        # Agent work runs here rather than on the Pub/Sub callback threads
+        self.executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="agent-task")
+        
     def process_agent_task(self, message):
         """Process agent tasks from Pub/Sub"""
         try:
-            task_data = json.loads(message.data.decode('utf-8'))
+            task_data = orjson.loads(message.data)
             task_type = task_data.get("task_type")
             
             # Route to appropriate agent
-            agent = None
-            if task_type in ["notification_blast", "department_alert", "citizen_update"]:
-                agent = self.agents["notification_agent"]
-            elif task_type in ["trend_analysis", "hotspot_detection", "pattern_recognition"]:
-                agent = self.agents["trend_analysis_agent"]
-            elif task_type in ["resource_allocation", "capacity_planning"]:
-                agent = self.agents["resource_allocation_agent"]
-            elif task_type in ["daily_summary", "hot_topics", "impact_analysis"]:
-                agent = self.agents["news_insights_agent"]
+            agent = self.task_routes.get(task_type)
             
             if agent:
-                result = agent.process_task(task_data)
-                logger.info(f"Agent task completed: {task_type} - {result['status']}")
-                message.ack()
+                future = self.executor.submit(agent.process_task, task_data)
+                future.add_done_callback(lambda f: self._complete_agent_task(message, task_type, f))
             else:
                 logger.warning(f"No agent found for task type: {task_type}")
                 message.nack()
@@ -579,11 +912,28 @@ class AgentOrchestrator:
             logger.error(f"Error processing agent task: {e}")
             message.nack()
     
+    def _complete_agent_task(self, message, task_type: str, future: Future):
+        """Ack or nack a message once its agent task has finished"""
+        error = future.exception()
+        if error:
+            logger.error(f"Error processing agent task {task_type}: {error}")
+            message.nack()
+            return
+        
+        logger.info(f"Agent task completed: {task_type} - {future.result()['status']}")
+        message.ack()
+    
+    def stop(self):
+        """Finish in-flight tasks and flush any batched publishes"""
+        self.executor.shutdown(wait=True)
+        shared_client("publisher", self.project_id, create_publisher).stop()
+    
     def start_agent_orchestrator(self):
         """Start the agent orchestrator"""
         logger.info("Starting intelligent agent orchestrator...")
         
-        flow_control = pubsub_v1.types.FlowControl(max_messages=50)
+        # Lease enough messages to keep every worker busy, but no more
+        flow_control = pubsub_v1.types.FlowControl(max_messages=AGENT_WORKERS * 2)
         
         streaming_pull_future = self.subscriber.subscribe(
             self.agent_subscription,
@@ -597,6 +947,7 @@ class AgentOrchestrator:
             streaming_pull_future.result()
         except KeyboardInterrupt:
             streaming_pull_future.cancel()
+            self.stop()
             logger.info("Agent orchestrator stopped.")
 
 if __name__ == "__main__":
@@ -1,26 +1,335 @@
 import os
-import json
+import asyncio
+import hashlib
+import math
+import time
+from functools import lru_cache
 from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Optional, List
-from google.cloud import bigquery
-from neo4j import GraphDatabase
-from vertexai.language_models import ChatModel
+import h3
+import numpy as np
+import orjson
+from cachetools import TTLCache
+import redis.asyncio as redis
+from google.cloud import bigquery, bigquery_storage
+from neo4j import AsyncGraphDatabase, RoutingControl
+from vertexai.generative_models import GenerativeModel
+from vertexai.language_models import TextEmbeddingModel
 import vertexai
 
 # Initialize Vertex AI
 vertexai.init(project=os.getenv("PROJECT_ID"), location="asia-south1")
 
 bq = bigquery.Client()
-driver = GraphDatabase.driver("bolt://memgraph-service:7687", auth=("", ""))
-chat = ChatModel.from_pretrained("gemini-1.5-flash-001").start_chat()
+bqstorage = bigquery_storage.BigQueryReadClient()
+driver = AsyncGraphDatabase.driver(
+    "bolt://memgraph-service:7687",
+    auth=("", ""),
+    max_connection_pool_size=64,
+    connection_acquisition_timeout=10
+)
 
-app = FastAPI(title="Bengaluru City Pulse API", version="2.0.0")
+# Static analysis instructions go in the system instruction, ahead of the
+# per-request data, so every call shares the same prompt prefix
+ANALYSIS_INSTRUCTIONS = """
+Analyze the incident data for Bengaluru city that follows.
+
+Provide insights on:
+1. Current situation assessment
+2. Risk patterns and trends
+3. Recommended actions
+4. Predictions for next 24-48 hours
+
+Focus on public safety, traffic impact, and resource allocation.
+"""
+
+analysis_model = GenerativeModel("gemini-1.5-flash-001", system_instruction=ANALYSIS_INSTRUCTIONS)
+# Same model the incidents were embedded with at ingest
+embedding_model = TextEmbeddingModel.from_pretrained("textembedding-gecko@003")
+
+app = FastAPI(title="Bengaluru City Pulse API", version="2.0.0", default_response_class=ORJSONResponse)
+
+# Query texts are fixed per endpoint and every request value is bound as a
+# parameter, so repeated requests hit BigQuery's result cache
+DATASET = f"{os.getenv('PROJECT_ID')}.bengaluru_events"
+
+# Number of rows the 256-dim prefilter passes on to the full-dim rerank.
+# Stored and query embeddings are unit-length, so ranking by Euclidean
+# distance matches cosine without computing two norms per row
+SEARCH_CANDIDATES = 200
+
+SEARCH_SQL = f"""
+    WITH candidates AS (
+        SELECT 
+            e.id, e.event_type, e.sub_category, e.description, e.location_name, 
+            e.area_category, e.severity_level, e.priority_score, e.event_status,
+            e.coordinates, e.timestamp, e.impact_radius, e.assigned_department,
+            e.verification_count, e.verified, e.weather_condition, e.traffic_density,
+            e.embedding
+        FROM `{DATASET}.embeddings` e
+        WHERE (ARRAY_LENGTH(@cells) = 0 OR e.h3_cell_r9 IN UNNEST(@cells))
+        AND ST_DISTANCE(ST_GEOGPOINT(e.coordinates[OFFSET(1)], e.coordinates[OFFSET(0)]), ST_GEOGPOINT(@lon, @lat)) <= @radius_m
+        AND (ARRAY_LENGTH(@event_types) = 0 OR e.event_type IN UNNEST(@event_types))
+        AND (ARRAY_LENGTH(@severity_levels) = 0 OR e.severity_level IN UNNEST(@severity_levels))
+        AND (@hours IS NULL OR e.timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @hours HOUR))
+        ORDER BY EUCLIDEAN_DISTANCE(e.embedding_256, @q_emb_256)
+        LIMIT {SEARCH_CANDIDATES}
+    )
+    SELECT 
+        c.* EXCEPT (embedding)
+    FROM candidates c
+    ORDER BY 
+        EUCLIDEAN_DISTANCE(c.embedding, @q_emb),
+        c.priority_score DESC,
+        c.timestamp DESC
+    LIMIT 20
+"""
+
+# Cheap text match served first by the streaming search, while the
+# vector search is still running
+KEYWORD_SQL = f"""
+    SELECT 
+        id, event_type, sub_category, description, location_name, 
+        area_category, severity_level, priority_score, event_status,
+        coordinates, timestamp, impact_radius, assigned_department,
+        verification_count, verified, weather_condition, traffic_density
+    FROM `{DATASET}.embeddings`
+    WHERE (ARRAY_LENGTH(@cells) = 0 OR h3_cell_r9 IN UNNEST(@cells))
+    AND ST_DISTANCE(ST_GEOGPOINT(coordinates[OFFSET(1)], coordinates[OFFSET(0)]), ST_GEOGPOINT(@lon, @lat)) <= @radius_m
+    AND (ARRAY_LENGTH(@event_types) = 0 OR event_type IN UNNEST(@event_types))
+    AND (ARRAY_LENGTH(@severity_levels) = 0 OR severity_level IN UNNEST(@severity_levels))
+    AND (@hours IS NULL OR timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @hours HOUR))
+    AND (CONTAINS_SUBSTR(description, @question) OR LOWER(@question) IN UNNEST(keywords))
+    ORDER BY priority_score DESC, timestamp DESC
+    LIMIT 20
+"""
+
+ANALYZE_SQL = f"""
+    SELECT 
+        id, event_type, sub_category, description, location_name,
+        severity_level, priority_score, event_status, timestamp,
+        coordinates, impact_radius, verification_count, verified
+    FROM `{DATASET}.embeddings`
+    WHERE (ARRAY_LENGTH(@cells) = 0 OR h3_cell_r9 IN UNNEST(@cells))
+    AND ST_DISTANCE(ST_GEOGPOINT(coordinates[OFFSET(1)], coordinates[OFFSET(0)]), ST_GEOGPOINT(@lon, @lat)) <= @radius_m
+    AND timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 48 HOUR)
+    ORDER BY priority_score DESC, timestamp DESC
+    LIMIT 15
+"""
+
+# Stats and department queries read materialized views (see infra/main.tf);
+# stats are rolled up by the hour, so the window starts on an hour boundary
+STATS_SQL = f"""
+    WITH groups AS (
+        SELECT 
+            event_type,
+            severity_level,
+            area_category,
+            SUM(incident_count) as incident_count,
+            SUM(priority_sum) as priority_sum,
+            SUM(verification_sum) as verification_sum,
+            SUM(resolved_count) as resolved_count
+        FROM `{DATASET}.mv_incident_stats_hourly`
+        WHERE hour_bucket >= TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @hours HOUR), HOUR)
+        AND (@ward_number IS NULL OR ward_number = @ward_number)
+        AND (@area_category IS NULL OR area_category = @area_category)
+        GROUP BY event_type, severity_level, area_category
+    )
+    SELECT
+        ARRAY(
+            SELECT AS STRUCT
+                event_type, severity_level, area_category, incident_count,
+                priority_sum / incident_count as avg_priority,
+                verification_sum / incident_count as avg_verification,
+                resolved_count
+            FROM groups
+            ORDER BY incident_count DESC
+            LIMIT 100
+        ) as statistics,
+        (SELECT IFNULL(SUM(incident_count), 0) FROM groups) as total_incidents,
+        (SELECT IFNULL(SUM(resolved_count), 0) FROM groups) as resolved_incidents,
+        (SELECT IFNULL(SAFE_DIVIDE(SUM(priority_sum), SUM(incident_count)), 0) FROM groups) as avg_priority
+"""
+
+DEPARTMENT_SQL = f"""
+    SELECT 
+        id, event_type, sub_category, description, location_name,
+        severity_level, priority_score, event_status, timestamp,
+        estimated_duration, actual_duration, resolution_notes
+    FROM `{DATASET}.mv_department_active`
+    WHERE assigned_department = @department
+    ORDER BY priority_score DESC, timestamp DESC
+    LIMIT 50
+"""
+
+# Search and analysis responses are reused for identical requests, and
+# optionally for near-identical questions about the same area
+RESPONSE_CACHE_TTL = 300
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+class SemanticCache:
+    """Responses keyed by question embedding, served for near-duplicate questions
+    
+    A cached response only matches when the rest of the request (endpoint,
+    location, filters) is identical and the questions' cosine similarity
+    is at least the threshold.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+        self.entries = []  # (request key, response, expiry) aligned with embeddings
+    
+    def get(self, request_key: tuple, embedding: np.ndarray):
+        if not self.entries:
+            return None
+        now = time.monotonic()
+        similarities = self.embeddings @ embedding
+        for i in np.argsort(similarities)[::-1]:
+            if similarities[i] < self.threshold:
+                return None
+            key, response, expiry = self.entries[i]
+            if key == request_key and expiry > now:
+                return response
+        return None
+    
+    def put(self, request_key: tuple, embedding: np.ndarray, response: dict):
+        now = time.monotonic()
+        live = [i for i, (_, _, expiry) in enumerate(self.entries) if expiry > now][-(self.maxsize - 1):]
+        rows = [self.embeddings[i] for i in live] + [embedding]
+        self.embeddings = np.vstack(rows)
+        self.entries = [self.entries[i] for i in live] + [(request_key, response, now + self.ttl)]
+
+exact_cache = TTLCache(maxsize=4096, ttl=RESPONSE_CACHE_TTL)
+semantic_cache = SemanticCache(maxsize=1024, ttl=RESPONSE_CACHE_TTL, threshold=SEMANTIC_CACHE_THRESHOLD)
+
+def request_key(endpoint: str, query: "IncidentQuery") -> tuple:
+    """Everything in a request except its question"""
+    return (
+        endpoint,
+        tuple(query.coordinates),
+        query.radius_km,
+        tuple(sorted(query.event_types or [])),
+        tuple(sorted(query.severity_levels or [])),
+        query.time_range_hours,
+    )
+
+@lru_cache(maxsize=4096)
+def embed_question(question: str) -> np.ndarray:
+    """Unit-length embedding of a question, cached per question (blocking)"""
+    vector = np.asarray(embedding_model.get_embeddings([question])[0].values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+# Question embeddings shared across API instances, when REDIS_URL is set
+EMBEDDING_CACHE_TTL = 86400
+redis_client = redis.from_url(os.environ["REDIS_URL"]) if os.getenv("REDIS_URL") else None
+
+async def get_question_embedding(question: str) -> np.ndarray:
+    """Embedding of a question, from Redis when another instance already computed it"""
+    if redis_client is None:
+        return await asyncio.to_thread(embed_question, question)
+    
+    key = f"emb:{hashlib.sha256(question.encode('utf-8')).hexdigest()}"
+    try:
+        cached = await redis_client.get(key)
+        if cached:
+            return np.frombuffer(cached, dtype=np.float32)
+    except redis.RedisError:
+        pass  # The cache is an optimization; fall back to the model
+    
+    embedding = await asyncio.to_thread(embed_question, question)
+    try:
+        await redis_client.set(key, embedding.astype(np.float32).tobytes(), ex=EMBEDDING_CACHE_TTL)
+    except redis.RedisError:
+        pass
+    return embedding
+
+async def cached_response(endpoint: str, query: "IncidentQuery", compute):
+    """Serve a request from the exact or semantic cache, or compute and cache it"""
+    key = request_key(endpoint, query)
+    exact_key = key + (" ".join(query.question.lower().split()),)
+    if exact_key in exact_cache:
+        return exact_cache[exact_key]
+    
+    embedding = None
+    if SEMANTIC_CACHE_ENABLED:
+        embedding = await get_question_embedding(query.question)
+        response = semantic_cache.get(key, embedding)
+        if response is not None:
+            return response
+    
+    response = await compute()
+    exact_cache[exact_key] = response
+    if embedding is not None:
+        semantic_cache.put(key, embedding, response)
+    return response
+
+# Incidents are indexed by their resolution 9 H3 cell, whose edge is ~174 m
+H3_RESOLUTION = 9
+H3_EDGE_KM = 0.174
+# Largest ring passed as a cell prefilter (3k(k+1)+1 cells, ~11k at 60,
+# about 10 km); wider searches rely on the distance filter alone
+H3_MAX_RING = 60
+# Largest search radius a query may ask for
+MAX_RADIUS_KM = 50
+
+def location_params(lat: float, lon: float, radius_km: int) -> list:
+    """Query parameters for a point and search radius
+    
+    Besides the exact point and radius, the H3 cells covering the radius
+    are passed so BigQuery can prune on the clustered cell column before
+    computing distances. Radii beyond H3_MAX_RING rings pass no cells.
+    """
+    ring = math.ceil(radius_km / H3_EDGE_KM)
+    cells = []
+    if ring <= H3_MAX_RING:
+        cells = list(h3.grid_disk(h3.latlng_to_cell(lat, lon, H3_RESOLUTION), ring))
+    return [
+        bigquery.ScalarQueryParameter("lon", "FLOAT64", lon),
+        bigquery.ScalarQueryParameter("lat", "FLOAT64", lat),
+        bigquery.ScalarQueryParameter("radius_m", "INT64", radius_km * 1000),
+        bigquery.ArrayQueryParameter("cells", "STRING", cells),
+    ]
+
+def run_bq(sql: str, params: list) -> List[dict]:
+    """Run a parameterized BigQuery query and return its rows as dicts (blocking)
+    
+    Rows are fetched as Arrow, through the Storage Read API when the
+    result spans more than one page, and converted to dicts in one pass.
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=params, use_query_cache=True)
+    table = bq.query(sql, job_config=job_config).result().to_arrow(bqstorage_client=bqstorage)
+    return table.to_pylist()
+
+# Fixed query text with every value passed as a parameter, so the server
+# parses and plans it once; the radius arrives in metres rather than being
+# scaled per row
+NEARBY_INCIDENTS_CYPHER = """
+    MATCH (i:Incident)-[:LOCATED_AT]->(l:Location)
+    WHERE distance(point({longitude:l.lon, latitude:l.lat, crs:'wgs-84'}),
+                   point({longitude:$lon, latitude:$lat, crs:'wgs-84'})) < $r_m
+    RETURN i.id, i.event_type, i.severity_level, i.status, 
+           l.name as location, i.timestamp
+    ORDER BY i.priority_score DESC
+    LIMIT 10
+"""
+
+async def run_graph(lon: float, lat: float, radius_km: int) -> List[dict]:
+    """Find incidents near a point in the graph"""
+    records, _, _ = await driver.execute_query(
+        NEARBY_INCIDENTS_CYPHER, lon=lon, lat=lat, r_m=radius_km * 1000, routing_=RoutingControl.READ
+    )
+    return [record.data() for record in records]
 
 class IncidentQuery(BaseModel):
     question: str
     coordinates: List[float]  # [lat, lon]
-    radius_km: int = 5
+    radius_km: int = Field(5, ge=1, le=MAX_RADIUS_KM)
     event_types: Optional[List[str]] = None
     severity_levels: Optional[List[str]] = None
     time_range_hours: Optional[int] = 24
@@ -33,6 +342,10 @@ class IncidentFilter(BaseModel):
     verified_only: bool = False
     peak_hours_only: bool = False
 
+@app.on_event("shutdown")
+async def close_graph_driver():
+    await driver.close()
+
 @app.get("/")
 def read_root():
     return {
@@ -46,46 +359,35 @@ def health_check():
     return {"status": "healthy", "service": "bengaluru-city-pulse", "version": "2.0.0"}
 
 @app.post("/incidents/search")
-def search_incidents(query: IncidentQuery):
+async def search_incidents(query: IncidentQuery):
     """Advanced incident search with vector similarity and spatial filtering"""
+    return await cached_response("search", query, lambda: _search_incidents(query))
+
+def search_filter_params(query: IncidentQuery) -> list:
+    """Query parameters for the location and filters of a search"""
+    lat, lon = query.coordinates
+    return location_params(lat, lon, query.radius_km) + [
+        bigquery.ArrayQueryParameter("event_types", "STRING", query.event_types or []),
+        bigquery.ArrayQueryParameter("severity_levels", "STRING", query.severity_levels or []),
+        bigquery.ScalarQueryParameter("hours", "INT64", query.time_range_hours or None),
+    ]
+
+async def vector_search(query: IncidentQuery) -> List[dict]:
+    """Incidents matching a search, ranked by similarity to its question"""
+    # Embed the question here rather than in SQL, so the query stays
+    # deterministic and cacheable and the model runs once per question
+    q_emb = await get_question_embedding(query.question)
+    q_emb_256 = q_emb[:256] / np.linalg.norm(q_emb[:256])
+    params = search_filter_params(query) + [
+        bigquery.ArrayQueryParameter("q_emb", "FLOAT64", q_emb.tolist()),
+        bigquery.ArrayQueryParameter("q_emb_256", "FLOAT64", q_emb_256.tolist()),
+    ]
+    return await asyncio.to_thread(run_bq, SEARCH_SQL, params)
+
+async def _search_incidents(query: IncidentQuery):
     try:
         lat, lon = query.coordinates
-        
-        # Build dynamic WHERE clause
-        where_conditions = [
-            f"ST_DISTANCE(ST_GEOGPOINT(coordinates[OFFSET(1)], coordinates[OFFSET(0)]), ST_GEOGPOINT({lon}, {lat})) <= {query.radius_km}*1000"
-        ]
-        
-        if query.event_types:
-            event_types_str = "', '".join(query.event_types)
-            where_conditions.append(f"event_type IN ('{event_types_str}')")
-        
-        if query.severity_levels:
-            severity_str = "', '".join(query.severity_levels)
-            where_conditions.append(f"severity_level IN ('{severity_str}')")
-        
-        if query.time_range_hours:
-            where_conditions.append(f"timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {query.time_range_hours} HOUR)")
-        
-        where_clause = " AND ".join(where_conditions)
-        
-        # Vector search query
-        sql = f"""
-            SELECT 
-                id, event_type, sub_category, description, location_name, 
-                area_category, severity_level, priority_score, event_status,
-                coordinates, timestamp, impact_radius, assigned_department,
-                verification_count, verified, weather_condition, traffic_density
-            FROM `{os.getenv('PROJECT_ID')}.bengaluru_events.embeddings`
-            WHERE {where_clause}
-            ORDER BY 
-                COSINE_DISTANCE(embedding, ML.GENERATE_EMBEDDING(MODEL `{os.getenv('PROJECT_ID')}.bengaluru_events.text_embedding_model`, '{query.question}')),
-                priority_score DESC,
-                timestamp DESC
-            LIMIT 20
-        """
-        
-        results = [dict(row) for row in bq.query(sql).result()]
+        results = await vector_search(query)
         
         return {
             "query": query.question,
@@ -97,69 +399,69 @@ def search_incidents(query: IncidentQuery):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
+@app.post("/incidents/search/stream")
+async def stream_search_incidents(query: IncidentQuery):
+    """Incident search as server-sent events: keyword matches first, then vector-ranked results"""
+    keyword_params = search_filter_params(query) + [
+        bigquery.ScalarQueryParameter("question", "STRING", query.question),
+    ]
+    keyword_task = asyncio.create_task(asyncio.to_thread(run_bq, KEYWORD_SQL, keyword_params))
+    vector_task = asyncio.create_task(vector_search(query))
+    
+    def event(name: str, incidents: List[dict]) -> str:
+        data = orjson.dumps({"results_count": len(incidents), "incidents": incidents}).decode()
+        return f"event: {name}\ndata: {data}\n\n"
+    
+    async def events():
+        try:
+            yield event("keyword", await keyword_task)
+            yield event("vector", await vector_task)
+        except Exception as e:
+            yield f"event: error\ndata: {orjson.dumps({'detail': f'Search error: {e}'}).decode()}\n\n"
+        finally:
+            keyword_task.cancel()
+            vector_task.cancel()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.post("/incidents/analyze")
-def analyze_incidents(query: IncidentQuery):
+async def analyze_incidents(query: IncidentQuery):
     """AI-powered incident analysis with insights and predictions"""
+    return await cached_response("analyze", query, lambda: _analyze_incidents(query))
+
+async def _analyze_incidents(query: IncidentQuery):
     try:
         lat, lon = query.coordinates
         
-        # 1. Get recent incidents (vector search)
-        vector_sql = f"""
-            SELECT 
-                id, event_type, sub_category, description, location_name,
-                severity_level, priority_score, event_status, timestamp,
-                coordinates, impact_radius, verification_count, verified
-            FROM `{os.getenv('PROJECT_ID')}.bengaluru_events.embeddings`
-            WHERE ST_DISTANCE(ST_GEOGPOINT(coordinates[OFFSET(1)], coordinates[OFFSET(0)]), ST_GEOGPOINT({lon}, {lat})) <= {query.radius_km}*1000
-            AND timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 48 HOUR)
-            ORDER BY priority_score DESC, timestamp DESC
-            LIMIT 15
-        """
-        vector_results = [dict(row) for row in bq.query(vector_sql).result()]
+        # 1. Get recent incidents (vector search) and
+        # 2. Graph analysis (spatial relationships), concurrently
+        vector_results, graph_results = await asyncio.gather(
+            asyncio.to_thread(run_bq, ANALYZE_SQL, location_params(lat, lon, query.radius_km)),
+            run_graph(lon, lat, query.radius_km)
+        )
         
-        # 2. Graph analysis (spatial relationships)
-        with driver.session() as s:
-            graph_results = s.run("""
-                MATCH (i:Incident)-[:LOCATED_AT]->(l:Location)
-                WHERE distance(point({longitude:l.lon, latitude:l.lat}),
-                               point({longitude:$lon, latitude:$lat})) < $r*1000
-                RETURN i.id, i.event_type, i.severity_level, i.status, 
-                       l.name as location, i.timestamp
-                ORDER BY i.priority_score DESC
-                LIMIT 10
-            """, lon=lon, lat=lat, r=query.radius_km).data()
+        # Summarize the incidents in a single pass
+        high_priority = 0
+        priority_total = 0.0
+        event_types = set()
+        for incident in vector_results:
+            priority = incident.get('priority_score') or 0
+            priority_total += priority
+            if priority > 0.7:
+                high_priority += 1
+            event_types.add(incident.get('event_type', ''))
         
         # 3. Generate AI insights
-        context = {
-            "query_location": {"lat": lat, "lon": lon},
-            "radius_km": query.radius_km,
-            "recent_incidents": vector_results,
-            "spatial_analysis": graph_results,
-            "total_incidents": len(vector_results),
-            "high_priority_count": len([i for i in vector_results if i.get('priority_score', 0) > 0.7]),
-            "event_types": list(set(i.get('event_type', '') for i in vector_results))
-        }
-        
         # Create detailed prompt for AI analysis
         analysis_prompt = f"""
-        Analyze the following incident data for Bengaluru city:
-        
         Location: {lat}, {lon} (radius: {query.radius_km}km)
         Question: {query.question}
         
         Recent Incidents ({len(vector_results)}):
-        {json.dumps(vector_results[:5], indent=2)}
-        
-        Provide insights on:
-        1. Current situation assessment
-        2. Risk patterns and trends
-        3. Recommended actions
-        4. Predictions for next 24-48 hours
-        
-        Focus on public safety, traffic impact, and resource allocation.
+        {orjson.dumps(vector_results[:5], option=orjson.OPT_INDENT_2).decode()}
         """
         
-        ai_response = chat.send_message(analysis_prompt)
+        ai_response = await asyncio.to_thread(analysis_model.generate_content, analysis_prompt)
         
         return {
             "query": query.question,
@@ -168,9 +470,9 @@ def analyze_incidents(query: IncidentQuery):
                 "ai_insights": ai_response.text,
                 "incident_summary": {
                     "total_incidents": len(vector_results),
-                    "high_priority": len([i for i in vector_results if i.get('priority_score', 0) > 0.7]),
-                    "event_types": list(set(i.get('event_type', '') for i in vector_results)),
-                    "average_priority": sum(i.get('priority_score', 0) for i in vector_results) / len(vector_results) if vector_results else 0
+                    "high_priority": high_priority,
+                    "event_types": list(event_types),
+                    "average_priority": priority_total / len(vector_results) if vector_results else 0
                 },
                 "recent_incidents": vector_results[:10],
                 "spatial_relationships": graph_results
@@ -181,50 +483,30 @@ def analyze_incidents(query: IncidentQuery):
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
 @app.get("/incidents/stats")
-def get_incident_stats(
+async def get_incident_stats(
     ward_number: Optional[int] = Query(None),
     area_category: Optional[str] = Query(None),
     hours: int = Query(24, description="Time range in hours")
 ):
     """Get incident statistics for dashboards"""
     try:
-        where_conditions = [
-            f"timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {hours} HOUR)"
+        params = [
+            bigquery.ScalarQueryParameter("hours", "INT64", hours),
+            bigquery.ScalarQueryParameter("ward_number", "INT64", ward_number or None),
+            bigquery.ScalarQueryParameter("area_category", "STRING", area_category or None),
         ]
         
-        if ward_number:
-            where_conditions.append(f"ward_number = {ward_number}")
-        
-        if area_category:
-            where_conditions.append(f"area_category = '{area_category}'")
-        
-        where_clause = " AND ".join(where_conditions)
-        
-        stats_sql = f"""
-            SELECT 
-                event_type,
-                severity_level,
-                area_category,
-                COUNT(*) as incident_count,
-                AVG(priority_score) as avg_priority,
-                AVG(verification_count) as avg_verification,
-                SUM(CASE WHEN event_status = 'resolved' THEN 1 ELSE 0 END) as resolved_count
-            FROM `{os.getenv('PROJECT_ID')}.bengaluru_events.embeddings`
-            WHERE {where_clause}
-            GROUP BY event_type, severity_level, area_category
-            ORDER BY incident_count DESC
-        """
-        
-        stats = [dict(row) for row in bq.query(stats_sql).result()]
+        # One row: the top groups plus totals computed over every group
+        result = (await asyncio.to_thread(run_bq, STATS_SQL, params))[0]
         
         return {
             "time_range_hours": hours,
             "filters": {"ward_number": ward_number, "area_category": area_category},
-            "statistics": stats,
+            "statistics": result['statistics'],
             "summary": {
-                "total_incidents": sum(s['incident_count'] for s in stats),
-                "resolved_incidents": sum(s['resolved_count'] for s in stats),
-                "avg_priority": sum(s['avg_priority'] * s['incident_count'] for s in stats) / sum(s['incident_count'] for s in stats) if stats else 0
+                "total_incidents": result['total_incidents'],
+                "resolved_incidents": result['resolved_incidents'],
+                "avg_priority": result['avg_priority']
             }
         }
     
@@ -232,22 +514,12 @@ def get_incident_stats(
         raise HTTPException(status_code=500, detail=f"Stats error: {str(e)}")
 
 @app.get("/incidents/departments/{department}")
-def get_department_incidents(department: str):
+async def get_department_incidents(department: str):
     """Get incidents assigned to a specific department"""
     try:
-        sql = f"""
-            SELECT 
-                id, event_type, sub_category, description, location_name,
-                severity_level, priority_score, event_status, timestamp,
-                estimated_duration, actual_duration, resolution_notes
-            FROM `{os.getenv('PROJECT_ID')}.bengaluru_events.embeddings`
-            WHERE assigned_department = '{department}'
-            AND event_status IN ('reported', 'verified', 'in_progress')
-            ORDER BY priority_score DESC, timestamp DESC
-            LIMIT 50
-        """
-        
-        incidents = [dict(row) for row in bq.query(sql).result()]
+        incidents = await asyncio.to_thread(run_bq, DEPARTMENT_SQL, [
+            bigquery.ScalarQueryParameter("department", "STRING", department),
+        ])
         
         return {
             "department": department,
@@ -1,8 +1,9 @@
 import os
-import random
-import json
+import orjson
 import uuid
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
 from google.cloud import storage
 
 PROJECT_ID = os.getenv("PROJECT_ID")
@@ -67,64 +68,94 @@ def generate_keywords(event_type, sub_category, location_name, description):
     
     return list(set(keywords))[:10]  # Limit to 10 unique keywords
 
-def is_peak_hours(timestamp):
-    """Check if timestamp falls in peak hours (7-10 AM, 5-9 PM)"""
-    hour = timestamp.hour
-    return (7 <= hour <= 10) or (17 <= hour <= 21)
+def is_peak_hours(hours):
+    """Mask of hours that fall in peak hours (7-10 AM, 5-9 PM)"""
+    return ((hours >= 7) & (hours <= 10)) | ((hours >= 17) & (hours <= 21))
 
-def calculate_priority_score(severity, peak_hours, area_category, verification_count):
-    """Calculate priority score based on multiple factors"""
-    base_score = {"low": 0.2, "medium": 0.5, "high": 0.7, "critical": 0.9}[severity]
+SEVERITY_BASE_SCORES = np.array([0.2, 0.5, 0.7, 0.9])  # aligned with SEVERITY_LEVELS
+
+AREA_MULTIPLIER = {
+    "highway": 1.2, "metro_station": 1.1, "hospital_zone": 1.3,
+    "commercial": 1.0, "residential": 0.9, "industrial": 0.8, "government": 1.1
+}
+LOCATION_AREA_MULTIPLIERS = np.array([AREA_MULTIPLIER.get(loc["area"], 1.0) for loc in LOCATIONS])
+
+def calculate_priority_scores(severity_idx, peak_hours, location_idx, verification_count):
+    """Calculate priority scores for arrays of incidents based on multiple factors"""
+    base_score = SEVERITY_BASE_SCORES[severity_idx]
     
     # Adjust for peak hours
-    if peak_hours:
-        base_score += 0.1
+    base_score = base_score + 0.1 * peak_hours
     
     # Adjust for area category
-    area_multiplier = {
-        "highway": 1.2, "metro_station": 1.1, "hospital_zone": 1.3,
-        "commercial": 1.0, "residential": 0.9, "industrial": 0.8, "government": 1.1
-    }
-    base_score *= area_multiplier.get(area_category, 1.0)
+    base_score = base_score * LOCATION_AREA_MULTIPLIERS[location_idx]
     
     # Adjust for verification count
-    base_score += min(verification_count * 0.05, 0.2)
+    base_score = base_score + np.minimum(verification_count * 0.05, 0.2)
     
-    return min(base_score, 1.0)
+    return np.minimum(base_score, 1.0)
+
+DESCRIPTIONS = {
+    "traffic_accident": "Vehicle collision reported at {name} causing traffic disruption.",
+    "pothole": "Large pothole discovered on {name} affecting vehicle movement.",
+    "power_outage": "Power supply disruption reported in {name} area.",
+    "water_issue": "Water supply issue affecting residents near {name}.",
+    "construction": "Construction work ongoing at {name} with traffic diversions.",
+    "flooding": "Water logging reported at {name} due to heavy rainfall.",
+    "fire_incident": "Fire incident reported near {name} requiring immediate attention.",
+    "public_disturbance": "Public gathering/disturbance reported at {name}."
+}
+
+# Sample every random field for all incidents at once, then build the dicts
+NUM_INCIDENTS = int(os.getenv("NUM_INCIDENTS", "50"))
+rng = np.random.default_rng()
+n = NUM_INCIDENTS
+
+# Select random event type and subcategory
+event_type_names = list(EVENT_TYPES)
+subcategory_counts = np.array([len(EVENT_TYPES[e]) for e in event_type_names])
+event_idx = rng.integers(0, len(event_type_names), n)
+sub_idx = (rng.random(n) * subcategory_counts[event_idx]).astype(int)
+
+# Select random location
+location_idx = rng.integers(0, len(LOCATIONS), n)
+
+# Generate timestamps (last 30 days)
+offset_minutes = rng.integers(0, 31, n) * 1440 + rng.integers(0, 24, n) * 60 + rng.integers(0, 60, n)
+timestamps = np.datetime64(datetime.utcnow(), "s") - offset_minutes.astype("timedelta64[m]")
+hours = (timestamps.astype("datetime64[h]") - timestamps.astype("datetime64[D]")).astype(int)
+
+# Generate other fields
+severity_idx = rng.integers(0, len(SEVERITY_LEVELS), n)
+peak_hours = is_peak_hours(hours)
+verification_count = rng.integers(1, 16, n)
+priority_scores = np.round(calculate_priority_scores(severity_idx, peak_hours, location_idx, verification_count), 2)
+lat_jitter = rng.uniform(-0.01, 0.01, n)
+lon_jitter = rng.uniform(-0.01, 0.01, n)
+estimated_duration = rng.integers(30, 481, n)  # 30 minutes to 8 hours
+actual_duration = rng.integers(15, 601, n)
+has_actual_duration = rng.random(n) > 0.3
+impact_radius = rng.integers(100, 2001, n)
+verified = np.round(rng.uniform(0.5, 1.0, n), 2)
+reporter_ids = rng.integers(100000, 1000000, n)
+source_idx = rng.integers(0, len(SOURCES), n)
+media_idx = rng.integers(0, len(MEDIA_TYPES), n)
+status_idx = rng.integers(0, len(STATUSES), n)
+department_idx = rng.integers(0, len(DEPARTMENTS), n)
+resolver_idx = rng.integers(0, len(DEPARTMENTS), n)
+has_resolution = rng.random(n) > 0.4
+weather_idx = rng.integers(0, len(WEATHER_CONDITIONS), n)
+traffic_idx = rng.integers(0, len(TRAFFIC_DENSITIES), n)
+timestamp_strings = np.datetime_as_string(timestamps, unit="s")
 
-# Generate 50 incidents
 incidents = []
-for i in range(50):
-    # Select random event type and subcategory
-    event_type = random.choice(list(EVENT_TYPES.keys()))
-    sub_category = random.choice(EVENT_TYPES[event_type])
-    
-    # Select random location
-    location = random.choice(LOCATIONS)
-    
-    # Generate timestamp (last 30 days)
-    timestamp = datetime.utcnow() - timedelta(days=random.randint(0, 30), 
-                                            hours=random.randint(0, 23), 
-                                            minutes=random.randint(0, 59))
-    
-    # Generate description
-    descriptions = {
-        "traffic_accident": f"Vehicle collision reported at {location['name']} causing traffic disruption.",
-        "pothole": f"Large pothole discovered on {location['name']} affecting vehicle movement.",
-        "power_outage": f"Power supply disruption reported in {location['name']} area.",
-        "water_issue": f"Water supply issue affecting residents near {location['name']}.",
-        "construction": f"Construction work ongoing at {location['name']} with traffic diversions.",
-        "flooding": f"Water logging reported at {location['name']} due to heavy rainfall.",
-        "fire_incident": f"Fire incident reported near {location['name']} requiring immediate attention.",
-        "public_disturbance": f"Public gathering/disturbance reported at {location['name']}."
-    }
-    
-    description = descriptions.get(event_type, f"Incident reported at {location['name']}.")
-    
-    # Generate other fields
-    severity = random.choice(SEVERITY_LEVELS)
-    peak_hours = is_peak_hours(timestamp)
-    verification_count = random.randint(1, 15)
+media_uploads = []
+for i, (e, sub, loc, sev) in enumerate(zip(event_idx.tolist(), sub_idx.tolist(),
+                                           location_idx.tolist(), severity_idx.tolist())):
+    event_type = event_type_names[e]
+    sub_category = EVENT_TYPES[event_type][sub]
+    location = LOCATIONS[loc]
+    description = DESCRIPTIONS[event_type].format(name=location['name'])
     
     incident = {
         "id": f"INC_BLR_2025_{str(i+1).zfill(6)}",
@@ -133,39 +164,47 @@ for i in range(50):
         "description": description,
         "keywords": generate_keywords(event_type, sub_category, location['name'], description),
         "language": "en",
-        "coordinates": [location['coords'][0] + random.uniform(-0.01, 0.01), 
-                       location['coords'][1] + random.uniform(-0.01, 0.01)],
+        "coordinates": [location['coords'][0] + float(lat_jitter[i]), 
+                       location['coords'][1] + float(lon_jitter[i])],
         "location_name": location['name'],
         "area_category": location['area'],
         "ward_number": location['ward'],
         "pincode": location['pincode'],
-        "timestamp": timestamp.isoformat() + "Z",
-        "estimated_duration": random.randint(30, 480),  # 30 minutes to 8 hours
-        "actual_duration": random.randint(15, 600) if random.random() > 0.3 else None,
-        "peak_hours": peak_hours,
-        "severity_level": severity,
-        "priority_score": round(calculate_priority_score(severity, peak_hours, location['area'], verification_count), 2),
-        "impact_radius": random.randint(100, 2000),
-        "source": random.choice(SOURCES),
-        "verified": round(random.uniform(0.5, 1.0), 2),
-        "reporter_id": f"RPT_{random.randint(100000, 999999)}",
-        "verification_count": verification_count,
-        "media_type": random.choice(MEDIA_TYPES),
+        "timestamp": timestamp_strings[i] + "Z",
+        "estimated_duration": int(estimated_duration[i]),
+        "actual_duration": int(actual_duration[i]) if has_actual_duration[i] else None,
+        "peak_hours": bool(peak_hours[i]),
+        "severity_level": SEVERITY_LEVELS[sev],
+        "priority_score": float(priority_scores[i]),
+        "impact_radius": int(impact_radius[i]),
+        "source": SOURCES[source_idx[i]],
+        "verified": float(verified[i]),
+        "reporter_id": f"RPT_{reporter_ids[i]}",
+        "verification_count": int(verification_count[i]),
+        "media_type": MEDIA_TYPES[media_idx[i]],
         "media_url": f"https://storage.googleapis.com/citypulse-media/{event_type}_{i+1}.jpg",
-        "event_status": random.choice(STATUSES),
-        "assigned_department": random.choice(DEPARTMENTS),
-        "resolution_notes": f"Issue resolved by {random.choice(DEPARTMENTS)} team" if random.random() > 0.4 else None,
-        "weather_condition": random.choice(WEATHER_CONDITIONS),
-        "traffic_density": random.choice(TRAFFIC_DENSITIES)
+        "event_status": STATUSES[status_idx[i]],
+        "assigned_department": DEPARTMENTS[department_idx[i]],
+        "resolution_notes": f"Issue resolved by {DEPARTMENTS[resolver_idx[i]]} team" if has_resolution[i] else None,
+        "weather_condition": WEATHER_CONDITIONS[weather_idx[i]],
+        "traffic_density": TRAFFIC_DENSITIES[traffic_idx[i]]
     }
     
-    # Upload dummy media file
-    media_filename = f"{event_type}_{i+1}.jpg"
-    bucket.blob(media_filename).upload_from_string(b"fake_media_content")
+    # Dummy media file, uploaded with the rest below
+    media_uploads.append((f"{event_type}_{i+1}.jpg", b"fake_media_content"))
     
     incidents.append(incident)
 
+# Upload media concurrently (the storage client is thread-safe)
+def upload_media(upload):
+    filename, payload = upload
+    bucket.blob(filename).upload_from_string(payload)
+
+with ThreadPoolExecutor(max_workers=32) as executor:
+    list(executor.map(upload_media, media_uploads))
+
 # Save to JSON file
-json.dump(incidents, open("incidents.json", "w"), indent=2)
+with open("incidents.json", "wb") as f:
+    f.write(orjson.dumps(incidents, option=orjson.OPT_INDENT_2))
 print(f"Generated {len(incidents)} incidents and uploaded media to gs://{BUCKET}")
 print("incidents.json file created with comprehensive incident data")
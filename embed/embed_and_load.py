@@ -1,23 +1,60 @@
+import io
 import os
+import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import h3
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.api_core import exceptions as google_exceptions
 from google.cloud import aiplatform, bigquery
 from vertexai.language_models import TextEmbeddingModel
 from google.cloud import storage
 
-aiplatform.init(project=os.getenv("PROJECT_ID"), location="asia-south1")
+# Parquet rows follow the same BigQuery-to-Arrow type rules as the streaming bulk loader
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "streaming"))
+from realtime_processor import arrow_schema
+
+VERTEXAI_LOCATION = "asia-south1"
+aiplatform.init(project=os.getenv("PROJECT_ID"), location=VERTEXAI_LOCATION)
 model = TextEmbeddingModel.from_pretrained("textembedding-gecko@003")
 bq = bigquery.Client()
 
+# Texts per get_embeddings request; gecko takes 250 in us-central1 but only 5 in other regions
+EMBEDDING_BATCH_SIZE = int(os.getenv(
+    "VERTEXAI_EMBEDDING_LOCAL_BATCH_SIZE", "250" if VERTEXAI_LOCATION == "us-central1" else "5"
+))
+
+def embed_batch(batch):
+    """Embed one request's worth of texts, halving the request if it is rejected as too large"""
+    try:
+        return model.get_embeddings(batch)
+    except google_exceptions.InvalidArgument:
+        if len(batch) == 1:
+            raise
+        mid = len(batch) // 2
+        print(f"Embedding request of {len(batch)} texts rejected, retrying in halves")
+        return embed_batch(batch[:mid]) + embed_batch(batch[mid:])
+
 incidents = json.load(open("incidents.json"))
 rows = []
 
-for incident in incidents:
-    # Create text for embedding (combine description and keywords)
-    embedding_text = f"{incident['description']} {' '.join(incident['keywords'])}"
-    
-    # Generate text embedding
-    txt_emb = model.get_embeddings([embedding_text])[0].values  # 768-dim for gecko
+# Create text for embedding (combine description and keywords)
+texts = [f"{incident['description']} {' '.join(incident['keywords'])}" for incident in incidents]
+
+# Generate text embeddings a batch per request, with the batches in flight together
+batches = [texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+with ThreadPoolExecutor(max_workers=8) as executor:
+    embeddings = [emb for batch in executor.map(embed_batch, batches) for emb in batch]
+
+for incident, embedding in zip(incidents, embeddings):
+    # Stored unit-length (the prefix separately), so search can rank by
+    # Euclidean distance, which orders unit vectors the same as cosine
+    txt_emb = np.asarray(embedding.values)  # 768-dim for gecko
+    emb_256 = txt_emb[:256] / np.linalg.norm(txt_emb[:256])
+    txt_emb = txt_emb / np.linalg.norm(txt_emb)
     
     # Convert timestamp to proper format
     timestamp = datetime.fromisoformat(incident['timestamp'].replace('Z', '+00:00'))
@@ -30,11 +67,12 @@ for incident in incidents:
         "keywords": incident["keywords"],
         "language": incident["language"],
         "coordinates": incident["coordinates"],
+        "h3_cell_r9": h3.latlng_to_cell(incident["coordinates"][0], incident["coordinates"][1], 9),
         "location_name": incident["location_name"],
         "area_category": incident["area_category"],
         "ward_number": incident["ward_number"],
         "pincode": incident["pincode"],
-        "timestamp": timestamp.isoformat(),
+        "timestamp": timestamp,
         "estimated_duration": incident["estimated_duration"],
         "actual_duration": incident["actual_duration"],
         "peak_hours": incident["peak_hours"],
@@ -52,13 +90,27 @@ for incident in incidents:
         "resolution_notes": incident["resolution_notes"],
         "weather_condition": incident["weather_condition"],
         "traffic_density": incident["traffic_density"],
-        "embedding": [{"value": float(x)} for x in txt_emb]
+        "embedding": txt_emb.tolist(),
+        "embedding_256": emb_256.tolist()
     }
     rows.append(row)
 
-# Load into BigQuery
+# Load into BigQuery as Parquet, so embeddings travel as packed doubles; the
+# Arrow schema comes from the table, so columns keep their types and modes
+# even when a run leaves one entirely None
 table_id = f"{os.getenv('PROJECT_ID')}.bengaluru_events.embeddings"
-job = bq.load_table_from_json(rows, table_id)
+parquet_buffer = io.BytesIO()
+pq.write_table(pa.Table.from_pylist(rows, schema=arrow_schema(bq.get_table(table_id).schema)), parquet_buffer)
+parquet_buffer.seek(0)
+
+parquet_options = bigquery.ParquetOptions()
+parquet_options.enable_list_inference = True
+job_config = bigquery.LoadJobConfig(
+    source_format=bigquery.SourceFormat.PARQUET,
+    parquet_options=parquet_options
+)
+
+job = bq.load_table_from_file(parquet_buffer, table_id, job_config=job_config)
 job.result()  # Wait for completion
 print(f"Loaded {len(rows)} incident records with embeddings into {table_id}")
 
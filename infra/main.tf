@@ -82,7 +82,7 @@ resource "google_bigquery_table" "embeddings" {
     field = "timestamp"
   }
   
-  clustering = ["area_category", "event_type", "severity_level"]
+  clustering = ["h3_cell_r9", "area_category", "event_type", "severity_level"]
 }
 
 resource "google_bigquery_table" "real_time_incidents" {
@@ -98,6 +98,90 @@ resource "google_bigquery_table" "real_time_incidents" {
   clustering = ["priority_score", "event_status", "assigned_department"]
 }
 
+# Stakeholder tuples per day and geohash cell, so notification blasts
+# refine a few thousand cells instead of scanning raw incidents
+resource "google_bigquery_table" "stakeholder_cells" {
+  dataset_id = google_bigquery_dataset.events.dataset_id
+  table_id   = "stakeholder_cells"
+  
+  materialized_view {
+    query = <<-SQL
+      SELECT
+        TIMESTAMP_TRUNC(timestamp, DAY) AS day,
+        ST_GEOHASH(ST_GEOGPOINT(coordinates[OFFSET(1)], coordinates[OFFSET(0)]), 7) AS geohash,
+        assigned_department,
+        area_category,
+        ward_number,
+        COUNT(*) AS incident_count
+      FROM `${var.project_id}.${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.real_time_incidents.table_id}`
+      GROUP BY day, geohash, assigned_department, area_category, ward_number
+    SQL
+    enable_refresh      = true
+    refresh_interval_ms = 300000
+  }
+  
+  time_partitioning {
+    type  = "DAY"
+    field = "day"
+  }
+  
+  clustering = ["geohash"]
+}
+
+# Open incidents per department, clustered so the department endpoint
+# reads only its own department's blocks
+resource "google_bigquery_table" "mv_department_active" {
+  dataset_id = google_bigquery_dataset.events.dataset_id
+  table_id   = "mv_department_active"
+  
+  materialized_view {
+    query = <<-SQL
+      SELECT
+        assigned_department, id, event_type, sub_category, description, location_name,
+        severity_level, priority_score, event_status, timestamp,
+        estimated_duration, actual_duration, resolution_notes
+      FROM `${var.project_id}.${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.embeddings.table_id}`
+      WHERE event_status IN ('reported', 'verified', 'in_progress')
+    SQL
+    enable_refresh      = true
+    refresh_interval_ms = 300000
+  }
+  
+  clustering = ["assigned_department"]
+}
+
+# Hourly incident rollups that the stats endpoint aggregates instead of raw rows
+resource "google_bigquery_table" "mv_incident_stats_hourly" {
+  dataset_id = google_bigquery_dataset.events.dataset_id
+  table_id   = "mv_incident_stats_hourly"
+  
+  materialized_view {
+    query = <<-SQL
+      SELECT
+        TIMESTAMP_TRUNC(timestamp, HOUR) AS hour_bucket,
+        event_type,
+        severity_level,
+        area_category,
+        ward_number,
+        COUNT(*) AS incident_count,
+        SUM(priority_score) AS priority_sum,
+        SUM(verification_count) AS verification_sum,
+        COUNTIF(event_status = 'resolved') AS resolved_count
+      FROM `${var.project_id}.${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.embeddings.table_id}`
+      GROUP BY hour_bucket, event_type, severity_level, area_category, ward_number
+    SQL
+    enable_refresh      = true
+    refresh_interval_ms = 300000
+  }
+  
+  time_partitioning {
+    type  = "DAY"
+    field = "hour_bucket"
+  }
+  
+  clustering = ["ward_number", "area_category"]
+}
+
 resource "google_bigquery_table" "analytics" {
   dataset_id = google_bigquery_dataset.events.dataset_id
   table_id   = "analytics"
@@ -203,6 +287,16 @@ resource "google_firestore_database" "default" {
   depends_on = [google_project_service.required_apis]
 }
 
+# Expire cached agent LLM responses
+resource "google_firestore_field" "llm_response_cache_ttl" {
+  project    = var.project_id
+  database   = google_firestore_database.default.name
+  collection = "llm_response_cache"
+  field      = "expires_at"
+  
+  ttl_config {}
+}
+
 # 6. Cloud Functions for Event Processing
 resource "google_storage_bucket" "functions_source" {
   name     = "${var.project_id}-functions-source"
@@ -364,5 +458,8 @@ output "bigquery_tables" {
     embeddings        = "${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.embeddings.table_id}"
     real_time_incidents = "${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.real_time_incidents.table_id}"
     analytics         = "${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.analytics.table_id}"
+    stakeholder_cells = "${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.stakeholder_cells.table_id}"
+    mv_department_active     = "${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.mv_department_active.table_id}"
+    mv_incident_stats_hourly = "${google_bigquery_dataset.events.dataset_id}.${google_bigquery_table.mv_incident_stats_hourly.table_id}"
   }
 }
\ No newline at end of file
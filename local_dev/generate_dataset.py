@@ -1,327 +1,487 @@
 import json
-import random
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from datetime import datetime
+from typing import List, Optional
 import argparse
+import multiprocessing
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from itertools import repeat
+
+import numpy as np
+import orjson
+
+from generate_db import (
+    INSERT_INCIDENT_SQL, create_indexes, create_sample_agent_activities, create_tables, save_database
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Below this many incidents, process start-up costs more than it saves
+PARALLEL_THRESHOLD = 2000
+
+# Turns snake_case identifiers into display text ("power_outage" -> "power outage")
+DISPLAY_TABLE = str.maketrans("_", " ")
+
+@dataclass
+class IncidentColumns:
+    """Generated incidents stored column-wise, one list per field"""
+    id: List[str]
+    event_type: List[str]
+    sub_category: List[str]
+    description: List[str]
+    keywords: List[List[str]]
+    language: List[str]
+    latitude: List[float]
+    longitude: List[float]
+    location_name: List[str]
+    area_category: List[str]
+    ward_number: List[int]
+    pincode: List[int]
+    timestamp: List[str]
+    estimated_duration: List[int]
+    actual_duration: List[Optional[int]]
+    peak_hours: List[bool]
+    severity_level: List[str]
+    priority_score: List[float]
+    impact_radius: List[float]
+    source: List[str]
+    verified: List[bool]
+    reporter_id: List[Optional[str]]
+    verification_count: List[int]
+    media_type: List[Optional[str]]
+    media_url: List[Optional[str]]
+    event_status: List[str]
+    assigned_department: List[str]
+    resolution_notes: List[Optional[str]]
+    weather_condition: List[str]
+    traffic_density: List[str]
+    # Derived column: keywords pre-encoded as a JSON array for SQLite, not part of the dataset file
+    keywords_json: List[str] = field(default_factory=list, metadata={"derived": True})
+    
+    def __len__(self) -> int:
+        return len(self.id)
+    
+    def extend(self, other: "IncidentColumns"):
+        """Append another block's columns to this one"""
+        for f in fields(self):
+            getattr(self, f.name).extend(getattr(other, f.name))
+    
+    def rows(self):
+        """Iterate incidents as tuples in INCIDENT_FIELDS order"""
+        return zip(*(getattr(self, name) for name in INCIDENT_FIELDS))
+    
+    def db_rows(self, processed_at: str):
+        """Iterate incidents as parameter tuples for generate_db.INSERT_INCIDENT_SQL"""
+        return zip(
+            self.id, self.event_type, self.sub_category, self.description, self.keywords_json,
+            self.language, self.latitude, self.longitude, self.location_name, self.area_category,
+            self.ward_number, map(str, self.pincode), self.timestamp, repeat(processed_at),
+            self.estimated_duration, self.actual_duration, self.peak_hours, self.severity_level,
+            self.priority_score, self.impact_radius, self.source, self.verified, self.reporter_id,
+            self.verification_count, self.media_type, self.media_url, self.event_status,
+            self.assigned_department, self.resolution_notes, self.weather_condition,
+            self.traffic_density
+        )
+
+INCIDENT_FIELDS = tuple(f.name for f in fields(IncidentColumns) if not f.metadata.get("derived"))
+
+# Bengaluru-specific data
+EVENT_TYPES = {
+    "traffic_accident": (
+        "vehicle_collision", "pedestrian_accident", "motorcycle_accident", 
+        "bus_accident", "hit_and_run", "road_rage"
+    ),
+    "pothole": (
+        "major_pothole", "road_damage", "surface_deterioration",
+        "water_logging", "road_cave_in"
+    ),
+    "power_outage": (
+        "transformer_failure", "cable_fault", "scheduled_maintenance",
+        "overload_trip", "weather_damage"
+    ),
+    "water_supply": (
+        "pipe_burst", "low_pressure", "contamination", 
+        "pump_failure", "tank_overflow"
+    ),
+    "construction": (
+        "unauthorized_construction", "road_digging", "building_collapse",
+        "noise_complaint", "dust_pollution"
+    ),
+    "waste_management": (
+        "garbage_overflow", "illegal_dumping", "collection_delay",
+        "burning_waste", "blocked_drain"
+    ),
+    "street_lighting": (
+        "light_not_working", "damaged_pole", "cable_theft",
+        "insufficient_lighting", "flickering_lights"
+    ),
+    "tree_fall": (
+        "fallen_tree", "branch_fall", "tree_uprooting",
+        "storm_damage", "maintenance_required"
+    ),
+    "flooding": (
+        "road_flooding", "drain_overflow", "rainwater_stagnation",
+        "basement_flooding", "bridge_waterlogging"
+    ),
+    "fire_emergency": (
+        "building_fire", "vehicle_fire", "electrical_fire",
+        "forest_fire", "gas_leak"
+    )
+}
+
+# Bengaluru locations with realistic coordinates
+LOCATIONS = (
+    # Central Bengaluru
+    {"name": "MG Road", "lat": 12.9716, "lon": 77.5946, "ward": 132, "area": "central", "pincode": 560001},
+    {"name": "Brigade Road", "lat": 12.9719, "lon": 77.6037, "ward": 132, "area": "central", "pincode": 560001},
+    {"name": "Commercial Street", "lat": 12.9833, "lon": 77.6089, "ward": 132, "area": "central", "pincode": 560001},
+    
+    # South Bengaluru
+    {"name": "Koramangala", "lat": 12.9352, "lon": 77.6245, "ward": 150, "area": "south", "pincode": 560034},
+    {"name": "BTM Layout", "lat": 12.9165, "lon": 77.6101, "ward": 176, "area": "south", "pincode": 560029},
+    {"name": "Jayanagar", "lat": 12.9279, "lon": 77.5937, "ward": 167, "area": "south", "pincode": 560011},
+    {"name": "JP Nagar", "lat": 12.9081, "lon": 77.5831, "ward": 180, "area": "south", "pincode": 560078},
+    {"name": "Banashankari", "lat": 12.9248, "lon": 77.5562, "ward": 188, "area": "south", "pincode": 560070},
+    
+    # North Bengaluru
+    {"name": "Rajajinagar", "lat": 12.9991, "lon": 77.5554, "ward": 10, "area": "north", "pincode": 560010},
+    {"name": "Malleswaram", "lat": 13.0031, "lon": 77.5647, "ward": 76, "area": "north", "pincode": 560003},
+    {"name": "Seshadripuram", "lat": 12.9893, "lon": 77.5709, "ward": 91, "area": "north", "pincode": 560020},
+    {"name": "Yeshwantpur", "lat": 13.0284, "lon": 77.5544, "ward": 43, "area": "north", "pincode": 560022},
+    
+    # East Bengaluru
+    {"name": "Indiranagar", "lat": 12.9784, "lon": 77.6408, "ward": 86, "area": "east", "pincode": 560038},
+    {"name": "Whitefield", "lat": 12.9698, "lon": 77.7500, "ward": 84, "area": "east", "pincode": 560066},
+    {"name": "Marathahalli", "lat": 12.9591, "lon": 77.6974, "ward": 84, "area": "east", "pincode": 560037},
+    {"name": "HSR Layout", "lat": 12.9116, "lon": 77.6473, "ward": 165, "area": "east", "pincode": 560102},
+    {"name": "Electronic City", "lat": 12.8456, "lon": 77.6603, "ward": 195, "area": "east", "pincode": 560100},
+    
+    # West Bengaluru
+    {"name": "Vijayanagar", "lat": 12.9634, "lon": 77.5216, "ward": 108, "area": "west", "pincode": 560040},
+    {"name": "Rajajinagar", "lat": 12.9991, "lon": 77.5554, "ward": 10, "area": "west", "pincode": 560010},
+    {"name": "Basavanagudi", "lat": 12.9423, "lon": 77.5737, "ward": 155, "area": "west", "pincode": 560004},
+    {"name": "Kengeri", "lat": 12.9081, "lon": 77.4851, "ward": 198, "area": "west", "pincode": 560060},
+    
+    # Outer Bengaluru
+    {"name": "Yelahanka", "lat": 13.1007, "lon": 77.5963, "ward": 1, "area": "north", "pincode": 560064},
+    {"name": "Hebbal", "lat": 13.0358, "lon": 77.5970, "ward": 8, "area": "north", "pincode": 560024},
+    {"name": "Sarjapur", "lat": 12.9010, "lon": 77.6874, "ward": 183, "area": "east", "pincode": 560035},
+    {"name": "Bannerghatta", "lat": 12.8007, "lon": 77.5773, "ward": 196, "area": "south", "pincode": 560083}
+)
+
+# Department assignments based on incident type
+DEPARTMENT_MAPPING = {
+    "traffic_accident": ("Traffic Police", "Emergency Services"),
+    "pothole": ("BBMP", "BWSSB"),
+    "power_outage": ("BESCOM", "BBMP"),
+    "water_supply": ("BWSSB", "BBMP"),
+    "construction": ("BBMP", "BDA"),
+    "waste_management": ("BBMP",),
+    "street_lighting": ("BBMP", "BESCOM"),
+    "tree_fall": ("BBMP", "Forest Department"),
+    "flooding": ("BBMP", "BWSSB"),
+    "fire_emergency": ("Fire Department", "Emergency Services")
+}
+
+# Weather conditions affecting incidents
+WEATHER_CONDITIONS = (
+    "clear", "cloudy", "light_rain", "heavy_rain", 
+    "thunderstorm", "fog", "hot", "humid"
+)
+
+# Traffic density levels
+TRAFFIC_DENSITY = ("low", "medium", "high", "very_high")
+
+# Realistic descriptions for different incident types
+DESCRIPTION_TEMPLATES = {
+    "traffic_accident": (
+        "Two-wheeler collision at {location} junction causing traffic jam",
+        "Car accident near {location} metro station, ambulance required",
+        "Bus breakdown at {location} main road blocking traffic",
+        "Hit and run case reported at {location}, victim hospitalized",
+        "Multi-vehicle collision on {location} flyover during rush hour"
+    ),
+    "pothole": (
+        "Large pothole on {location} main road causing vehicle damage",
+        "Road cave-in at {location} after heavy rainfall",
+        "Multiple potholes on {location} causing traffic slowdown",
+        "Water-filled pothole at {location} junction creating hazard",
+        "Road surface deterioration at {location} needs immediate repair"
+    ),
+    "power_outage": (
+        "Transformer failure at {location} affecting 500+ households",
+        "Power cable fault in {location} area, restoration in progress",
+        "Scheduled maintenance causing power outage in {location}",
+        "Electrical overload trip at {location} substation",
+        "Storm damage to power lines in {location} vicinity"
+    ),
+    "water_supply": (
+        "Water pipe burst at {location} causing road flooding",
+        "Low water pressure complaints from {location} residents",
+        "Water contamination reported in {location} area",
+        "Pump failure at {location} water treatment plant",
+        "Water tank overflow at {location} causing wastage"
+    ),
+    "construction": (
+        "Unauthorized construction activity at {location}",
+        "Road digging work at {location} without proper permits",
+        "Building collapse risk at {location} construction site",
+        "Excessive noise from construction at {location}",
+        "Dust pollution from construction work in {location}"
+    )
+}
+
 class LocalDatasetGenerator:
     """Generate realistic 10k+ incident dataset for local testing"""
     
     def __init__(self):
-        # Bengaluru-specific data
-        self.event_types = {
-            "traffic_accident": [
-                "vehicle_collision", "pedestrian_accident", "motorcycle_accident", 
-                "bus_accident", "hit_and_run", "road_rage"
-            ],
-            "pothole": [
-                "major_pothole", "road_damage", "surface_deterioration",
-                "water_logging", "road_cave_in"
-            ],
-            "power_outage": [
-                "transformer_failure", "cable_fault", "scheduled_maintenance",
-                "overload_trip", "weather_damage"
-            ],
-            "water_supply": [
-                "pipe_burst", "low_pressure", "contamination", 
-                "pump_failure", "tank_overflow"
-            ],
-            "construction": [
-                "unauthorized_construction", "road_digging", "building_collapse",
-                "noise_complaint", "dust_pollution"
-            ],
-            "waste_management": [
-                "garbage_overflow", "illegal_dumping", "collection_delay",
-                "burning_waste", "blocked_drain"
-            ],
-            "street_lighting": [
-                "light_not_working", "damaged_pole", "cable_theft",
-                "insufficient_lighting", "flickering_lights"
-            ],
-            "tree_fall": [
-                "fallen_tree", "branch_fall", "tree_uprooting",
-                "storm_damage", "maintenance_required"
-            ],
-            "flooding": [
-                "road_flooding", "drain_overflow", "rainwater_stagnation",
-                "basement_flooding", "bridge_waterlogging"
-            ],
-            "fire_emergency": [
-                "building_fire", "vehicle_fire", "electrical_fire",
-                "forest_fire", "gas_leak"
-            ]
-        }
-        
-        # Bengaluru locations with realistic coordinates
-        self.locations = [
-            # Central Bengaluru
-            {"name": "MG Road", "lat": 12.9716, "lon": 77.5946, "ward": 132, "area": "central", "pincode": 560001},
-            {"name": "Brigade Road", "lat": 12.9719, "lon": 77.6037, "ward": 132, "area": "central", "pincode": 560001},
-            {"name": "Commercial Street", "lat": 12.9833, "lon": 77.6089, "ward": 132, "area": "central", "pincode": 560001},
-            
-            # South Bengaluru
-            {"name": "Koramangala", "lat": 12.9352, "lon": 77.6245, "ward": 150, "area": "south", "pincode": 560034},
-            {"name": "BTM Layout", "lat": 12.9165, "lon": 77.6101, "ward": 176, "area": "south", "pincode": 560029},
-            {"name": "Jayanagar", "lat": 12.9279, "lon": 77.5937, "ward": 167, "area": "south", "pincode": 560011},
-            {"name": "JP Nagar", "lat": 12.9081, "lon": 77.5831, "ward": 180, "area": "south", "pincode": 560078},
-            {"name": "Banashankari", "lat": 12.9248, "lon": 77.5562, "ward": 188, "area": "south", "pincode": 560070},
-            
-            # North Bengaluru
-            {"name": "Rajajinagar", "lat": 12.9991, "lon": 77.5554, "ward": 10, "area": "north", "pincode": 560010},
-            {"name": "Malleswaram", "lat": 13.0031, "lon": 77.5647, "ward": 76, "area": "north", "pincode": 560003},
-            {"name": "Seshadripuram", "lat": 12.9893, "lon": 77.5709, "ward": 91, "area": "north", "pincode": 560020},
-            {"name": "Yeshwantpur", "lat": 13.0284, "lon": 77.5544, "ward": 43, "area": "north", "pincode": 560022},
-            
-            # East Bengaluru
-            {"name": "Indiranagar", "lat": 12.9784, "lon": 77.6408, "ward": 86, "area": "east", "pincode": 560038},
-            {"name": "Whitefield", "lat": 12.9698, "lon": 77.7500, "ward": 84, "area": "east", "pincode": 560066},
-            {"name": "Marathahalli", "lat": 12.9591, "lon": 77.6974, "ward": 84, "area": "east", "pincode": 560037},
-            {"name": "HSR Layout", "lat": 12.9116, "lon": 77.6473, "ward": 165, "area": "east", "pincode": 560102},
-            {"name": "Electronic City", "lat": 12.8456, "lon": 77.6603, "ward": 195, "area": "east", "pincode": 560100},
-            
-            # West Bengaluru
-            {"name": "Vijayanagar", "lat": 12.9634, "lon": 77.5216, "ward": 108, "area": "west", "pincode": 560040},
-            {"name": "Rajajinagar", "lat": 12.9991, "lon": 77.5554, "ward": 10, "area": "west", "pincode": 560010},
-            {"name": "Basavanagudi", "lat": 12.9423, "lon": 77.5737, "ward": 155, "area": "west", "pincode": 560004},
-            {"name": "Kengeri", "lat": 12.9081, "lon": 77.4851, "ward": 198, "area": "west", "pincode": 560060},
-            
-            # Outer Bengaluru
-            {"name": "Yelahanka", "lat": 13.1007, "lon": 77.5963, "ward": 1, "area": "north", "pincode": 560064},
-            {"name": "Hebbal", "lat": 13.0358, "lon": 77.5970, "ward": 8, "area": "north", "pincode": 560024},
-            {"name": "Sarjapur", "lat": 12.9010, "lon": 77.6874, "ward": 183, "area": "east", "pincode": 560035},
-            {"name": "Bannerghatta", "lat": 12.8007, "lon": 77.5773, "ward": 196, "area": "south", "pincode": 560083}
+        # Lookup tables indexed by integer event type id, built once so the
+        # per-incident work is plain tuple indexing
+        self._event_types_list = list(EVENT_TYPES.keys())
+        self._sub_categories = [EVENT_TYPES[k] for k in self._event_types_list]
+        self._descriptions = [
+            DESCRIPTION_TEMPLATES.get(k, ("Incident reported at {location} requiring attention",))
+            for k in self._event_types_list
         ]
-        
-        # Department assignments based on incident type
-        self.department_mapping = {
-            "traffic_accident": ["Traffic Police", "Emergency Services"],
-            "pothole": ["BBMP", "BWSSB"],
-            "power_outage": ["BESCOM", "BBMP"],
-            "water_supply": ["BWSSB", "BBMP"],
-            "construction": ["BBMP", "BDA"],
-            "waste_management": ["BBMP"],
-            "street_lighting": ["BBMP", "BESCOM"],
-            "tree_fall": ["BBMP", "Forest Department"],
-            "flooding": ["BBMP", "BWSSB"],
-            "fire_emergency": ["Fire Department", "Emergency Services"]
+        self._departments = [DEPARTMENT_MAPPING.get(k, ("BBMP",)) for k in self._event_types_list]
+        self._event_display = [k.translate(DISPLAY_TABLE) for k in self._event_types_list]
+        self._sub_category_display = [tuple(sub.translate(DISPLAY_TABLE) for sub in subs) for subs in self._sub_categories]
+        contextual_keywords = {
+            "traffic_accident": ("traffic", "accident", "collision"),
+            "power_outage": ("electricity", "power", "outage"),
+            "water_supply": ("water", "supply", "pipe"),
         }
-        
-        # Weather conditions affecting incidents
-        self.weather_conditions = [
-            "clear", "cloudy", "light_rain", "heavy_rain", 
-            "thunderstorm", "fog", "hot", "humid"
+        self._keywords_extra = [contextual_keywords.get(k, ()) for k in self._event_types_list]
+        
+        # JSON-encoded keyword fragments, so each incident's keyword array is
+        # assembled by string concatenation instead of a json.dumps call
+        self._keywords_json_head = [json.dumps(d) for d in self._event_display]
+        self._keywords_json_tail = [
+            tuple(",".join(json.dumps(kw) for kw in (sub, *self._keywords_extra[i])) for sub in subs)
+            for i, subs in enumerate(self._sub_category_display)
         ]
+        self._location_keywords_json = [f'{json.dumps(loc["name"])},{json.dumps(loc["area"])}' for loc in LOCATIONS]
+        self._is_high_priority = np.array(
+            [k in {"fire_emergency", "traffic_accident", "flooding"} for k in self._event_types_list])
+        self._is_wide_impact = np.array(
+            [k in {"flooding", "fire_emergency", "power_outage"} for k in self._event_types_list])
+        self._sub_counts = np.array([len(subs) for subs in self._sub_categories])
+        self._description_counts = np.array([len(d) for d in self._descriptions])
+        self._department_counts = np.array([len(d) for d in self._departments])
+        self._location_lat = np.array([loc["lat"] for loc in LOCATIONS])
+        self._location_lon = np.array([loc["lon"] for loc in LOCATIONS])
+        self._location_is_central = np.array([loc["area"] == "central" for loc in LOCATIONS])
+        
+        # Weighted categories sampled by searching a precomputed cumulative distribution
+        self._severity_levels = ("low", "medium", "high")
+        self._severity_cdf = np.array([0.5, 0.8, 1.0])
+        self._statuses = ("reported", "in_progress", "resolved")
+        self._status_cdf = np.array([0.4, 0.7, 1.0])
+    
+    def generate_incidents(self, start: int, count: int, base_time: datetime,
+                           rng: np.random.Generator) -> "IncidentColumns":
+        """Generate a block of realistic incidents with IDs starting after `start`
+
+        Every random field is sampled as a whole column up front, and the
+        incidents are returned column-wise without building a dict per row.
+        """
+        # Select random event type, sub category and location
+        event_idx = rng.integers(0, len(self._event_types_list), count)
+        sub_idx = (rng.random(count) * self._sub_counts[event_idx]).astype(int)
+        description_idx = (rng.random(count) * self._description_counts[event_idx]).astype(int)
+        department_idx = (rng.random(count) * self._department_counts[event_idx]).astype(int)
+        location_idx = rng.integers(0, len(LOCATIONS), count)
+        
+        # Realistic timestamp offsets (spread over last 90 days)
+        offset_minutes = (rng.integers(0, 91, count) * 1440
+                          + rng.integers(0, 24, count) * 60
+                          + rng.integers(0, 60, count))
+        
+        timestamps = np.datetime64(base_time.replace(microsecond=0), "s") - offset_minutes.astype("timedelta64[m]")
+        
+        # Peak hours detection (7-10 AM, 5-8 PM) on the hour of day of each timestamp
+        hour = timestamps.astype("datetime64[h]").astype(np.int64) % 24
+        peak_hours = ((hour >= 7) & (hour <= 10)) | ((hour >= 17) & (hour <= 20))
+        
+        # Severity and status
+        severity_idx = np.searchsorted(self._severity_cdf, rng.random(count), side="right")
+        status_idx = np.searchsorted(self._status_cdf, rng.random(count), side="right")
         
-        # Traffic density levels
-        self.traffic_density = ["low", "medium", "high", "very_high"]
-        
-        # Realistic descriptions for different incident types
-        self.description_templates = {
-            "traffic_accident": [
-                "Two-wheeler collision at {location} junction causing traffic jam",
-                "Car accident near {location} metro station, ambulance required",
-                "Bus breakdown at {location} main road blocking traffic",
-                "Hit and run case reported at {location}, victim hospitalized",
-                "Multi-vehicle collision on {location} flyover during rush hour"
+        # Priority score based on severity, location, and event type
+        priority_score = (np.array([3, 6, 8])[severity_idx]
+                          + self._location_is_central[location_idx]
+                          + self._is_high_priority[event_idx]
+                          + rng.uniform(-1, 1, count))
+        priority_score = np.round(np.clip(priority_score, 1, 10), 2)
+        
+        # Impact radius based on severity and event type
+        impact_radius = (np.array([0.5, 1.0, 2.0])[severity_idx]
+                         * np.where(self._is_wide_impact[event_idx], 1.5, 1.0))
+        impact_radius = np.round(impact_radius + rng.uniform(-0.2, 0.3, count), 2)
+        
+        # Durations: 30 minutes to 8 hours, 30% with a differing actual duration
+        estimated_duration = rng.integers(30, 481, count)
+        actual_duration = (estimated_duration * rng.uniform(0.5, 2.0, count)).astype(int)
+        has_actual_duration = rng.random(count) < 0.3
+        
+        # Media (20%) and verification (70%)
+        has_media = rng.random(count) < 0.2
+        media_idx = rng.integers(0, 2, count)
+        verified = rng.random(count) < 0.7
+        verification_count = np.where(verified, rng.integers(1, 6, count), 0)
+        reporter_ids = rng.integers(1000, 10000, count)
+        
+        # Coordinates with some variance
+        latitude = np.round(self._location_lat[location_idx] + rng.uniform(-0.005, 0.005, count), 6)
+        longitude = np.round(self._location_lon[location_idx] + rng.uniform(-0.005, 0.005, count), 6)
+        
+        source_idx = rng.integers(0, 4, count)
+        weather_idx = rng.integers(0, len(WEATHER_CONDITIONS), count)
+        traffic_idx = rng.integers(0, len(TRAFFIC_DENSITY), count)
+        
+        media_types = ("image", "video")
+        sources = ("citizen_report", "sensor", "patrol", "emergency_call")
+        
+        # Plain Python scalars so the output stays JSON-serializable
+        (event_idx, sub_idx, description_idx, department_idx, location_idx,
+         status_idx, actual_duration, has_actual_duration, has_media, media_idx, verified,
+         reporter_ids) = (column.tolist() for column in (
+            event_idx, sub_idx, description_idx, department_idx, location_idx,
+            status_idx, actual_duration, has_actual_duration, has_media, media_idx, verified,
+            reporter_ids))
+        locations = [LOCATIONS[l] for l in location_idx]
+        ids = [f"BLR_HIST_{str(n).zfill(6)}" for n in range(start + 1, start + count + 1)]
+        event_status = [self._statuses[x] for x in status_idx]
+        assigned_department = [self._departments[e][d] for e, d in zip(event_idx, department_idx)]
+        media_type = [media_types[m] if has else None for m, has in zip(media_idx, has_media)]
+        
+        return IncidentColumns(
+            id=ids,
+            event_type=[self._event_types_list[e] for e in event_idx],
+            sub_category=[self._sub_categories[e][sub] for e, sub in zip(event_idx, sub_idx)],
+            description=[
+                self._descriptions[e][d].format(location=loc["name"])
+                for e, d, loc in zip(event_idx, description_idx, locations)
             ],
-            "pothole": [
-                "Large pothole on {location} main road causing vehicle damage",
-                "Road cave-in at {location} after heavy rainfall",
-                "Multiple potholes on {location} causing traffic slowdown",
-                "Water-filled pothole at {location} junction creating hazard",
-                "Road surface deterioration at {location} needs immediate repair"
+            # Event type, location and sub category, plus contextual keywords for some types
+            keywords=[
+                [self._event_display[e], loc["name"], loc["area"],
+                 self._sub_category_display[e][sub], *self._keywords_extra[e]]
+                for e, sub, loc in zip(event_idx, sub_idx, locations)
             ],
-            "power_outage": [
-                "Transformer failure at {location} affecting 500+ households",
-                "Power cable fault in {location} area, restoration in progress",
-                "Scheduled maintenance causing power outage in {location}",
-                "Electrical overload trip at {location} substation",
-                "Storm damage to power lines in {location} vicinity"
+            language=["en"] * count,
+            keywords_json=[
+                f"[{self._keywords_json_head[e]},{self._location_keywords_json[l]},{self._keywords_json_tail[e][sub]}]"
+                for e, sub, l in zip(event_idx, sub_idx, location_idx)
             ],
-            "water_supply": [
-                "Water pipe burst at {location} causing road flooding",
-                "Low water pressure complaints from {location} residents",
-                "Water contamination reported in {location} area",
-                "Pump failure at {location} water treatment plant",
-                "Water tank overflow at {location} causing wastage"
+            latitude=latitude.tolist(),
+            longitude=longitude.tolist(),
+            location_name=[loc["name"] for loc in locations],
+            area_category=[loc["area"] for loc in locations],
+            ward_number=[loc["ward"] for loc in locations],
+            pincode=[loc["pincode"] for loc in locations],
+            timestamp=[t + "Z" for t in np.datetime_as_string(timestamps, unit="s").tolist()],
+            estimated_duration=estimated_duration.tolist(),
+            actual_duration=[a if has else None for a, has in zip(actual_duration, has_actual_duration)],
+            peak_hours=peak_hours.tolist(),
+            severity_level=[self._severity_levels[x] for x in severity_idx.tolist()],
+            priority_score=priority_score.tolist(),
+            impact_radius=impact_radius.tolist(),
+            source=[sources[x] for x in source_idx.tolist()],
+            verified=verified,
+            reporter_id=[f"user_{r}" if v else None for r, v in zip(reporter_ids, verified)],
+            verification_count=verification_count.tolist(),
+            media_type=media_type,
+            media_url=[f"gs://city-pulse-media/{i}.{m}" if m else None for i, m in zip(ids, media_type)],
+            event_status=event_status,
+            assigned_department=assigned_department,
+            resolution_notes=[
+                f"Resolved by {dept}" if status == "resolved" else None
+                for dept, status in zip(assigned_department, event_status)
             ],
-            "construction": [
-                "Unauthorized construction activity at {location}",
-                "Road digging work at {location} without proper permits",
-                "Building collapse risk at {location} construction site",
-                "Excessive noise from construction at {location}",
-                "Dust pollution from construction work in {location}"
-            ]
-        }
-    
-    def generate_incident(self, incident_id: str, base_time: datetime) -> Dict[str, Any]:
-        """Generate a single realistic incident"""
-        
-        # Select random event type and location
-        event_type = random.choice(list(self.event_types.keys()))
-        sub_category = random.choice(self.event_types[event_type])
-        location = random.choice(self.locations)
-        
-        # Generate realistic timestamp (spread over last 90 days)
-        days_ago = random.randint(0, 90)
-        hours_offset = random.randint(0, 23)
-        minutes_offset = random.randint(0, 59)
-        
-        timestamp = base_time - timedelta(
-            days=days_ago, 
-            hours=hours_offset, 
-            minutes=minutes_offset
-        )
-        
-        # Generate description
-        description_template = random.choice(
-            self.description_templates.get(event_type, [
-                "Incident reported at {location} requiring attention"
-            ])
+            weather_condition=[WEATHER_CONDITIONS[x] for x in weather_idx.tolist()],
+            traffic_density=[TRAFFIC_DENSITY[x] for x in traffic_idx.tolist()]
         )
-        description = description_template.format(location=location["name"])
-        
-        # Generate keywords
-        keywords = [
-            event_type.replace("_", " "),
-            location["name"],
-            location["area"],
-            sub_category.replace("_", " ")
+    
+    def _generate_blocks(self, count: int, base_time: datetime):
+        """Yield generated incidents in id order, one block at a time"""
+        if count < PARALLEL_THRESHOLD:
+            yield self.generate_incidents(0, count, base_time, np.random.default_rng())
+            return
+        
+        # Independent blocks, one RNG stream per block
+        workers = os.cpu_count() or 1
+        chunk_size = -(-count // workers)
+        seeds = np.random.SeedSequence().spawn(workers)
+        chunks = [
+            (start, min(start + chunk_size, count), base_time, seed)
+            for start, seed in zip(range(0, count, chunk_size), seeds)
         ]
+        # Forked workers inherit the module-level tables instead of re-importing them
+        mp_context = multiprocessing.get_context("fork") if sys.platform == "linux" else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            yield from executor.map(_worker_generate, chunks)
+    
+    def _write_json(self, blocks, count: int, output_file: str) -> IncidentColumns:
+        """Stream generated blocks into a JSON array file"""
+        incidents = None
+        
+        # Stream each block to disk as it arrives instead of dumping the whole list at the end
+        with open(output_file, 'wb') as f:
+            f.write(b'[\n')
+            separator = b''
+            for block in blocks:
+                for row in block.rows():
+                    f.write(separator)
+                    f.write(orjson.dumps(dict(zip(INCIDENT_FIELDS, row))))
+                    separator = b',\n'
+                if incidents is None:
+                    incidents = block
+                else:
+                    incidents.extend(block)
+                logger.info(f"✅ Generated {len(incidents)}/{count} incidents")
+            f.write(b'\n]\n')
         
-        # Add contextual keywords
-        if event_type == "traffic_accident":
-            keywords.extend(["traffic", "accident", "collision"])
-        elif event_type == "power_outage":
-            keywords.extend(["electricity", "power", "outage"])
-        elif event_type == "water_supply":
-            keywords.extend(["water", "supply", "pipe"])
-        
-        # Determine severity and priority
-        severity_weights = {"low": 0.5, "medium": 0.3, "high": 0.2}
-        severity_level = random.choices(
-            list(severity_weights.keys()), 
-            weights=list(severity_weights.values())
-        )[0]
-        
-        # Priority score based on severity, location, and event type
-        base_priority = {"low": 3, "medium": 6, "high": 8}[severity_level]
-        
-        # Adjust priority based on location (central areas get higher priority)
-        if location["area"] == "central":
-            base_priority += 1
-        
-        # Adjust priority based on event type
-        high_priority_events = ["fire_emergency", "traffic_accident", "flooding"]
-        if event_type in high_priority_events:
-            base_priority += 1
-        
-        # Add some randomness
-        priority_score = min(10, max(1, base_priority + random.uniform(-1, 1)))
-        
-        # Determine department
-        possible_departments = self.department_mapping.get(event_type, ["BBMP"])
-        assigned_department = random.choice(possible_departments)
-        
-        # Generate durations
-        estimated_duration = random.randint(30, 480)  # 30 minutes to 8 hours
-        
-        # Sometimes actual duration differs from estimated
-        if random.random() < 0.3:  # 30% chance of duration variance
-            actual_duration = int(estimated_duration * random.uniform(0.5, 2.0))
-        else:
-            actual_duration = None
-        
-        # Peak hours detection (7-10 AM, 5-8 PM)
-        hour = timestamp.hour
-        peak_hours = (7 <= hour <= 10) or (17 <= hour <= 20)
-        
-        # Event status
-        status_weights = {"reported": 0.4, "in_progress": 0.3, "resolved": 0.3}
-        event_status = random.choices(
-            list(status_weights.keys()),
-            weights=list(status_weights.values())
-        )[0]
-        
-        # Media information (some incidents have media)
-        media_type = None
-        media_url = None
-        if random.random() < 0.2:  # 20% have media
-            media_type = random.choice(["image", "video"])
-            media_url = f"gs://city-pulse-media/{incident_id}.{media_type}"
-        
-        # Verification information
-        verified = random.random() < 0.7  # 70% are verified
-        verification_count = random.randint(1, 5) if verified else 0
-        
-        # Generate coordinates with some variance
-        latitude = location["lat"] + random.uniform(-0.005, 0.005)
-        longitude = location["lon"] + random.uniform(-0.005, 0.005)
-        
-        # Impact radius based on severity and event type
-        base_radius = {"low": 0.5, "medium": 1.0, "high": 2.0}[severity_level]
-        if event_type in ["flooding", "fire_emergency", "power_outage"]:
-            base_radius *= 1.5
-        impact_radius = base_radius + random.uniform(-0.2, 0.3)
-        
-        return {
-            "id": incident_id,
-            "event_type": event_type,
-            "sub_category": sub_category,
-            "description": description,
-            "keywords": keywords,
-            "language": "en",
-            "latitude": round(latitude, 6),
-            "longitude": round(longitude, 6),
-            "location_name": location["name"],
-            "area_category": location["area"],
-            "ward_number": location["ward"],
-            "pincode": location["pincode"],
-            "timestamp": timestamp.isoformat() + "Z",
-            "estimated_duration": estimated_duration,
-            "actual_duration": actual_duration,
-            "peak_hours": peak_hours,
-            "severity_level": severity_level,
-            "priority_score": round(priority_score, 2),
-            "impact_radius": round(impact_radius, 2),
-            "source": random.choice(["citizen_report", "sensor", "patrol", "emergency_call"]),
-            "verified": verified,
-            "reporter_id": f"user_{random.randint(1000, 9999)}" if verified else None,
-            "verification_count": verification_count,
-            "media_type": media_type,
-            "media_url": media_url,
-            "event_status": event_status,
-            "assigned_department": assigned_department,
-            "resolution_notes": f"Resolved by {assigned_department}" if event_status == "resolved" else None,
-            "weather_condition": random.choice(self.weather_conditions),
-            "traffic_density": random.choice(self.traffic_density)
-        }
+        return incidents
+    
+    def _write_sqlite(self, blocks, count: int, output_file: str) -> IncidentColumns:
+        """Insert generated blocks straight into a local SQLite database, skipping the JSON file"""
+        conn, cursor = create_tables(output_file)
+        processed_at = datetime.utcnow().isoformat() + 'Z'
+        incidents = None
+        
+        cursor.execute("BEGIN")
+        for block in blocks:
+            cursor.executemany(INSERT_INCIDENT_SQL, block.db_rows(processed_at))
+            if incidents is None:
+                incidents = block
+            else:
+                incidents.extend(block)
+            logger.info(f"✅ Generated {len(incidents)}/{count} incidents")
+        create_sample_agent_activities(cursor)
+        create_indexes(cursor)
+        conn.commit()
+        
+        save_database(conn, output_file)
+        conn.close()
+        return incidents
     
-    def generate_dataset(self, count: int = 10000, output_file: str = "historical_incidents.json") -> List[Dict[str, Any]]:
+    def generate_dataset(self, count: int = 10000, output_file: str = "historical_incidents.json") -> IncidentColumns:
         """Generate complete dataset of incidents"""
         
         logger.info(f"🏗️  Generating {count} realistic Bengaluru incidents...")
         
-        base_time = datetime.utcnow()
-        incidents = []
-        
-        for i in range(count):
-            incident_id = f"BLR_HIST_{str(i+1).zfill(6)}"
-            incident = self.generate_incident(incident_id, base_time)
-            incidents.append(incident)
-            
-            # Progress logging
-            if (i + 1) % 1000 == 0:
-                logger.info(f"✅ Generated {i+1}/{count} incidents")
-        
-        # Save to file
-        with open(output_file, 'w') as f:
-            json.dump(incidents, f, indent=2)
+        blocks = self._generate_blocks(count, datetime.utcnow())
+        if output_file.endswith('.db'):
+            incidents = self._write_sqlite(blocks, count, output_file)
+        else:
+            incidents = self._write_json(blocks, count, output_file)
         
         logger.info(f"💾 Dataset saved to {output_file}")
         
@@ -330,7 +490,7 @@ class LocalDatasetGenerator:
         
         return incidents
     
-    def print_dataset_statistics(self, incidents: List[Dict[str, Any]]):
+    def print_dataset_statistics(self, incidents: IncidentColumns):
         """Print dataset statistics"""
         
         print("\n" + "="*60)
@@ -341,21 +501,15 @@ class LocalDatasetGenerator:
         print(f"📋 Total Incidents: {len(incidents)}")
         
         # Event type distribution
-        event_types = {}
-        for incident in incidents:
-            event_type = incident["event_type"]
-            event_types[event_type] = event_types.get(event_type, 0) + 1
+        event_types = Counter(incidents.event_type)
         
         print("\n🏷️  Event Type Distribution:")
-        for event_type, count in sorted(event_types.items(), key=lambda x: x[1], reverse=True):
+        for event_type, count in event_types.most_common():
             percentage = (count / len(incidents)) * 100
             print(f"   {event_type}: {count} ({percentage:.1f}%)")
         
         # Severity distribution
-        severity_levels = {}
-        for incident in incidents:
-            severity = incident["severity_level"]
-            severity_levels[severity] = severity_levels.get(severity, 0) + 1
+        severity_levels = Counter(incidents.severity_level)
         
         print("\n⚠️  Severity Distribution:")
         for severity, count in severity_levels.items():
@@ -363,21 +517,18 @@ class LocalDatasetGenerator:
             print(f"   {severity}: {count} ({percentage:.1f}%)")
         
         # Department distribution
-        departments = {}
-        for incident in incidents:
-            dept = incident["assigned_department"]
-            departments[dept] = departments.get(dept, 0) + 1
+        departments = Counter(incidents.assigned_department)
         
         print("\n🏢 Department Distribution:")
-        for dept, count in sorted(departments.items(), key=lambda x: x[1], reverse=True):
+        for dept, count in departments.most_common():
             percentage = (count / len(incidents)) * 100
             print(f"   {dept}: {count} ({percentage:.1f}%)")
         
         # Priority statistics
-        priorities = [incident["priority_score"] for incident in incidents]
-        high_priority = len([p for p in priorities if p >= 8.0])
-        medium_priority = len([p for p in priorities if 6.0 <= p < 8.0])
-        low_priority = len([p for p in priorities if p < 6.0])
+        priorities = np.asarray(incidents.priority_score)
+        high_priority = int((priorities >= 8.0).sum())
+        medium_priority = int(((priorities >= 6.0) & (priorities < 8.0)).sum())
+        low_priority = int((priorities < 6.0).sum())
         
         print("\n🎯 Priority Distribution:")
         print(f"   High (≥8.0): {high_priority} ({(high_priority/len(incidents)*100):.1f}%)")
@@ -385,10 +536,7 @@ class LocalDatasetGenerator:
         print(f"   Low (<6.0): {low_priority} ({(low_priority/len(incidents)*100):.1f}%)")
         
         # Area distribution
-        areas = {}
-        for incident in incidents:
-            area = incident["area_category"]
-            areas[area] = areas.get(area, 0) + 1
+        areas = Counter(incidents.area_category)
         
         print("\n🗺️  Area Distribution:")
         for area, count in areas.items():
@@ -397,13 +545,19 @@ class LocalDatasetGenerator:
         
         print("="*60)
 
+def _worker_generate(chunk) -> IncidentColumns:
+    """Generate incidents [start, end) in a worker process"""
+    start, end, base_time, seed = chunk
+    return LocalDatasetGenerator().generate_incidents(start, end - start, base_time, np.random.default_rng(seed))
+
 def main():
     """Main function to generate dataset"""
     parser = argparse.ArgumentParser(description="Generate realistic Bengaluru incident dataset")
     parser.add_argument("--count", type=int, default=10000,
                        help="Number of incidents to generate (default: 10000)")
     parser.add_argument("--output", default="historical_incidents.json",
-                       help="Output file name (default: historical_incidents.json)")
+                       help="Output file name; a .db name writes a SQLite database directly "
+                            "(default: historical_incidents.json)")
     
     args = parser.parse_args()
     
@@ -6,23 +6,47 @@ Creates both incidents and agent_activities tables
 
 import sqlite3
 import json
+import mmap
 import os
 from datetime import datetime
 
+import orjson
+
 # Paths
 JSON_FILE = 'incidents_data.json'
 DB_FILE = 'local_incidents.db'
 
-def create_database():
-    """Create the SQLite database with proper schema"""
+# incidents table columns, in INSERT order
+INCIDENT_COLUMNS = (
+    'id', 'event_type', 'sub_category', 'description', 'keywords', 'language',
+    'latitude', 'longitude', 'location_name', 'area_category', 'ward_number', 'pincode',
+    'timestamp', 'processed_at', 'estimated_duration', 'actual_duration', 'peak_hours',
+    'severity_level', 'priority_score', 'impact_radius', 'source', 'verified',
+    'reporter_id', 'verification_count', 'media_type', 'media_url', 'event_status',
+    'assigned_department', 'resolution_notes', 'weather_condition', 'traffic_density'
+)
+
+# Positional form for row tuples, named form for incident dicts
+INSERT_INCIDENT_SQL = (
+    f"INSERT INTO incidents ({', '.join(INCIDENT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(INCIDENT_COLUMNS))})"
+)
+INSERT_INCIDENT_NAMED_SQL = (
+    f"INSERT INTO incidents ({', '.join(INCIDENT_COLUMNS)}) "
+    f"VALUES ({', '.join(':' + column for column in INCIDENT_COLUMNS)})"
+)
+INCIDENT_COLUMNS_SET = frozenset(INCIDENT_COLUMNS)
+
+def create_tables(db_file=DB_FILE):
+    """Create the SQLite database tables; indexes are added after loading by create_indexes"""
     
     # Remove existing database if it exists
-    if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
-        print(f"🗑️  Removed existing {DB_FILE}")
+    if os.path.exists(db_file):
+        os.remove(db_file)
+        print(f"🗑️  Removed existing {db_file}")
     
-    # Connect to database (creates new file)
-    conn = sqlite3.connect(DB_FILE)
+    # Stage everything in memory; save_database copies it to db_file in one pass
+    conn = sqlite3.connect(':memory:')
     cursor = conn.cursor()
     
     # Create incidents table
@@ -77,98 +101,109 @@ def create_database():
     ''')
     print("✅ Created agent_activities table")
     
-    # Create indexes for better performance
+    conn.commit()
+    return conn, cursor
+
+def create_indexes(cursor):
+    """Create the query indexes once the tables are populated"""
+    # A single sorted build per index is cheaper than maintaining them through every insert
     cursor.execute('CREATE INDEX idx_incidents_timestamp ON incidents(timestamp)')
     cursor.execute('CREATE INDEX idx_incidents_priority ON incidents(priority_score)')
     cursor.execute('CREATE INDEX idx_incidents_location ON incidents(latitude, longitude)')
     cursor.execute('CREATE INDEX idx_incidents_status ON incidents(event_status)')
-    cursor.execute('CREATE INDEX idx_agent_activities_timestamp ON agent_activities(timestamp)')
+    cursor.execute('CREATE INDEX idx_incidents_processed_at ON incidents(processed_at)')
+    # agent_name rides along so the per-agent recent-activity count never visits the table
+    cursor.execute('CREATE INDEX idx_agent_activities_timestamp ON agent_activities(timestamp, agent_name)')
     cursor.execute('CREATE INDEX idx_agent_activities_agent ON agent_activities(agent_name)')
+    # Point boxes keyed by incident rowid, so radius queries prefilter by bounding box
+    cursor.execute('CREATE VIRTUAL TABLE incidents_rtree USING rtree(id, minLat, maxLat, minLon, maxLon)')
+    cursor.execute('''
+        INSERT INTO incidents_rtree
+        SELECT rowid, latitude, latitude, longitude, longitude FROM incidents
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    ''')
     print("✅ Created database indexes")
-    
-    conn.commit()
-    return conn, cursor
+
+def save_database(conn, db_file=DB_FILE):
+    """Copy the in-memory staging database to db_file"""
+    disk = sqlite3.connect(db_file)
+    disk.execute('PRAGMA journal_mode=WAL')
+    conn.backup(disk)
+    disk.close()
+    print(f"💾 Saved database to {db_file}")
 
 def load_incidents_data():
     """Load incidents from JSON file"""
     try:
-        with open(JSON_FILE, 'r') as f:
-            data = json.load(f)
+        with open(JSON_FILE, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = orjson.loads(memoryview(mm))
         print(f"✅ Loaded {len(data)} incidents from {JSON_FILE}")
         return data
     except Exception as e:
         print(f"❌ Error loading JSON data: {e}")
         return []
 
+def _prepare_incident(incident, processed_at, keywords_json):
+    """Normalize a loaded incident in place into INSERT_INCIDENT_NAMED_SQL parameters"""
+    # Convert coordinates array to separate lat/lng if needed
+    coordinates = incident.get('coordinates')
+    if isinstance(coordinates, list):
+        incident['latitude'] = coordinates[0]
+        incident['longitude'] = coordinates[1]
+    
+    # Convert verified to boolean if it's a float
+    verified = incident.get('verified', True)
+    if isinstance(verified, float):
+        verified = verified >= 0.5
+    incident['verified'] = verified
+    
+    incident.setdefault('language', 'en')
+    incident.setdefault('peak_hours', False)
+    incident['keywords'] = keywords_json
+    incident['pincode'] = str(incident.get('pincode', ''))
+    incident['processed_at'] = processed_at
+    
+    # Optional fields missing from the source are stored as NULL
+    for column in INCIDENT_COLUMNS_SET.difference(incident):
+        incident[column] = None
+    return incident
+
 def insert_incidents(cursor, incidents_data):
-    """Insert incidents into database"""
+    """Insert incidents into database in a single transaction"""
     current_time = datetime.utcnow().isoformat() + 'Z'
     
+    # Reject rows that would violate the schema up front instead of
+    # catching errors row by row inside the insert: a missing id or
+    # event_type, or an id already taken (ids are TEXT, so 1 and "1" collide)
+    valid = []
+    seen_ids = set()
+    missing = duplicates = 0
     for incident in incidents_data:
-        try:
-            # Prepare data
-            keywords_json = json.dumps(incident.get('keywords', []))
-            
-            # Convert coordinates array to separate lat/lng if needed
-            if 'coordinates' in incident and isinstance(incident['coordinates'], list):
-                latitude = incident['coordinates'][0]
-                longitude = incident['coordinates'][1]
-            else:
-                latitude = incident.get('latitude')
-                longitude = incident.get('longitude')
-            
-            # Convert verified to boolean if it's a float
-            verified = incident.get('verified', True)
-            if isinstance(verified, float):
-                verified = verified >= 0.5
-            
-            cursor.execute('''
-                INSERT INTO incidents (
-                    id, event_type, sub_category, description, keywords, language,
-                    latitude, longitude, location_name, area_category, ward_number, pincode,
-                    timestamp, processed_at, estimated_duration, actual_duration, peak_hours,
-                    severity_level, priority_score, impact_radius, source, verified,
-                    reporter_id, verification_count, media_type, media_url, event_status,
-                    assigned_department, resolution_notes, weather_condition, traffic_density
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                incident.get('id'),
-                incident.get('event_type'),
-                incident.get('sub_category'),
-                incident.get('description'),
-                keywords_json,
-                incident.get('language', 'en'),
-                latitude,
-                longitude,
-                incident.get('location_name'),
-                incident.get('area_category'),
-                incident.get('ward_number'),
-                str(incident.get('pincode', '')),
-                incident.get('timestamp'),
-                current_time,  # processed_at
-                incident.get('estimated_duration'),
-                incident.get('actual_duration'),
-                incident.get('peak_hours', False),
-                incident.get('severity_level'),
-                incident.get('priority_score'),
-                incident.get('impact_radius'),
-                incident.get('source'),
-                verified,
-                incident.get('reporter_id'),
-                incident.get('verification_count'),
-                incident.get('media_type'),
-                incident.get('media_url'),
-                incident.get('event_status'),
-                incident.get('assigned_department'),
-                incident.get('resolution_notes'),
-                incident.get('weather_condition'),
-                incident.get('traffic_density')
-            ))
-        except Exception as e:
-            print(f"❌ Error inserting incident {incident.get('id', 'unknown')}: {e}")
-            continue
+        incident_id = incident.get('id')
+        if not incident_id or not incident.get('event_type'):
+            missing += 1
+        elif str(incident_id) in seen_ids:
+            duplicates += 1
+        else:
+            seen_ids.add(str(incident_id))
+            valid.append(incident)
+    if missing:
+        print(f"❌ Skipping {missing} incidents missing id or event_type")
+    if duplicates:
+        print(f"❌ Skipping {duplicates} incidents with duplicate ids")
+    
+    # Encode every keyword array in one pass ahead of the row normalization
+    keywords_json = [orjson.dumps(incident.get('keywords', [])).decode() for incident in valid]
+    params = (
+        _prepare_incident(incident, current_time, keywords)
+        for incident, keywords in zip(valid, keywords_json)
+    )
     
-    print(f"✅ Inserted {len(incidents_data)} incidents")
+    cursor.execute("BEGIN")
+    cursor.executemany(INSERT_INCIDENT_NAMED_SQL, params)
+    cursor.connection.commit()
+    
+    print(f"✅ Inserted {len(valid)} incidents")
 
 def create_sample_agent_activities(cursor):
     """Create some sample agent activities"""
@@ -225,7 +260,7 @@ def main():
     print("=" * 50)
     
     # Create database and tables
-    conn, cursor = create_database()
+    conn, cursor = create_tables()
     
     # Load and insert incidents data
     incidents_data = load_incidents_data()
@@ -235,8 +270,12 @@ def main():
     # Create sample agent activities
     create_sample_agent_activities(cursor)
     
-    # Commit and close
+    # Index the loaded data
+    create_indexes(cursor)
+    
+    # Commit, write to disk and close
     conn.commit()
+    save_database(conn)
     conn.close()
     
     # Verify database creation
@@ -1,15 +1,18 @@
-import json
 import time
 import random
 import threading
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-from queue import Queue, Empty
+from typing import Dict, List, Any, Optional, Union
+from queue import Queue, SimpleQueue, Empty, Full
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import sqlite3
 import os
+import atexit
+import mmap
+import numpy as np
+import functools
+import orjson
 
 # Configure logging
 logging.basicConfig(
@@ -18,19 +21,237 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Applied to every connection: WAL lets the stats reader run alongside the
+# processor's writes, and NORMAL sync only fsyncs at checkpoints
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA busy_timeout=5000; "
+    "PRAGMA temp_store=MEMORY; PRAGMA cache_size=-20000;"
+)
+
+# Applied to read-only connections; journal mode is set by the writers
+READER_PRAGMAS = (
+    "PRAGMA query_only=1; PRAGMA busy_timeout=5000; "
+    "PRAGMA temp_store=MEMORY; PRAGMA cache_size=-20000;"
+)
+
+# Most incidents the processor takes off the queue and commits in one transaction
+MAX_PROCESS_BATCH = 50
+
+# Most queued rows the writer thread commits in one transaction
+WRITE_BATCH_MAX = 500
+
+# Feeder batches allowed to wait for the processor before the feeder blocks
+INCIDENT_QUEUE_MAX_BATCHES = 100
+
+# Most agent tasks allowed to run at once across a batch
+MAX_CONCURRENT_AGENT_TASKS = 16
+
+INSERT_INCIDENT_SQL = '''
+    INSERT OR REPLACE INTO incidents 
+    (id, event_type, sub_category, description, keywords, latitude, longitude,
+     location_name, area_category, ward_number, severity_level, priority_score,
+     assigned_department, event_status, timestamp, processed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_AGENT_ACTIVITY_SQL = '''
+    INSERT INTO agent_activities 
+    (agent_name, incident_id, task_type, status, details, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_NOTIFICATION_SQL = '''
+    INSERT INTO notifications 
+    (incident_id, notification_type, title, message, priority_score, departments, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Prepared statements kept per connection; the module-level SQL strings above are reused verbatim
+STATEMENT_CACHE_SIZE = 256
+
+# Columns returned by get_recent_incidents
+RECENT_INCIDENT_COLUMNS = ("id", "event_type", "severity_level", "priority_score", "processed_at")
+
+# Agents that handle an incident at each priority tier
+AGENTS_BY_TIER = {
+    "high": ("notification_agent", "trend_analysis_agent", "resource_allocation_agent", "news_insights_agent"),
+    "medium": ("notification_agent", "resource_allocation_agent"),
+    "low": ("resource_allocation_agent",)
+}
+
+# Mock trend insights
+TREND_INSIGHTS = {
+    "traffic_accident": "Traffic accidents in {area} increased 15% this week",
+    "pothole": "Pothole reports in {area} correlate with recent rainfall",
+    "power_outage": "Power outages in {area} show peak during evening hours",
+    "water_supply": "Water supply issues in {area} require infrastructure upgrade"
+}
+DEFAULT_TREND_INSIGHT = "Monitoring {event_type} patterns in {area}"
+
+# Mock resource allocation logic
+RESOURCE_PLANS = {
+    "high": {"personnel": 5, "vehicles": 2, "response_time": "15 minutes"},
+    "medium": {"personnel": 3, "vehicles": 1, "response_time": "30 minutes"},
+    "low": {"personnel": 2, "vehicles": 1, "response_time": "60 minutes"}
+}
+
+NEWS_IMPACT_BY_TIER = {
+    "high": "HIGH - Requires immediate public communication",
+    "medium": "MEDIUM - Monitor for public interest",
+    "low": "LOW - Routine incident logging"
+}
+
+# Notification title/message templates, filled from the incident with format_map
+EMERGENCY_TITLE = "🚨 EMERGENCY: {event_type} in {area_category}"
+EMERGENCY_MESSAGE = "High priority incident reported: {}"
+DEPT_ALERT_TITLE = "⚠️  HIGH PRIORITY: {event_type}"
+DEPT_ALERT_MESSAGE = "Attention required: {}"
+DESCRIPTION_PREVIEW_CHARS = 100
+
+def description_preview(description: str) -> str:
+    """Description shortened for a notification, marked with ... only when cut"""
+    if len(description) <= DESCRIPTION_PREVIEW_CHARS:
+        return description
+    return description[:DESCRIPTION_PREVIEW_CHARS] + "..."
+
+def priority_tier(priority_score: float) -> str:
+    """Bucket a priority score into the high / medium / low processing tier"""
+    if priority_score >= 8.0:
+        return "high"
+    if priority_score >= 6.0:
+        return "medium"
+    return "low"
+
+def incident_tier(incident: Dict[str, Any]) -> str:
+    """Tier stamped on the incident by the feeder, computed if it is missing"""
+    return incident.get('_tier') or priority_tier(incident.get('priority_score', 0))
+
+_utcnow = datetime.utcnow
+
+def utc_now_iso() -> str:
+    """Current UTC time as the ISO string stored in timestamp columns"""
+    return _utcnow().isoformat()
+
+def to_json(value: Union[str, Any]) -> str:
+    """Serialize a value for a TEXT column, passing pre-serialized strings through"""
+    if isinstance(value, str):
+        return value
+    return orjson.dumps(value).decode()
+
+@functools.lru_cache(maxsize=None)
+def departments_json(department: str, emergency: bool = False) -> str:
+    """Serialized department list for a notification, cached per department"""
+    departments = [department, "Emergency Services"] if emergency else [department]
+    return to_json(departments)
+
 class LocalIncidentDatabase:
     """Local SQLite database for storing incidents during simulation"""
     
     def __init__(self, db_path: str = "local_dev/local_incidents.db"):
         self.db_path = db_path
+        # One connection per thread, reused across calls
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Writes are queued as (sql, rows) for one writer thread that commits them in batches
+        self._write_queue = SimpleQueue()
         # Ensure the directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         self.init_database()
+        self._writer_thread = threading.Thread(target=self._write_loop, name="db-writer", daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            conn.executescript(CONNECTION_PRAGMAS)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def get_reader_conn(self) -> sqlite3.Connection:
+        """Return the calling thread's read-only connection, opening it on first use"""
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            conn.executescript(READER_PRAGMAS)
+            self._local.reader = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def _write_loop(self):
+        """Drain queued writes, committing each drained group with one executemany per statement"""
+        conn = self._get_conn()
+        while True:
+            item = self._write_queue.get()
+            pending = {}
+            flushed = []
+            queued_rows = 0
+            stopping = False
+            
+            # Take whatever else is already queued, up to WRITE_BATCH_MAX rows
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    flushed.append(item)
+                else:
+                    sql, rows = item
+                    pending.setdefault(sql, []).extend(rows)
+                    queued_rows += len(rows)
+                if queued_rows >= WRITE_BATCH_MAX:
+                    break
+                try:
+                    item = self._write_queue.get_nowait()
+                except Empty:
+                    break
+            
+            if pending:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for sql, rows in pending.items():
+                        conn.executemany(sql, rows)
+                    conn.execute("COMMIT")
+                except sqlite3.Error as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    logger.error("❌ Error committing %d queued writes: %s", queued_rows, e)
+            
+            for event in flushed:
+                event.set()
+            if stopping:
+                return
+    
+    def flush(self):
+        """Block until every write queued so far has been committed"""
+        if not self._writer_thread.is_alive():
+            return
+        done = threading.Event()
+        self._write_queue.put(done)
+        done.wait()
+    
+    def close(self):
+        """Flush queued writes, stop the writer thread and close every thread's connection"""
+        if self._writer_thread.is_alive():
+            self._write_queue.put(None)
+            self._writer_thread.join()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
     
     def init_database(self):
         """Initialize local database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
         
         # Create incidents table
         cursor.execute('''
@@ -54,10 +275,13 @@ class LocalIncidentDatabase:
             )
         ''')
         
+        # Log tables use plain INTEGER PRIMARY KEY rowids: AUTOINCREMENT would also
+        # rewrite sqlite_sequence on every insert, dirtying a third B-tree per row
+        
         # Create agent_activities table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS agent_activities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 agent_name TEXT,
                 incident_id TEXT,
                 task_type TEXT,
@@ -70,7 +294,7 @@ class LocalIncidentDatabase:
         # Create notifications table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 incident_id TEXT,
                 notification_type TEXT,
                 title TEXT,
@@ -81,82 +305,75 @@ class LocalIncidentDatabase:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # Indexes for the recent-incidents window and per-incident lookups
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_processed_at ON incidents(processed_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_activities_incident ON agent_activities(incident_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_incident ON notifications(incident_id)")
     
-    def insert_incident(self, incident: Dict[str, Any]):
-        """Insert incident into local database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO incidents 
-            (id, event_type, sub_category, description, keywords, latitude, longitude,
-             location_name, area_category, ward_number, severity_level, priority_score,
-             assigned_department, event_status, timestamp, processed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    @staticmethod
+    def _incident_row(incident: Dict[str, Any], processed_at: str) -> tuple:
+        """Build the INSERT_INCIDENT_SQL parameters for one incident"""
+        return (
             incident['id'], incident['event_type'], incident['sub_category'],
-            incident['description'], json.dumps(incident.get('keywords', [])),
+            incident['description'], incident.get('keywords_json') or to_json(incident.get('keywords', [])),
             incident['latitude'], incident['longitude'], incident['location_name'],
             incident['area_category'], incident['ward_number'], incident['severity_level'],
             incident['priority_score'], incident['assigned_department'],
             incident.get('event_status', 'reported'), incident['timestamp'],
-            datetime.utcnow().isoformat()
-        ))
-        
-        conn.commit()
-        conn.close()
+            processed_at
+        )
+    
+    def insert_incident(self, incident: Dict[str, Any]):
+        """Queue an incident for insertion into the local database"""
+        self._write_queue.put((INSERT_INCIDENT_SQL, [self._incident_row(incident, utc_now_iso())]))
+    
+    def insert_incidents_bulk(self, incidents: List[Dict[str, Any]]):
+        """Queue many incidents as one executemany in one transaction"""
+        processed_at = utc_now_iso()
+        rows = [self._incident_row(incident, processed_at) for incident in incidents]
+        self._write_queue.put((INSERT_INCIDENT_SQL, rows))
     
     def log_agent_activity(self, agent_name: str, incident_id: str, task_type: str, 
-                          status: str, details: Dict[str, Any]):
-        """Log agent activity"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+                          status: str, details: Union[Dict[str, Any], str]):
+        """Log agent activity; details may already be a JSON string"""
+        params = (agent_name, incident_id, task_type, status, to_json(details),
+                  utc_now_iso())
         
-        cursor.execute('''
-            INSERT INTO agent_activities 
-            (agent_name, incident_id, task_type, status, details, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (agent_name, incident_id, task_type, status, json.dumps(details), 
-              datetime.utcnow().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        self._write_queue.put((INSERT_AGENT_ACTIVITY_SQL, [params]))
     
     def log_notification(self, incident_id: str, notification_type: str, title: str,
-                        message: str, priority_score: float, departments: List[str]):
-        """Log notification"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO notifications 
-            (incident_id, notification_type, title, message, priority_score, departments, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (incident_id, notification_type, title, message, priority_score,
-              json.dumps(departments), datetime.utcnow().isoformat()))
+                        message: str, priority_score: float, departments: Union[List[str], str]):
+        """Log notification; departments may already be a JSON string"""
+        params = (incident_id, notification_type, title, message, priority_score,
+                  to_json(departments), utc_now_iso())
         
-        conn.commit()
-        conn.close()
+        self._write_queue.put((INSERT_NOTIFICATION_SQL, [params]))
     
-    def get_recent_incidents(self, hours: int = 24) -> List[Dict[str, Any]]:
-        """Get recent incidents"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_recent_incidents(self, hours: int = 24,
+                             columns: tuple = RECENT_INCIDENT_COLUMNS) -> List[Dict[str, Any]]:
+        """Get recent incidents, projecting only the requested columns"""
+        # Reads go through a read-only connection so they never wait on the writer thread
+        cursor = self.get_reader_conn().cursor()
         
         cutoff_time = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
-        cursor.execute('''
-            SELECT * FROM incidents 
+        cursor.execute(f'''
+            SELECT {", ".join(columns)} FROM incidents 
             WHERE processed_at > ? 
             ORDER BY processed_at DESC
         ''', (cutoff_time,))
         
-        columns = [desc[0] for desc in cursor.description]
         incidents = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
-        conn.close()
         return incidents
+    
+    def count_recent_incidents(self, hours: int = 24) -> int:
+        """Count recent incidents without fetching their rows"""
+        cutoff_time = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
+        # Answered from idx_incidents_processed_at alone
+        row = self.get_reader_conn().execute(
+            "SELECT COUNT(*) FROM incidents WHERE processed_at > ?", (cutoff_time,)
+        ).fetchone()
+        return row[0]
 
 class MockAIAgent:
     """Mock AI agent for local testing"""
@@ -166,56 +383,55 @@ class MockAIAgent:
         self.db = db
         self.processing_delay = random.uniform(1, 3)  # Simulate processing time
     
-    def process_incident(self, incident: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_incident(self, incident: Dict[str, Any]) -> Dict[str, Any]:
         """Process incident with mock AI logic"""
-        time.sleep(self.processing_delay)  # Simulate processing time
-        
-        incident_id = incident['id']
-        priority_score = incident.get('priority_score', 0)
-        event_type = incident['event_type']
+        await asyncio.sleep(self.processing_delay)  # Simulate processing time
         
         if self.agent_name == "notification_agent":
-            return self._mock_notification_processing(incident)
+            handler = self._mock_notification_processing
         elif self.agent_name == "trend_analysis_agent":
-            return self._mock_trend_analysis(incident)
+            handler = self._mock_trend_analysis
         elif self.agent_name == "resource_allocation_agent":
-            return self._mock_resource_allocation(incident)
+            handler = self._mock_resource_allocation
         elif self.agent_name == "news_insights_agent":
-            return self._mock_news_insights(incident)
+            handler = self._mock_news_insights
+        else:
+            return {"status": "processed", "agent": self.agent_name}
         
-        return {"status": "processed", "agent": self.agent_name}
+        # Handlers only queue their writes, so they can run on the event loop
+        return handler(incident)
     
     def _mock_notification_processing(self, incident: Dict[str, Any]) -> Dict[str, Any]:
         """Mock notification agent processing"""
         priority_score = incident.get('priority_score', 0)
         
-        if priority_score >= 8.0:
+        if incident_tier(incident) == "high":
             # Emergency blast
             notification_type = "emergency_blast"
-            title = f"🚨 EMERGENCY: {incident['event_type']} in {incident['area_category']}"
-            message = f"High priority incident reported: {incident['description'][:100]}..."
-            departments = [incident['assigned_department'], "Emergency Services"]
+            title = EMERGENCY_TITLE.format_map(incident)
+            message = EMERGENCY_MESSAGE.format(description_preview(incident['description']))
+            departments = departments_json(incident['assigned_department'], emergency=True)
             
             self.db.log_notification(
                 incident['id'], notification_type, title, message, 
                 priority_score, departments
             )
             
-            logger.warning(f"🚨 EMERGENCY BLAST: {incident['id']} - {title}")
+            logger.warning("🚨 EMERGENCY BLAST: %s - %s", incident['id'], title)
             
         elif priority_score >= 7.0:
             # Department alert
             notification_type = "department_alert"
-            title = f"⚠️  HIGH PRIORITY: {incident['event_type']}"
-            message = f"Attention required: {incident['description'][:100]}..."
-            departments = [incident['assigned_department']]
+            title = DEPT_ALERT_TITLE.format_map(incident)
+            message = DEPT_ALERT_MESSAGE.format(description_preview(incident['description']))
+            departments = departments_json(incident['assigned_department'])
             
             self.db.log_notification(
                 incident['id'], notification_type, title, message,
                 priority_score, departments
             )
             
-            logger.warning(f"⚠️  DEPT ALERT: {incident['id']} - {title}")
+            logger.warning("⚠️  DEPT ALERT: %s - %s", incident['id'], title)
         
         self.db.log_agent_activity(
             self.agent_name, incident['id'], "notification_processing",
@@ -229,17 +445,9 @@ class MockAIAgent:
         event_type = incident['event_type']
         area = incident['area_category']
         
-        # Mock trend insights
-        trends = {
-            "traffic_accident": f"Traffic accidents in {area} increased 15% this week",
-            "pothole": f"Pothole reports in {area} correlate with recent rainfall",
-            "power_outage": f"Power outages in {area} show peak during evening hours",
-            "water_supply": f"Water supply issues in {area} require infrastructure upgrade"
-        }
+        insight = TREND_INSIGHTS.get(event_type, DEFAULT_TREND_INSIGHT).format(area=area, event_type=event_type)
         
-        insight = trends.get(event_type, f"Monitoring {event_type} patterns in {area}")
-        
-        logger.info(f"📈 TREND ANALYSIS: {incident['id']} - {insight}")
+        logger.info("📈 TREND ANALYSIS: %s - %s", incident['id'], insight)
         
         self.db.log_agent_activity(
             self.agent_name, incident['id'], "trend_analysis",
@@ -253,16 +461,9 @@ class MockAIAgent:
         severity = incident['severity_level']
         department = incident['assigned_department']
         
-        # Mock resource allocation logic
-        resource_plans = {
-            "high": {"personnel": 5, "vehicles": 2, "response_time": "15 minutes"},
-            "medium": {"personnel": 3, "vehicles": 1, "response_time": "30 minutes"},
-            "low": {"personnel": 2, "vehicles": 1, "response_time": "60 minutes"}
-        }
-        
-        allocation = resource_plans.get(severity, resource_plans["medium"])
+        allocation = RESOURCE_PLANS.get(severity, RESOURCE_PLANS["medium"])
         
-        logger.info(f"🚛 RESOURCE ALLOCATION: {incident['id']} - {allocation}")
+        logger.info("🚛 RESOURCE ALLOCATION: %s - %s", incident['id'], allocation)
         
         self.db.log_agent_activity(
             self.agent_name, incident['id'], "resource_allocation",
@@ -276,14 +477,9 @@ class MockAIAgent:
         event_type = incident['event_type']
         priority = incident.get('priority_score', 0)
         
-        if priority >= 8.0:
-            news_impact = "HIGH - Requires immediate public communication"
-        elif priority >= 6.0:
-            news_impact = "MEDIUM - Monitor for public interest"
-        else:
-            news_impact = "LOW - Routine incident logging"
+        news_impact = NEWS_IMPACT_BY_TIER[incident_tier(incident)]
         
-        logger.info(f"📰 NEWS INSIGHTS: {incident['id']} - {news_impact}")
+        logger.info("📰 NEWS INSIGHTS: %s - %s", incident['id'], news_impact)
         
         self.db.log_agent_activity(
             self.agent_name, incident['id'], "news_insights",
@@ -296,12 +492,16 @@ class LocalIncidentSimulator:
     """Local incident simulator that feeds incidents at realistic intervals"""
     
     def __init__(self, dataset_file: str, incidents_per_batch: int = 7, 
-                 batch_interval: int = 20):
+                 batch_interval: int = 20, batch_jitter: float = 0.0):
         self.dataset_file = dataset_file
         self.incidents_per_batch = incidents_per_batch
         self.batch_interval = batch_interval
+        self.batch_jitter = batch_jitter
         self.db = LocalIncidentDatabase()
-        self.incident_queue = Queue()
+        # Carries whole feeder batches; bounded so a stalled processor pushes back on the feeder
+        self.incident_queue = Queue(maxsize=INCIDENT_QUEUE_MAX_BATCHES)
+        # Set when the simulation stops, waking any thread waiting out an interval
+        self._stopped = threading.Event()
         self.running = False
         
         # Initialize agents
@@ -311,6 +511,11 @@ class LocalIncidentSimulator:
             "resource_allocation_agent": MockAIAgent("resource_allocation_agent", self.db),
             "news_insights_agent": MockAIAgent("news_insights_agent", self.db)
         }
+        # Agent objects for each priority tier, resolved once
+        self._agents_by_tier = {
+            tier: [self.agents[agent_name] for agent_name in agent_names]
+            for tier, agent_names in AGENTS_BY_TIER.items()
+        }
         
         # Load dataset
         self.load_dataset()
@@ -323,14 +528,30 @@ class LocalIncidentSimulator:
             "start_time": None
         }
     
+    @property
+    def running(self) -> bool:
+        """Whether the simulation is running; clearing it wakes waiting threads"""
+        return self._running
+    
+    @running.setter
+    def running(self, value: bool):
+        self._running = value
+        if value:
+            self._stopped.clear()
+        else:
+            self._stopped.set()
+    
     def load_dataset(self):
         """Load incidents from JSON dataset"""
         try:
-            with open(self.dataset_file, 'r') as f:
-                self.incidents = json.load(f)
+            # Parse straight from the mapped file, skipping the decoded str copy
+            with open(self.dataset_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.incidents = orjson.loads(memoryview(mm))
             
             logger.info(f"📚 Loaded {len(self.incidents)} incidents from {self.dataset_file}")
             
+            self._serialize_keywords()
+            
             # Shuffle for random feeding
             random.shuffle(self.incidents)
             
@@ -339,7 +560,7 @@ class LocalIncidentSimulator:
             logger.info("💡 Generating sample dataset...")
             self.generate_sample_dataset()
     
-    def generate_sample_dataset(self):
+    def generate_sample_dataset(self, count: int = 1000):
         """Generate sample dataset if file not found"""
         from datetime import datetime, timedelta
         
@@ -354,42 +575,71 @@ class LocalIncidentSimulator:
         ]
         
         departments = ["BBMP", "Traffic Police", "BESCOM", "BWSSB", "Fire Department"]
-        
-        self.incidents = []
-        
-        for i in range(1000):  # Generate 1000 sample incidents
-            event_type = random.choice(event_types)
-            location = random.choice(locations)
-            
-            incident = {
-                "id": f"LOCAL_SIM_{str(i+1).zfill(6)}",
-                "event_type": event_type,
-                "sub_category": f"{event_type}_sub",
-                "description": f"Simulated {event_type} incident at {location['name']}",
-                "keywords": [event_type, location['name']],
-                "latitude": location["lat"] + random.uniform(-0.01, 0.01),
-                "longitude": location["lon"] + random.uniform(-0.01, 0.01),
-                "location_name": location["name"],
+        severities = ["low", "medium", "high"]
+        
+        # Draw every random column in bulk, then assemble the rows
+        rng = np.random.default_rng()
+        event_idx = rng.integers(0, len(event_types), count).tolist()
+        location_idx = rng.integers(0, len(locations), count).tolist()
+        lat_jitter = rng.uniform(-0.01, 0.01, count).tolist()
+        lon_jitter = rng.uniform(-0.01, 0.01, count).tolist()
+        severity_idx = rng.integers(0, len(severities), count).tolist()
+        priority_scores = rng.uniform(1, 10, count).tolist()
+        department_idx = rng.integers(0, len(departments), count).tolist()
+        days_ago = rng.integers(0, 31, count).tolist()
+        
+        # Only 31 distinct timestamps are possible, so format each once
+        now = datetime.utcnow()
+        timestamps = [(now - timedelta(days=days)).isoformat() for days in range(31)]
+        
+        self.incidents = [
+            {
+                "id": f"LOCAL_SIM_{i + 1:06d}",
+                "event_type": event_types[e],
+                "sub_category": f"{event_types[e]}_sub",
+                "description": f"Simulated {event_types[e]} incident at {locations[l]['name']}",
+                "keywords": [event_types[e], locations[l]['name']],
+                "latitude": locations[l]["lat"] + lat_d,
+                "longitude": locations[l]["lon"] + lon_d,
+                "location_name": locations[l]["name"],
                 "area_category": "urban",
-                "ward_number": location["ward"],
-                "severity_level": random.choice(["low", "medium", "high"]),
-                "priority_score": random.uniform(1, 10),
-                "assigned_department": random.choice(departments),
+                "ward_number": locations[l]["ward"],
+                "severity_level": severities[sev],
+                "priority_score": score,
+                "assigned_department": departments[dept],
                 "event_status": "reported",
-                "timestamp": (datetime.utcnow() - timedelta(days=random.randint(0, 30))).isoformat()
+                "timestamp": timestamps[days]
             }
-            
-            self.incidents.append(incident)
+            for i, (e, l, lat_d, lon_d, sev, score, dept, days) in enumerate(zip(
+                event_idx, location_idx, lat_jitter, lon_jitter,
+                severity_idx, priority_scores, department_idx, days_ago
+            ))
+        ]
         
         # Save generated dataset
-        with open(self.dataset_file, 'w') as f:
-            json.dump(self.incidents, f, indent=2)
+        with open(self.dataset_file, 'wb') as f:
+            f.write(orjson.dumps(self.incidents, option=orjson.OPT_INDENT_2))
         
         logger.info(f"✅ Generated {len(self.incidents)} sample incidents")
+        
+        self._serialize_keywords()
+    
+    def _serialize_keywords(self):
+        """Serialize each incident's keywords once so inserts don't re-encode them"""
+        for incident in self.incidents:
+            incident['keywords_json'] = to_json(incident.get('keywords', []))
+    
+    def replay_dataset(self):
+        """Load the whole dataset into the local database in one bulk insert"""
+        self.db.insert_incidents_bulk(self.incidents)
+        self.db.flush()
+        logger.info(f"💾 Replayed {len(self.incidents)} incidents into {self.db.db_path}")
     
     def feed_incidents(self):
         """Feed incidents to the queue at specified intervals"""
         incident_index = 0
+        # Batches are paced against a fixed monotonic schedule so waits don't drift
+        next_batch_at = time.monotonic()
         
         while self.running and incident_index < len(self.incidents):
             # Select random number of incidents for this batch
@@ -398,24 +648,31 @@ class LocalIncidentSimulator:
                 self.incidents_per_batch + 3
             )
             
-            batch_incidents = []
-            for _ in range(min(batch_size, len(self.incidents) - incident_index)):
-                if incident_index < len(self.incidents):
-                    incident = self.incidents[incident_index].copy()
-                    # Update timestamp to current time for realism
-                    incident['timestamp'] = datetime.utcnow().isoformat()
-                    batch_incidents.append(incident)
-                    incident_index += 1
+            # Stamp the whole batch with the current time for realism
+            now_iso = utc_now_iso()
+            batch_incidents = [
+                {**incident, 'timestamp': now_iso, '_tier': priority_tier(incident.get('priority_score', 0))}
+                for incident in self.incidents[incident_index:incident_index + batch_size]
+            ]
+            incident_index += len(batch_incidents)
             
             if batch_incidents:
-                logger.info(f"🔄 Feeding batch of {len(batch_incidents)} incidents...")
+                logger.info("🔄 Feeding batch of %d incidents...", len(batch_incidents))
                 
-                for incident in batch_incidents:
-                    self.incident_queue.put(incident)
+                while self.running:
+                    try:
+                        self.incident_queue.put(batch_incidents, timeout=1)
+                        break
+                    except Full:
+                        continue
                 
-                # Add some randomness to interval
-                sleep_time = self.batch_interval + random.uniform(-5, 5)
-                time.sleep(max(1, sleep_time))
+                next_batch_at += self.batch_interval
+                wake_at = next_batch_at
+                if self.batch_jitter:
+                    wake_at += random.uniform(-self.batch_jitter, self.batch_jitter)
+                
+                # Returns early as soon as the simulation is stopped
+                self._stopped.wait(max(0, wake_at - time.monotonic()))
             
             if incident_index >= len(self.incidents):
                 logger.info("📚 All incidents from dataset have been fed")
@@ -423,65 +680,84 @@ class LocalIncidentSimulator:
     
     def process_incidents(self):
         """Process incidents from the queue using agents"""
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            while self.running:
+        asyncio.run(self._process_incidents())
+    
+    async def _process_incidents(self):
+        """Drain the queue in batches and run each batch's incidents concurrently"""
+        self._agent_slots = asyncio.Semaphore(MAX_CONCURRENT_AGENT_TASKS)
+        
+        while self.running:
+            try:
+                batch = list(await asyncio.to_thread(self.incident_queue.get, timeout=1))
+            except Empty:
+                continue
+            
+            # Take whatever other batches are already waiting and run them together
+            batches_taken = 1
+            while len(batch) < MAX_PROCESS_BATCH:
                 try:
-                    incident = self.incident_queue.get(timeout=1)
-                    
-                    # Store incident in local database
-                    self.db.insert_incident(incident)
-                    
-                    # Update statistics
-                    self.stats["incidents_processed"] += 1
-                    if incident.get("priority_score", 0) >= 8.0:
-                        self.stats["high_priority_incidents"] += 1
-                    
-                    logger.info(f"🔍 Processing incident: {incident['id']} - {incident['event_type']} (Priority: {incident.get('priority_score', 0):.1f})")
-                    
-                    # Process with agents based on priority
-                    priority_score = incident.get("priority_score", 0)
-                    
-                    # All incidents get basic processing
-                    futures = []
-                    
-                    # High priority incidents get full agent processing
-                    if priority_score >= 8.0:
-                        logger.warning(f"🚨 HIGH PRIORITY INCIDENT: {incident['id']}")
-                        for agent_name, agent in self.agents.items():
-                            future = executor.submit(agent.process_incident, incident)
-                            futures.append((agent_name, future))
-                    
-                    # Medium priority gets selective processing
-                    elif priority_score >= 6.0:
-                        selected_agents = ["notification_agent", "resource_allocation_agent"]
-                        for agent_name in selected_agents:
-                            future = executor.submit(self.agents[agent_name].process_incident, incident)
-                            futures.append((agent_name, future))
-                    
-                    # Low priority gets minimal processing
-                    else:
-                        future = executor.submit(self.agents["resource_allocation_agent"].process_incident, incident)
-                        futures.append(("resource_allocation_agent", future))
-                    
-                    # Wait for agent processing to complete
-                    for agent_name, future in futures:
-                        try:
-                            result = future.result(timeout=10)
-                            logger.debug(f"✅ {agent_name} completed: {result}")
-                        except Exception as e:
-                            logger.error(f"❌ {agent_name} failed: {e}")
-                    
-                    self.incident_queue.task_done()
-                    
+                    batch.extend(self.incident_queue.get_nowait())
+                    batches_taken += 1
                 except Empty:
-                    continue
-                except Exception as e:
-                    logger.error(f"❌ Error processing incident: {e}")
+                    break
+            
+            try:
+                await asyncio.gather(*(self._process_queued_incident(incident) for incident in batch))
+            finally:
+                for _ in range(batches_taken):
+                    self.incident_queue.task_done()
+    
+    async def _process_queued_incident(self, incident: Dict[str, Any]):
+        """Process one incident, logging instead of raising on failure"""
+        try:
+            await self._process_incident(incident)
+        except Exception as e:
+            logger.error("❌ Error processing incident: %s", e)
+    
+    async def _process_incident(self, incident: Dict[str, Any]):
+        """Store one incident and run it through the agents for its priority"""
+        # Queue the incident for the database writer
+        self.db.insert_incident(incident)
+        
+        # Priority tier is decided once, when the incident is fed
+        tier = incident_tier(incident)
+        
+        # Update statistics
+        self.stats["incidents_processed"] += 1
+        if tier == "high":
+            self.stats["high_priority_incidents"] += 1
+        
+        logger.info("🔍 Processing incident: %s - %s (Priority: %.1f)",
+                    incident['id'], incident['event_type'], incident.get('priority_score', 0))
+        
+        # High priority incidents get full agent processing
+        if tier == "high":
+            logger.warning("🚨 HIGH PRIORITY INCIDENT: %s", incident['id'])
+        
+        # Wait for agent processing to complete; a lone agent needs no gather
+        selected_agents = self._agents_by_tier[tier]
+        if len(selected_agents) == 1:
+            await self._run_agent(selected_agents[0], incident)
+        else:
+            await asyncio.gather(*(
+                self._run_agent(agent, incident) for agent in selected_agents
+            ))
+    
+    async def _run_agent(self, agent: MockAIAgent, incident: Dict[str, Any]):
+        """Run one agent on an incident within the shared concurrency cap"""
+        async with self._agent_slots:
+            try:
+                result = await asyncio.wait_for(agent.process_incident(incident), timeout=10)
+                logger.debug("✅ %s completed: %s", agent.agent_name, result)
+            except Exception as e:
+                logger.error("❌ %s failed: %s", agent.agent_name, e)
     
     def print_statistics(self):
         """Print real-time statistics"""
         while self.running:
-            time.sleep(30)  # Print stats every 30 seconds
+            # Print stats every 30 seconds
+            if self._stopped.wait(30):
+                break
             
             if self.stats["start_time"]:
                 elapsed = datetime.utcnow() - self.stats["start_time"]
@@ -496,11 +772,10 @@ class LocalIncidentSimulator:
                 print(f"📋 Incidents Processed: {self.stats['incidents_processed']}")
                 print(f"🚨 High Priority: {self.stats['high_priority_incidents']}")
                 print(f"📈 Processing Rate: {rate:.1f} incidents/minute")
-                print(f"📊 Queue Size: {self.incident_queue.qsize()}")
+                print(f"📊 Queued Batches: {self.incident_queue.qsize()}")
                 
                 # Recent incidents
-                recent_incidents = self.db.get_recent_incidents(hours=1)
-                print(f"🕐 Last Hour: {len(recent_incidents)} incidents")
+                print(f"🕐 Last Hour: {self.db.count_recent_incidents(hours=1)} incidents")
                 
                 # Agent activity summary
                 print("\n🤖 AGENT ACTIVITY:")
@@ -560,8 +835,12 @@ def main():
                        help="Number of incidents per batch (default: 7)")
     parser.add_argument("--interval", type=int, default=20,
                        help="Interval between batches in seconds (default: 20)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                       help="Random +/- seconds added to each interval (default: 0)")
     parser.add_argument("--generate-sample", action="store_true",
                        help="Generate sample dataset if file not found")
+    parser.add_argument("--replay", action="store_true",
+                       help="Bulk-load the whole dataset into the local database and exit")
     
     args = parser.parse_args()
     
@@ -569,9 +848,14 @@ def main():
     simulator = LocalIncidentSimulator(
         dataset_file=args.dataset,
         incidents_per_batch=args.batch_size,
-        batch_interval=args.interval
+        batch_interval=args.interval,
+        batch_jitter=args.jitter
     )
     
+    if args.replay:
+        simulator.replay_dataset()
+        return
+    
     # Start simulation
     simulator.start_simulation()
 
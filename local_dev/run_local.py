@@ -4,55 +4,95 @@ Local development server for Bengaluru Graph-RAG API
 This runs a simplified version without GCP dependencies for testing
 """
 import os
+import sys
 import json
+import asyncio
+import functools
+import itertools
 import random
-import uuid
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import numpy as np
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 import uvicorn
 
+# Mock timestamps are offsets from a single clock read at import
+_NOW = datetime.utcnow()
+
+def _ago(**delta):
+    """ISO timestamp for the given timedelta before _NOW"""
+    return (_NOW - timedelta(**delta)).isoformat()
+
 # Mock data for local testing
 MOCK_EVENTS = [
     {
-        "id": str(uuid.uuid4()),
+        "id": "MOCK-1",
         "type": "concert",
         "lat": 12.9716,
         "lon": 77.5946,
         "place": "MG Road",
-        "timestamp": (datetime.utcnow() - timedelta(days=2)).isoformat(),
+        "timestamp": _ago(days=2),
         "text": "Loud crowd gathering for music festival"
     },
     {
-        "id": str(uuid.uuid4()),
+        "id": "MOCK-2",
         "type": "tech_meetup",
         "lat": 12.9352,
         "lon": 77.6245,
         "place": "Koramangala",
-        "timestamp": (datetime.utcnow() - timedelta(days=1)).isoformat(),
+        "timestamp": _ago(days=1),
         "text": "Peaceful tech community meetup"
     },
     {
-        "id": str(uuid.uuid4()),
+        "id": "MOCK-3",
         "type": "food_fair",
         "lat": 12.9279,
         "lon": 77.6271,
         "place": "Indiranagar",
-        "timestamp": (datetime.utcnow() - timedelta(hours=6)).isoformat(),
+        "timestamp": _ago(hours=6),
         "text": "Massive food festival with local vendors"
     },
     {
-        "id": str(uuid.uuid4()),
+        "id": "MOCK-4",
         "type": "accident",
         "lat": 12.9698,
         "lon": 77.5986,
         "place": "MG Road",
-        "timestamp": (datetime.utcnow() - timedelta(hours=3)).isoformat(),
+        "timestamp": _ago(hours=3),
         "text": "Traffic congestion due to minor accident"
     }
 ]
 
-app = FastAPI(title="Bengaluru Graph-RAG API (Local Dev)", version="1.0.0-dev")
+EARTH_RADIUS_KM = 6371.0
+
+# Struct-of-arrays view of MOCK_EVENTS so the radius filter is one vectorized mask
+_LAT_R = np.radians([e["lat"] for e in MOCK_EVENTS])
+_LON_R = np.radians([e["lon"] for e in MOCK_EVENTS])
+# Spatial index: record indices ordered by latitude, so a radius query binary-searches its band
+_LAT_ORDER = np.argsort(_LAT_R, kind="stable")
+_LAT_R_SORTED = _LAT_R[_LAT_ORDER]
+_IDS = np.array([e["id"] for e in MOCK_EVENTS], dtype=object)
+_TYPES = np.array([e["type"] for e in MOCK_EVENTS], dtype=object)
+_TEXTS = np.array([e["text"] for e in MOCK_EVENTS], dtype=object)
+_PLACES = np.array([e["place"] for e in MOCK_EVENTS], dtype=object)
+_TIMESTAMPS = np.array([e["timestamp"] for e in MOCK_EVENTS], dtype=object)
+# Fixed-width string copies searched by keyword scoring
+_TEXTS_LOWER = np.array([e["text"].lower() for e in MOCK_EVENTS])
+_TYPES_STR = np.array([e["type"] for e in MOCK_EVENTS])
+
+# /ask answers keyed by (question, lat/lon rounded to ~100 m, radius), kept LRU with a TTL
+ANSWER_CACHE_SIZE = 1024
+ANSWER_CACHE_TTL_SECONDS = 60
+_answer_cache = OrderedDict()
+
+app = FastAPI(
+    title="Bengaluru Graph-RAG API (Local Dev)",
+    version="1.0.0-dev",
+    default_response_class=ORJSONResponse,
+)
 
 class QueryRequest(BaseModel):
     question: str
@@ -60,32 +100,67 @@ class QueryRequest(BaseModel):
     lon: float
     radius_km: int = 5
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Simple distance calculation (not geodesic, but good enough for testing)"""
-    return ((lat1 - lat2) ** 2 + (lon1 - lon2) ** 2) ** 0.5
+def _haversine_np(lat1, lon1, lats, lons):
+    """Haversine term sin^2(d / 2R) from one point to arrays of points given in radians"""
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    return np.sin((lats - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin((lons - lon1) / 2) ** 2
+
+def _radius_term(radius_km):
+    """The haversine term at radius_km, so radius checks skip sqrt and arcsin"""
+    return np.sin(min(radius_km, np.pi * EARTH_RADIUS_KM) / (2 * EARTH_RADIUS_KM)) ** 2
+
+def _bounding_box(lat, lon, radius_km):
+    """Indices, in record order, of records inside the radius's lat/lon bounding box"""
+    lat_r, dlat_r = np.radians(lat), radius_km / EARTH_RADIUS_KM
+    lo = np.searchsorted(_LAT_R_SORTED, lat_r - dlat_r, side="left")
+    hi = np.searchsorted(_LAT_R_SORTED, lat_r + dlat_r, side="right")
+    candidates = np.sort(_LAT_ORDER[lo:hi])
+    
+    # Widest longitude offset a point within the radius can have at this latitude
+    sin_dlon = np.sin(dlat_r) / np.cos(lat_r)
+    if sin_dlon < 1:
+        dlon = np.abs((_LON_R[candidates] - np.radians(lon) + np.pi) % (2 * np.pi) - np.pi)
+        candidates = candidates[dlon <= np.arcsin(sin_dlon)]
+    return candidates
+
+def events_within(lat, lon, radius_km):
+    """Indices of mock events inside the radius, checking only bounding-box candidates"""
+    candidates = _bounding_box(lat, lon, radius_km)
+    return candidates[_haversine_np(lat, lon, _LAT_R[candidates], _LON_R[candidates]) <= _radius_term(radius_km)]
+
+@functools.lru_cache(maxsize=1024)
+def query_keywords(question):
+    """Lowercased keywords of a question, tokenized once per distinct question"""
+    return tuple(question.lower().split())
+
+@functools.lru_cache(maxsize=4096)
+def _keyword_hits(keyword):
+    """0/1 per mock event: whether the keyword occurs in its text or type, computed once per keyword"""
+    hits = (np.char.find(_TEXTS_LOWER, keyword) >= 0) | (np.char.find(_TYPES_STR, keyword) >= 0)
+    return hits.astype(np.int64)
+
+def keyword_scores(keywords, candidates):
+    """Per candidate, how many keywords occur in its text or type"""
+    scores = np.zeros(len(candidates), dtype=np.int64)
+    for keyword in keywords:
+        scores += _keyword_hits(keyword)[candidates]
+    return scores
 
 def mock_vector_search(question, lat, lon, radius_km):
     """Mock vector search using keyword matching"""
     results = []
-    keywords = question.lower().split()
+    keywords = query_keywords(question)
     
-    for event in MOCK_EVENTS:
-        # Distance filter
-        distance = calculate_distance(lat, lon, event["lat"], event["lon"])
-        if distance > radius_km * 0.01:  # Rough conversion
-            continue
-            
-        # Simple keyword matching for "semantic" search
-        text_lower = event["text"].lower()
-        score = sum(1 for keyword in keywords if keyword in text_lower or keyword in event["type"])
-        
+    # Only events that pass the distance filter are scored
+    candidates = events_within(lat, lon, radius_km)
+    for i, score in zip(candidates.tolist(), keyword_scores(keywords, candidates).tolist()):
         if score > 0:
             results.append({
-                "event_id": event["id"],
-                "text": event["text"],
-                "event_type": event["type"],
-                "place": event["place"],
-                "timestamp": event["timestamp"],
+                "event_id": _IDS[i],
+                "text": _TEXTS[i],
+                "event_type": _TYPES[i],
+                "place": _PLACES[i],
+                "timestamp": _TIMESTAMPS[i],
                 "score": score
             })
     
@@ -93,19 +168,15 @@ def mock_vector_search(question, lat, lon, radius_km):
 
 def mock_graph_search(lat, lon, radius_km):
     """Mock graph traversal"""
-    results = []
-    
-    for event in MOCK_EVENTS:
-        distance = calculate_distance(lat, lon, event["lat"], event["lon"])
-        if distance <= radius_km * 0.01:  # Rough conversion
-            results.append({
-                "id": event["id"],
-                "type": event["type"],
-                "timestamp": event["timestamp"],
-                "place": event["place"]
-            })
-    
-    return results
+    return [
+        {
+            "id": _IDS[i],
+            "type": _TYPES[i],
+            "timestamp": _TIMESTAMPS[i],
+            "place": _PLACES[i]
+        }
+        for i in events_within(lat, lon, radius_km)
+    ]
 
 def mock_llm_response(context, question):
     """Mock LLM response based on context"""
@@ -115,9 +186,13 @@ def mock_llm_response(context, question):
     if not vector_events and not graph_events:
         return "No relevant events found in the specified area."
     
-    # Simple rule-based responses
-    event_types = [e.get("event_type", e.get("type", "")) for e in vector_events + graph_events]
-    places = list(set([e.get("place", "") for e in vector_events + graph_events]))
+    # Simple rule-based responses; one pass collects event types and first-seen places
+    event_types = set()
+    places = {}
+    for event in itertools.chain(vector_events, graph_events):
+        event_types.add(event.get("event_type", event.get("type", "")))
+        places.setdefault(event.get("place", ""))
+    places = list(places)
     
     if "concert" in event_types or "music" in question.lower():
         return f"Based on recent data, there's a music event near {places[0] if places else 'the area'}. Concert activity typically peaks on weekends in this location."
@@ -132,7 +207,7 @@ def mock_llm_response(context, question):
         return f"Tech community is active in {places[0] if places else 'the area'}. Meetups usually happen on weekdays, with networking sessions extending into evenings."
     
     else:
-        return f"Found {len(vector_events + graph_events)} events in the area. Activity levels suggest moderate engagement with mixed event types."
+        return f"Found {len(vector_events) + len(graph_events)} events in the area. Activity levels suggest moderate engagement with mixed event types."
 
 @app.get("/")
 def read_root():
@@ -147,19 +222,28 @@ def health_check():
     return {"status": "healthy", "service": "bengaluru-graphrag-local", "mode": "development"}
 
 @app.post("/ask")
-def ask(request: QueryRequest):
+async def ask(request: QueryRequest):
+    question = request.question.lower()
+    lat, lon = round(request.lat, 3), round(request.lon, 3)
+    key = (question, lat, lon, request.radius_km)
+    
+    cached = _answer_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        _answer_cache.move_to_end(key)
+        return cached[1]
+    
     try:
-        # 1. Mock vector search
-        vector_results = mock_vector_search(request.question, request.lat, request.lon, request.radius_km)
-        
-        # 2. Mock graph traversal
-        graph_results = mock_graph_search(request.lat, request.lon, request.radius_km)
+        # 1-2. Mock vector search and graph traversal are independent, so run them side by side
+        vector_results, graph_results = await asyncio.gather(
+            asyncio.to_thread(mock_vector_search, question, lat, lon, request.radius_km),
+            asyncio.to_thread(mock_graph_search, lat, lon, request.radius_km)
+        )
         
         # 3. Mock LLM response
         context = {"vector_events": vector_results, "graph_events": graph_results}
-        answer = mock_llm_response(context, request.question)
+        answer = mock_llm_response(context, question)
         
-        return {
+        response = {
             "answer": answer,
             "vector_results": len(vector_results),
             "graph_results": len(graph_results),
@@ -169,6 +253,12 @@ def ask(request: QueryRequest):
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Local dev error: {str(e)}")
+    
+    _answer_cache[key] = (time.monotonic() + ANSWER_CACHE_TTL_SECONDS, response)
+    _answer_cache.move_to_end(key)
+    if len(_answer_cache) > ANSWER_CACHE_SIZE:
+        _answer_cache.popitem(last=False)
+    return response
 
 if __name__ == "__main__":
     print("🚀 Starting Bengaluru Graph-RAG API in LOCAL DEVELOPMENT mode")
@@ -178,4 +268,13 @@ if __name__ == "__main__":
     print("🧪 Test with: python test_local.py")
     print()
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # reload needs an import string; uvloop has no Windows build, so fall back to asyncio there
+    uvicorn.run(
+        "run_local:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 """
-Simple local test without external dependencies
+Simple local test without external services
 Tests the core logic of the Graph-RAG system with new incident schema
 """
 import json
-import uuid
+import functools
 import random
+from collections import Counter, namedtuple
+from operator import attrgetter, itemgetter
 from datetime import datetime, timedelta
+import numpy as np
+
+# Mock timestamps are offsets from a single clock read at import
+_NOW = datetime.utcnow()
+
+def _ago(**delta):
+    """ISO timestamp (with Z suffix) for the given timedelta before _NOW"""
+    return (_NOW - timedelta(**delta)).isoformat() + "Z"
 
 # Mock data using the new comprehensive incident schema
-MOCK_INCIDENTS = [
+_MOCK_INCIDENT_DATA = [
     {
         "id": "INC_BLR_2025_000001",
         "event_type": "traffic_accident",
@@ -22,7 +32,7 @@ MOCK_INCIDENTS = [
         "area_category": "commercial",
         "ward_number": 150,
         "pincode": "560001",
-        "timestamp": (datetime.utcnow() - timedelta(hours=2)).isoformat() + "Z",
+        "timestamp": _ago(hours=2),
         "estimated_duration": 120,
         "actual_duration": 95,
         "peak_hours": True,
@@ -53,7 +63,7 @@ MOCK_INCIDENTS = [
         "area_category": "highway",
         "ward_number": 174,
         "pincode": "560102",
-        "timestamp": (datetime.utcnow() - timedelta(hours=6)).isoformat() + "Z",
+        "timestamp": _ago(hours=6),
         "estimated_duration": 240,
         "actual_duration": None,
         "peak_hours": False,
@@ -84,7 +94,7 @@ MOCK_INCIDENTS = [
         "area_category": "residential",
         "ward_number": 176,
         "pincode": "560095",
-        "timestamp": (datetime.utcnow() - timedelta(hours=4)).isoformat() + "Z",
+        "timestamp": _ago(hours=4),
         "estimated_duration": 180,
         "actual_duration": 165,
         "peak_hours": False,
@@ -115,7 +125,7 @@ MOCK_INCIDENTS = [
         "area_category": "metro_station",
         "ward_number": 154,
         "pincode": "560038",
-        "timestamp": (datetime.utcnow() - timedelta(days=1)).isoformat() + "Z",
+        "timestamp": _ago(days=1),
         "estimated_duration": 720,
         "actual_duration": None,
         "peak_hours": True,
@@ -136,151 +146,260 @@ MOCK_INCIDENTS = [
     }
 ]
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Simple distance calculation"""
-    return ((lat1 - lat2) ** 2 + (lon1 - lon2) ** 2) ** 0.5
+EARTH_RADIUS_KM = 6371.0
+
+# Incidents as named tuples: fixed fields, attribute access instead of per-lookup dict hashing
+Incident = namedtuple("Incident", _MOCK_INCIDENT_DATA[0])
+MOCK_INCIDENTS = [Incident(**data) for data in _MOCK_INCIDENT_DATA]
+
+# Struct-of-arrays coordinates of MOCK_INCIDENTS so the radius filter is one vectorized mask
+_LAT_R = np.radians([i.coordinates[0] for i in MOCK_INCIDENTS])
+_LON_R = np.radians([i.coordinates[1] for i in MOCK_INCIDENTS])
+# Spatial index: record indices ordered by latitude, so a radius query binary-searches its band
+_LAT_ORDER = np.argsort(_LAT_R, kind="stable")
+_LAT_R_SORTED = _LAT_R[_LAT_ORDER]
+# Lowercased descriptions, and keyword lists joined with | so "|kw|" finds exact members
+_DESCRIPTIONS_LOWER = np.array([i.description.lower() for i in MOCK_INCIDENTS])
+_KEYWORDS_JOINED = np.array(["|" + "|".join(i.keywords) + "|" for i in MOCK_INCIDENTS])
+
+def _haversine_np(lat1, lon1, lats, lons):
+    """Haversine term sin^2(d / 2R) from one point to arrays of points given in radians"""
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    return np.sin((lats - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin((lons - lon1) / 2) ** 2
+
+def _radius_term(radius_km):
+    """The haversine term at radius_km, so radius checks skip sqrt and arcsin"""
+    return np.sin(min(radius_km, np.pi * EARTH_RADIUS_KM) / (2 * EARTH_RADIUS_KM)) ** 2
+
+def _bounding_box(lat, lon, radius_km):
+    """Indices, in record order, of records inside the radius's lat/lon bounding box"""
+    lat_r, dlat_r = np.radians(lat), radius_km / EARTH_RADIUS_KM
+    lo = np.searchsorted(_LAT_R_SORTED, lat_r - dlat_r, side="left")
+    hi = np.searchsorted(_LAT_R_SORTED, lat_r + dlat_r, side="right")
+    candidates = np.sort(_LAT_ORDER[lo:hi])
+    
+    # Widest longitude offset a point within the radius can have at this latitude
+    sin_dlon = np.sin(dlat_r) / np.cos(lat_r)
+    if sin_dlon < 1:
+        dlon = np.abs((_LON_R[candidates] - np.radians(lon) + np.pi) % (2 * np.pi) - np.pi)
+        candidates = candidates[dlon <= np.arcsin(sin_dlon)]
+    return candidates
+
+def incidents_within(coordinates, radius_km):
+    """Indices of mock incidents inside the radius, checking only bounding-box candidates"""
+    lat, lon = coordinates
+    candidates = _bounding_box(lat, lon, radius_km)
+    return candidates[_haversine_np(lat, lon, _LAT_R[candidates], _LON_R[candidates]) <= _radius_term(radius_km)]
+
+@functools.lru_cache(maxsize=1024)
+def query_keywords(question):
+    """Lowercased keywords of a question, tokenized once per distinct question"""
+    return tuple(question.lower().split())
+
+@functools.lru_cache(maxsize=4096)
+def _keyword_hits(keyword):
+    """0/1 per mock incident: whether the keyword occurs in its description or keyword list, computed once per keyword"""
+    hits = (np.char.find(_DESCRIPTIONS_LOWER, keyword) >= 0) | (np.char.find(_KEYWORDS_JOINED, f"|{keyword}|") >= 0)
+    return hits.astype(np.int64)
+
+def keyword_scores(keywords, candidates):
+    """Per candidate, how many keywords occur in its description or keyword list"""
+    scores = np.zeros(len(candidates), dtype=np.int64)
+    for keyword in keywords:
+        scores += _keyword_hits(keyword)[candidates]
+    return scores
 
 def mock_vector_search(question, coordinates, radius_km, event_types=None, severity_levels=None):
     """Mock vector search using keyword matching with new schema"""
     results = []
-    keywords = question.lower().split()
-    lat, lon = coordinates
+    keywords = query_keywords(question)
     
-    for incident in MOCK_INCIDENTS:
-        # Distance filter
-        inc_lat, inc_lon = incident["coordinates"]
-        distance = calculate_distance(lat, lon, inc_lat, inc_lon)
-        if distance > radius_km * 0.01:  # Rough conversion
-            continue
+    # Only incidents that pass the distance filter are scored
+    candidates = incidents_within(coordinates, radius_km)
+    for i, keyword_matches in zip(candidates.tolist(), keyword_scores(keywords, candidates).tolist()):
+        incident = MOCK_INCIDENTS[i]
         
         # Event type filter
-        if event_types and incident["event_type"] not in event_types:
+        if event_types and incident.event_type not in event_types:
             continue
             
         # Severity filter
-        if severity_levels and incident["severity_level"] not in severity_levels:
+        if severity_levels and incident.severity_level not in severity_levels:
             continue
-            
-        # Keyword matching for semantic search
-        text_lower = incident["description"].lower()
-        keyword_matches = sum(1 for keyword in keywords if keyword in text_lower or keyword in incident["keywords"])
         
         if keyword_matches > 0:
-            results.append({
-                **incident,
-                "relevance_score": keyword_matches + (incident["priority_score"] * 2)
-            })
+            results.append((keyword_matches + (incident.priority_score * 2), incident))
     
-    return sorted(results, key=lambda x: x["relevance_score"], reverse=True)[:10]
+    results.sort(key=itemgetter(0), reverse=True)
+    return [incident for _, incident in results[:10]]
 
 def mock_graph_search(coordinates, radius_km):
     """Mock graph traversal with spatial relationships"""
-    results = []
-    lat, lon = coordinates
-    
-    for incident in MOCK_INCIDENTS:
-        inc_lat, inc_lon = incident["coordinates"]
-        distance = calculate_distance(lat, lon, inc_lat, inc_lon)
-        if distance <= radius_km * 0.01:  # Rough conversion
-            results.append({
-                "id": incident["id"],
-                "event_type": incident["event_type"],
-                "severity_level": incident["severity_level"],
-                "status": incident["event_status"],
-                "location": incident["location_name"],
-                "timestamp": incident["timestamp"],
-                "priority_score": incident["priority_score"]
-            })
-    
-    return results
+    return [
+        {
+            "id": incident.id,
+            "event_type": incident.event_type,
+            "severity_level": incident.severity_level,
+            "status": incident.event_status,
+            "location": incident.location_name,
+            "timestamp": incident.timestamp,
+            "priority_score": incident.priority_score
+        }
+        for incident in (MOCK_INCIDENTS[i] for i in incidents_within(coordinates, radius_km))
+    ]
 
-def mock_ai_analysis(context, question):
-    """Enhanced AI response based on new incident data"""
-    vector_incidents = context.get("vector_incidents", [])
-    graph_incidents = context.get("graph_incidents", [])
-    
-    if not vector_incidents and not graph_incidents:
-        return "No relevant incidents found in the specified area."
-    
-    # Analyze incident patterns
-    event_types = [i.get("event_type", "") for i in vector_incidents]
-    severity_levels = [i.get("severity_level", "") for i in vector_incidents]
-    departments = [i.get("assigned_department", "") for i in vector_incidents]
-    locations = list(set([i.get("location_name", "") for i in vector_incidents]))
-    
-    high_priority = [i for i in vector_incidents if i.get("priority_score", 0) > 0.7]
-    unresolved = [i for i in vector_incidents if i.get("event_status") != "resolved"]
-    
-    # Generate contextual response
-    if "traffic" in question.lower() or "traffic_accident" in event_types:
-        return f"""Traffic Analysis for {locations[0] if locations else 'the area'}:
+# Response templates for mock_ai_analysis, filled from a single context dict
+TRAFFIC_ANALYSIS_TEMPLATE = """Traffic Analysis for {primary_location}:
         
 Current Situation:
-- {len([e for e in event_types if 'traffic' in e])} traffic-related incidents detected
-- {len(high_priority)} high-priority incidents requiring immediate attention
-- Primary affected areas: {', '.join(locations[:3])}
+- {traffic_count} traffic-related incidents detected
+- {high_priority} high-priority incidents requiring immediate attention
+- Primary affected areas: {top_locations}
 
 Risk Assessment:
-- Traffic density: {vector_incidents[0].get('traffic_density', 'unknown') if vector_incidents else 'unknown'}
-- Weather conditions: {vector_incidents[0].get('weather_condition', 'unknown') if vector_incidents else 'unknown'}
-- Peak hours impact: {'Yes' if any(i.get('peak_hours') for i in vector_incidents) else 'No'}
+- Traffic density: {traffic_density}
+- Weather conditions: {weather_condition}
+- Peak hours impact: {peak_hours}
 
 Recommendations:
 - Consider alternative routes for next 2-3 hours
-- Monitor {departments[0] if departments else 'Traffic Police'} updates
-- Expected resolution time: {vector_incidents[0].get('estimated_duration', 'unknown')} minutes"""
+- Monitor {department} updates
+- Expected resolution time: {estimated_duration} minutes"""
 
-    elif "power" in question.lower() or "power_outage" in event_types:
-        return f"""Power Infrastructure Analysis:
+POWER_ANALYSIS_TEMPLATE = """Power Infrastructure Analysis:
         
 Current Status:
-- {len([e for e in event_types if 'power' in e])} power-related incidents
-- Affected areas: {', '.join(locations)}
-- Responsible department: {departments[0] if departments else 'BESCOM'}
+- {power_count} power-related incidents
+- Affected areas: {locations}
+- Responsible department: {department}
 
 Impact Assessment:
-- Estimated affected radius: {vector_incidents[0].get('impact_radius', 'unknown')} meters
-- Verification confidence: {vector_incidents[0].get('verified', 0)*100:.0f}%
-- Resolution status: {vector_incidents[0].get('event_status', 'unknown')}
+- Estimated affected radius: {impact_radius} meters
+- Verification confidence: {verified_pct:.0f}%
+- Resolution status: {event_status}
 
 Next Steps:
-- Estimated restoration: {vector_incidents[0].get('estimated_duration', 'unknown')} minutes
+- Estimated restoration: {estimated_duration} minutes
 - Monitor official updates from utility provider"""
 
-    elif "construction" in question.lower() or "construction" in event_types:
-        return f"""Construction Activity Analysis:
+CONSTRUCTION_ANALYSIS_TEMPLATE = """Construction Activity Analysis:
         
 Project Status:
-- {len([e for e in event_types if 'construction' in e])} active construction projects
-- Locations: {', '.join(locations)}
-- Project duration: {vector_incidents[0].get('estimated_duration', 'unknown')} minutes
+- {construction_count} active construction projects
+- Locations: {locations}
+- Project duration: {estimated_duration} minutes
 
 Traffic Impact:
-- Diversions in effect: {'Yes' if any('diversion' in i.get('description', '') for i in vector_incidents) else 'No'}
-- Peak hours affected: {'Yes' if any(i.get('peak_hours') for i in vector_incidents) else 'No'}
+- Diversions in effect: {diversions}
+- Peak hours affected: {peak_hours}
 
 Planning Recommendations:
 - Allow extra travel time during peak hours
 - Use alternative routes when possible
 - Check for updated diversion routes"""
 
-    else:
-        return f"""Incident Summary for {locations[0] if locations else 'the area'}:
+INCIDENT_SUMMARY_TEMPLATE = """Incident Summary for {primary_location}:
         
 Overview:
-- Total incidents: {len(vector_incidents)}
-- High priority: {len(high_priority)}
-- Unresolved: {len(unresolved)}
-- Event types: {', '.join(set(event_types))}
+- Total incidents: {total}
+- High priority: {high_priority}
+- Unresolved: {unresolved}
+- Event types: {event_types}
 
 Severity Distribution:
-- Critical: {len([s for s in severity_levels if s == 'critical'])}
-- High: {len([s for s in severity_levels if s == 'high'])}
-- Medium: {len([s for s in severity_levels if s == 'medium'])}
-- Low: {len([s for s in severity_levels if s == 'low'])}
+- Critical: {critical}
+- High: {high}
+- Medium: {medium}
+- Low: {low}
+
+Responsible Departments: {departments}
+Average Priority Score: {average_priority:.2f}"""
+
+# Fields of the top-ranked incident quoted in the templates, and their values when there is none
+_LEAD_INCIDENT_FIELDS = attrgetter(
+    "traffic_density", "weather_condition", "estimated_duration", "impact_radius", "verified", "event_status"
+)
+_UNKNOWN_LEAD_INCIDENT = ("unknown", "unknown", "unknown", "unknown", 0, "unknown")
+
+def _count_matching(counts, fragment):
+    """Total count of the Counter keys containing fragment"""
+    return sum(n for key, n in counts.items() if fragment in key)
 
-Responsible Departments: {', '.join(set(departments))}
-Average Priority Score: {sum(i.get('priority_score', 0) for i in vector_incidents) / len(vector_incidents):.2f}"""
+def mock_ai_analysis(context, question):
+    """Enhanced AI response based on new incident data"""
+    vector_incidents = context.get("vector_incidents", [])
+    graph_incidents = context.get("graph_incidents", [])
+    
+    if not vector_incidents and not graph_incidents:
+        return "No relevant incidents found in the specified area."
+    
+    # Analyze incident patterns in a single pass over the results
+    event_types = Counter()
+    severity_levels = Counter()
+    departments = {}
+    locations = {}
+    high_priority_count = unresolved_count = 0
+    priority_sum = 0
+    peak_hours = diversions = False
+    for incident in vector_incidents:
+        event_types[incident.event_type] += 1
+        severity_levels[incident.severity_level] += 1
+        departments.setdefault(incident.assigned_department)
+        locations.setdefault(incident.location_name)
+        priority = incident.priority_score
+        priority_sum += priority
+        high_priority_count += priority > 0.7
+        unresolved_count += incident.event_status != "resolved"
+        peak_hours = peak_hours or bool(incident.peak_hours)
+        diversions = diversions or "diversion" in incident.description
+    departments = list(departments)
+    locations = list(locations)
+    
+    traffic_density, weather_condition, estimated_duration, impact_radius, verified, event_status = (
+        _LEAD_INCIDENT_FIELDS(vector_incidents[0]) if vector_incidents else _UNKNOWN_LEAD_INCIDENT
+    )
+    ctx = {
+        "primary_location": locations[0] if locations else "the area",
+        "top_locations": ", ".join(locations[:3]),
+        "locations": ", ".join(locations),
+        "departments": ", ".join(departments),
+        "traffic_count": _count_matching(event_types, "traffic"),
+        "power_count": _count_matching(event_types, "power"),
+        "construction_count": _count_matching(event_types, "construction"),
+        "event_types": ", ".join(event_types),
+        "total": len(vector_incidents),
+        "high_priority": high_priority_count,
+        "unresolved": unresolved_count,
+        "critical": severity_levels["critical"],
+        "high": severity_levels["high"],
+        "medium": severity_levels["medium"],
+        "low": severity_levels["low"],
+        "average_priority": priority_sum / len(vector_incidents) if vector_incidents else 0,
+        "traffic_density": traffic_density,
+        "weather_condition": weather_condition,
+        "estimated_duration": estimated_duration,
+        "impact_radius": impact_radius,
+        "verified_pct": verified * 100,
+        "event_status": event_status,
+        "peak_hours": "Yes" if peak_hours else "No",
+        "diversions": "Yes" if diversions else "No",
+    }
+    
+    # Generate contextual response
+    question_lower = question.lower()
+    if "traffic" in question_lower or "traffic_accident" in event_types:
+        ctx["department"] = departments[0] if departments else "Traffic Police"
+        return TRAFFIC_ANALYSIS_TEMPLATE.format_map(ctx)
+
+    elif "power" in question_lower or "power_outage" in event_types:
+        ctx["department"] = departments[0] if departments else "BESCOM"
+        return POWER_ANALYSIS_TEMPLATE.format_map(ctx)
+
+    elif "construction" in question_lower or "construction" in event_types:
+        return CONSTRUCTION_ANALYSIS_TEMPLATE.format_map(ctx)
+
+    else:
+        return INCIDENT_SUMMARY_TEMPLATE.format_map(ctx)
 
 def test_incident_query(question, coordinates, radius_km=5, event_types=None, severity_levels=None):
     """Test a single incident query with new schema"""
@@ -309,8 +428,8 @@ def test_incident_query(question, coordinates, radius_km=5, event_types=None, se
     if vector_results:
         print("📋 Top Incidents:")
         for i, incident in enumerate(vector_results[:3], 1):
-            print(f"   {i}. {incident['event_type']} ({incident['severity_level']}) at {incident['location_name']}")
-            print(f"      Status: {incident['event_status']} | Priority: {incident['priority_score']}")
+            print(f"   {i}. {incident.event_type} ({incident.severity_level}) at {incident.location_name}")
+            print(f"      Status: {incident.event_status} | Priority: {incident.priority_score}")
     
     return {
         "analysis": analysis,
@@ -376,7 +495,7 @@ def main():
     print(f"✅ Queries tested: {len(results)}")
     print(f"📊 Average incidents found: {sum(r['vector_results'] for r in results) / len(results):.1f}")
     print(f"🗄️  Average spatial matches: {sum(r['graph_results'] for r in results) / len(results):.1f}")
-    print(f"🏷️  Event types covered: {len(set(i['event_type'] for r in results for i in r['incidents']))}")
+    print(f"🏷️  Event types covered: {len(set(i.event_type for r in results for i in r['incidents']))}")
     print("\n💡 This demonstrates the enhanced City Pulse incident management system!")
     print("🚀 Deploy to GCP for full functionality with real Bengaluru incident data and AI models.")
 
@@ -5,10 +5,70 @@ Test the generated SQLite database
 
 import sqlite3
 import json
-from datetime import datetime
+import math
+from datetime import datetime, timedelta
 
 DB_FILE = 'local_incidents.db'
 
+# Indexes behind the filtered counts below; databases written by the simulator may lack some
+QUERY_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_incidents_priority ON incidents(priority_score)',
+    'CREATE INDEX IF NOT EXISTS idx_incidents_processed_at ON incidents(processed_at)',
+    'CREATE INDEX IF NOT EXISTS idx_agent_activities_timestamp ON agent_activities(timestamp, agent_name)',
+)
+
+# Test queries, kept as constants so each statement text is compiled once and reused
+COUNT_INCIDENTS_SQL = 'SELECT COUNT(*) FROM incidents'
+COUNT_HIGH_PRIORITY_SQL = 'SELECT COUNT(*) FROM incidents WHERE priority_score >= ?'
+COUNT_AGENT_ACTIVITIES_SQL = 'SELECT COUNT(*) FROM agent_activities'
+# Recent incidents and per-agent activity in one round trip; the NULL-named row carries the incident count
+RECENT_ACTIVITY_SQL = '''
+    SELECT NULL, COUNT(*) FROM incidents WHERE processed_at > :since
+    UNION ALL
+    SELECT agent_name, COUNT(*) FROM agent_activities WHERE timestamp > :since GROUP BY agent_name
+'''
+SAMPLE_TIMESTAMPS_SQL = 'SELECT processed_at, timestamp FROM incidents ORDER BY rowid DESC LIMIT ?'
+# Served by idx_incidents_priority as an index scan that stops after LIMIT rows, no sort
+TOP_PRIORITY_SQL = '''
+    SELECT id, event_type, location_name, priority_score, severity_level
+    FROM incidents
+    ORDER BY priority_score DESC
+    LIMIT ?
+'''
+# First few columns plus the total column count, without materializing every table_info row
+SCHEMA_PREVIEW_SQL = "SELECT name, type, COUNT(*) OVER () FROM pragma_table_info('incidents') LIMIT ?"
+HAS_RTREE_SQL = "SELECT 1 FROM sqlite_master WHERE name = 'incidents_rtree'"
+# The R-Tree narrows to the bounding box; haversine_km makes the exact cut
+RADIUS_COUNT_SQL = '''
+    SELECT COUNT(*)
+    FROM incidents_rtree r
+    JOIN incidents i ON i.rowid = r.id
+    WHERE r.minLat <= ? AND r.maxLat >= ? AND r.minLon <= ? AND r.maxLon >= ?
+      AND haversine_km(?, ?, i.latitude, i.longitude) <= ?
+'''
+
+EARTH_RADIUS_KM = 6371.0
+
+_RAD = math.pi / 180
+_HALF_RAD = _RAD / 2
+_EARTH_DIAMETER_KM = 2 * EARTH_RADIUS_KM
+
+def haversine_km(lat1, lon1, lat2, lon2, _sin=math.sin, _cos=math.cos, _asin=math.asin, _sqrt=math.sqrt):
+    """Great-circle distance in km, registered as an SQL function for exact radius checks"""
+    # Called once per candidate row, so the math functions are bound as locals and powers are plain products
+    sin_dlat = _sin((lat2 - lat1) * _HALF_RAD)
+    sin_dlon = _sin((lon2 - lon1) * _HALF_RAD)
+    a = sin_dlat * sin_dlat + _cos(lat1 * _RAD) * _cos(lat2 * _RAD) * sin_dlon * sin_dlon
+    return _EARTH_DIAMETER_KM * _asin(_sqrt(a))
+
+def ensure_indexes(conn):
+    """Make the test queries range scans instead of full table scans"""
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    for sql in QUERY_INDEXES:
+        conn.execute(sql)
+    conn.commit()
+
 def test_database():
     """Test database queries"""
     print("🧪 Testing database queries...")
@@ -16,43 +76,32 @@ def test_database():
     
     try:
         conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+        ensure_indexes(conn)
+        conn.create_function('haversine_km', 4, haversine_km, deterministic=True)
         print("✅ Connected to database")
         
         # Test 1: Total incidents
         print("\n📊 Test 1: Total incidents")
-        cursor.execute('SELECT COUNT(*) as count FROM incidents')
-        row = cursor.fetchone()
+        row = conn.execute(COUNT_INCIDENTS_SQL).fetchone()
         print(f"✅ Total incidents: {row[0]:,}")
         
         # Test 2: High priority incidents
         print("\n🚨 Test 2: High priority incidents")
-        cursor.execute('SELECT COUNT(*) as count FROM incidents WHERE priority_score >= 8')
-        row = cursor.fetchone()
+        row = conn.execute(COUNT_HIGH_PRIORITY_SQL, (8,)).fetchone()
         print(f"✅ High priority incidents: {row[0]:,}")
         
         # Test 3: Recent incidents (last hour)
         print("\n⏰ Test 3: Recent incidents (last hour)")
-        one_hour_ago = datetime.now().replace(microsecond=0).isoformat() + 'Z'
+        # Stored timestamps are UTC isoformat(), so a UTC isoformat() bound compares correctly as text
+        one_hour_ago = (datetime.utcnow() - timedelta(hours=1)).isoformat()
         print(f"🕐 One hour ago timestamp: {one_hour_ago}")
         
-        cursor.execute('''
-            SELECT COUNT(*) as count 
-            FROM incidents 
-            WHERE processed_at > ?
-        ''', (one_hour_ago,))
-        row = cursor.fetchone()
-        print(f"✅ Recent incidents: {row[0]:,}")
+        recent_rows = conn.execute(RECENT_ACTIVITY_SQL, {'since': one_hour_ago}).fetchall()
+        print(f"✅ Recent incidents: {recent_rows[0][1]:,}")
         
         # Test 4: Sample of recent timestamps
         print("\n📅 Test 4: Sample timestamps")
-        cursor.execute('''
-            SELECT processed_at, timestamp 
-            FROM incidents 
-            ORDER BY rowid DESC 
-            LIMIT 5
-        ''')
-        rows = cursor.fetchall()
+        rows = conn.execute(SAMPLE_TIMESTAMPS_SQL, (5,)).fetchall()
         print("✅ Sample timestamps:")
         for i, row in enumerate(rows):
             print(f"  {i+1}. processed_at: {row[0]}")
@@ -60,44 +109,42 @@ def test_database():
         
         # Test 5: Agent activities table
         print("\n🤖 Test 5: Agent activities")
-        cursor.execute('SELECT COUNT(*) as count FROM agent_activities')
-        row = cursor.fetchone()
+        row = conn.execute(COUNT_AGENT_ACTIVITIES_SQL).fetchone()
         print(f"✅ Total agent activities: {row[0]}")
         
-        # Test recent agent activities
-        cursor.execute('''
-            SELECT agent_name, COUNT(*) as count 
-            FROM agent_activities 
-            WHERE timestamp > ?
-            GROUP BY agent_name
-        ''', (one_hour_ago,))
-        rows = cursor.fetchall()
+        # Recent agent activities came back with the Test 3 query
         print("✅ Recent agent activities:")
-        for row in rows:
+        for row in recent_rows[1:]:
             print(f"  {row[0]}: {row[1]}")
         
         # Test 6: Schema verification
         print("\n🔍 Test 6: Schema verification")
-        cursor.execute("PRAGMA table_info(incidents)")
-        columns = cursor.fetchall()
-        print(f"✅ Incidents table has {len(columns)} columns:")
-        for col in columns[:5]:  # Show first 5 columns
-            print(f"  - {col[1]} ({col[2]})")
+        columns = conn.execute(SCHEMA_PREVIEW_SQL, (5,)).fetchall()  # Show first 5 columns
+        print(f"✅ Incidents table has {columns[0][2] if columns else 0} columns:")
+        for col in columns:
+            print(f"  - {col[0]} ({col[1]})")
         print("  ...")
         
         # Test 7: Sample incident data
         print("\n📋 Test 7: Sample incident data")
-        cursor.execute('''
-            SELECT id, event_type, location_name, priority_score, severity_level
-            FROM incidents 
-            ORDER BY priority_score DESC 
-            LIMIT 3
-        ''')
-        rows = cursor.fetchall()
+        rows = conn.execute(TOP_PRIORITY_SQL, (3,)).fetchall()
         print("✅ Top priority incidents:")
         for row in rows:
             print(f"  {row[0]}: {row[1]} at {row[2]} (priority: {row[3]}, severity: {row[4]})")
         
+        # Test 8: Spatial radius query through the R-Tree
+        print("\n📍 Test 8: Incidents within 2 km of MG Road")
+        if conn.execute(HAS_RTREE_SQL).fetchone():
+            lat, lon, radius_km = 12.9716, 77.5946, 2.0
+            dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+            dlon = math.degrees(math.asin(math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))))
+            row = conn.execute(
+                RADIUS_COUNT_SQL, (lat + dlat, lat - dlat, lon + dlon, lon - dlon, lat, lon, radius_km)
+            ).fetchone()
+            print(f"✅ Incidents within {radius_km} km: {row[0]:,}")
+        else:
+            print("⚠️  No incidents_rtree table; regenerate the database with generate_db.py")
+        
         conn.close()
         print("\n✅ Database connection closed")
         print("🎉 All tests passed!")
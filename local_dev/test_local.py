@@ -2,9 +2,9 @@
 """
 Test script for local development API
 """
-import requests
+import asyncio
+import httpx
 import json
-import time
 
 API_URL = "http://localhost:8000"
 
@@ -13,25 +13,36 @@ def test_local_api():
     print("🧪 Testing Local Bengaluru Graph-RAG API")
     print(f"🌐 API URL: {API_URL}")
     print()
-    
-    # Test health endpoint
+    asyncio.run(run_tests())
+
+async def run_tests():
+    """Check the API's health, then run the sample queries concurrently"""
+    async with httpx.AsyncClient(base_url=API_URL) as client:
+        if await check_health(client):
+            await run_queries(client)
+
+async def check_health(client):
+    """Check the health endpoint; returns True when the API is up"""
     print("🔍 Testing health endpoint...")
     try:
-        response = requests.get(f"{API_URL}/health")
+        response = await client.get("/health")
         print(f"Status: {response.status_code}")
         if response.status_code == 200:
             print(f"Response: {response.json()}")
             print("✅ Health check passed")
         else:
             print("❌ Health check failed")
-            return
-    except requests.exceptions.ConnectionError:
+            return False
+    except httpx.ConnectError:
         print("❌ Connection failed. Make sure the local server is running:")
         print("   python local_dev/run_local.py")
-        return
+        return False
     
     print()
-    
+    return True
+
+async def run_queries(client):
+    """Send the sample queries concurrently and print results in order"""
     # Test queries
     test_queries = [
         {
@@ -67,33 +78,30 @@ def test_local_api():
     ]
     
     print("🔍 Testing ask endpoint with sample queries...")
-    for i, query in enumerate(test_queries, 1):
+    responses = await asyncio.gather(
+        *(client.post("/ask", json=query) for query in test_queries),
+        return_exceptions=True
+    )
+    
+    for i, (query, response) in enumerate(zip(test_queries, responses), 1):
         print(f"\n--- Test Query {i} ---")
         print(f"Question: {query['question']}")
         print(f"Location: ({query['lat']}, {query['lon']})")
         print(f"Radius: {query['radius_km']} km")
         
-        try:
-            response = requests.post(
-                f"{API_URL}/ask",
-                json=query,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            print(f"Status: {response.status_code}")
-            if response.status_code == 200:
-                result = response.json()
-                print(f"Answer: {result.get('answer', 'No answer')}")
-                print(f"Vector Results: {result.get('vector_results', 0)}")
-                print(f"Graph Results: {result.get('graph_results', 0)}")
-                print(f"Mode: {result.get('mode', 'unknown')}")
-            else:
-                print(f"Error: {response.text}")
-                
-        except Exception as e:
-            print(f"❌ Error: {e}")
+        if isinstance(response, Exception):
+            print(f"❌ Error: {response}")
+            continue
         
-        time.sleep(0.5)  # Small delay between requests
+        print(f"Status: {response.status_code}")
+        if response.status_code == 200:
+            result = response.json()
+            print(f"Answer: {result.get('answer', 'No answer')}")
+            print(f"Vector Results: {result.get('vector_results', 0)}")
+            print(f"Graph Results: {result.get('graph_results', 0)}")
+            print(f"Mode: {result.get('mode', 'unknown')}")
+        else:
+            print(f"Error: {response.text}")
     
     print("\n🎉 Local testing complete!")
     print("💡 To test the full system, deploy to GCP with: ./deploy.ps1")
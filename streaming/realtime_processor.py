@@ -1,36 +1,163 @@
-import json
+import io
 import os
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import asyncio
+from collections import OrderedDict, defaultdict
 
+import h3
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
 from google.cloud import pubsub_v1
 from google.cloud import bigquery
 from google.cloud import firestore
 from google.cloud import storage
 from google.cloud import aiplatform
 import vertexai
+from google.api_core import exceptions as google_exceptions
 from vertexai.language_models import TextEmbeddingModel
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+VERTEXAI_LOCATION = "asia-south1"
+# Texts per get_embeddings call; gecko takes 250 in us-central1 but only 5 in other regions
+EMBEDDING_BATCH_SIZE = int(os.getenv(
+    "VERTEXAI_EMBEDDING_LOCAL_BATCH_SIZE", "250" if VERTEXAI_LOCATION == "us-central1" else "5"
+))
+# Decimals kept per embedding component in JSON rows; 6 keeps unit-vector distances well
+# within float32 noise while roughly halving the serialized size of each row
+EMBEDDING_DECIMALS = 6
+# Rows per insert_rows_json request, and the longest a streamed row waits in the buffer
+BQ_INSERT_BATCH_ROWS = 500
+BQ_FLUSH_INTERVAL_SECONDS = 1.0
+# Rows gathered per Parquet load job during bulk loads
+BQ_LOAD_JOB_MIN_ROWS = 50000
+# Distinct texts whose embeddings are kept for reuse (3 KB each as float32)
+EMBEDDING_CACHE_SIZE = 10000
+# Synchronous pull workers, the messages each asks for per pull, and how long a pull may wait
+PULL_WORKERS = int(os.getenv("PULL_WORKERS", str(2 * (os.cpu_count() or 1))))
+PULL_MAX_MESSAGES = 100
+PULL_TIMEOUT_SECONDS = 30.0
+# Ack ids sent per acknowledge request, and the longest an ack waits to be sent
+ACK_BATCH_SIZE = 100
+ACK_FLUSH_INTERVAL_SECONDS = 0.5
+# Inserted incidents per Firestore commit; each takes one write plus at most one
+# area update, within the 500 writes a commit allows
+FIRESTORE_BATCH_INCIDENTS = 200
+# Embedding requests in flight at once during bulk loads; size to the Vertex QPS quota
+EMBEDDING_MAX_WORKERS = int(os.getenv("VERTEXAI_EMBEDDING_MAX_WORKERS", "8"))
+# Incidents per bulk-load batch; embed_texts splits each batch into requests of
+# EMBEDDING_BATCH_SIZE texts, so this is independent of the per-request limit
+BULK_BATCH_SIZE = 100
+
+# Incident fields mirrored into Firestore for the real-time UI; stream metadata such as
+# stream_timestamp and processing_status stays out of the documents
+FIRESTORE_FIELDS = frozenset([
+    "id", "event_type", "sub_category", "description", "keywords", "language",
+    "latitude", "longitude", "coordinates", "location_name", "area_category", "ward_number", "pincode",
+    "timestamp", "estimated_duration", "actual_duration", "peak_hours", "severity_level", "priority_score",
+    "impact_radius", "source", "verified", "reporter_id", "verification_count", "media_type", "media_url",
+    "event_status", "assigned_department", "resolution_notes", "weather_condition", "traffic_density",
+])
+
+# Arrow types for the BigQuery column types bulk loads write, and the values used
+# for missing optional fields
+BQ_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INTEGER": pa.int64(),
+    "FLOAT": pa.float64(),
+    "BOOLEAN": pa.bool_(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+}
+BQ_COLUMN_DEFAULTS = {
+    "keywords": [], "language": "en", "peak_hours": False, "impact_radius": 1,
+    "verified": 0.0, "verification_count": 0, "event_status": "reported",
+}
+
+def arrow_schema(bq_schema: List[bigquery.SchemaField]) -> pa.Schema:
+    """Arrow schema matching a BigQuery table schema, so Parquet loads need no type conversion"""
+    fields = []
+    for field in bq_schema:
+        arrow_type = BQ_ARROW_TYPES[field.field_type]
+        if field.mode == "REPEATED":
+            arrow_type = pa.list_(arrow_type)
+        fields.append(pa.field(field.name, arrow_type, nullable=field.mode != "REQUIRED"))
+    return pa.schema(fields)
+
+def incident_coordinates(incident_data: Dict[str, Any]) -> List[float]:
+    """[lat, lon] of an incident, whether it carries coordinates or latitude and longitude"""
+    return incident_data.get("coordinates") or [incident_data["latitude"], incident_data["longitude"]]
+
+def embedding_text(incident_data: Dict[str, Any]) -> str:
+    """Text embedded for an incident: its description followed by its keywords"""
+    return f"{incident_data['description']} {' '.join(incident_data.get('keywords', []))}"
+
+def create_publisher() -> pubsub_v1.PublisherClient:
+    """Create a publisher that batches messages before sending
+    
+    Publishing blocks once too many messages are waiting on the server,
+    so a slow Pub/Sub backend throttles the processor instead of growing memory.
+    """
+    return pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(
+            max_messages=1000,
+            max_bytes=1_000_000,
+            max_latency=0.05,
+        ),
+        publisher_options=pubsub_v1.types.PublisherOptions(
+            flow_control=pubsub_v1.types.PublishFlowControl(
+                message_limit=10000,
+                byte_limit=50 * 1024 * 1024,
+                limit_exceeded_behavior=pubsub_v1.types.LimitExceededBehavior.BLOCK,
+            )
+        )
+    )
+
+class PulledMessage:
+    """A synchronously pulled message, acked and nacked like a streaming-pull message"""
+    
+    def __init__(self, received_message, processor: "RealTimeIncidentProcessor"):
+        self.data = received_message.message.data
+        self.ack_id = received_message.ack_id
+        self._processor = processor
+    
+    def ack(self):
+        # Acks are batched into shared acknowledge requests
+        self._processor.queue_ack(self.ack_id)
+    
+    def nack(self):
+        # A zero deadline makes the message available for redelivery right away
+        self._processor.subscriber.modify_ack_deadline(request={
+            "subscription": self._processor.incident_subscription,
+            "ack_ids": [self.ack_id],
+            "ack_deadline_seconds": 0
+        })
+
 class RealTimeIncidentProcessor:
     """Real-time incident data processor with streaming capabilities"""
     
     def __init__(self, project_id: str):
         self.project_id = project_id
-        self.publisher = pubsub_v1.PublisherClient()
+        self.publisher = create_publisher()
+        # Unconfirmed publishes; the pull workers publish from several threads
+        self._publish_futures = deque()
+        self._publish_lock = threading.Lock()
         self.subscriber = pubsub_v1.SubscriberClient()
         self.bq_client = bigquery.Client(project=project_id)
         self.firestore_client = firestore.Client(project=project_id)
         self.storage_client = storage.Client(project=project_id)
         
         # Initialize Vertex AI
-        vertexai.init(project=project_id, location="asia-south1")
+        vertexai.init(project=project_id, location=VERTEXAI_LOCATION)
         self.embedding_model = TextEmbeddingModel.from_pretrained("textembedding-gecko@003")
         
         # Topic paths
@@ -47,8 +174,25 @@ class RealTimeIncidentProcessor:
         self.realtime_table = f"{project_id}.bengaluru_events.real_time_incidents"
         self.analytics_table = f"{project_id}.bengaluru_events.analytics"
         
-    def publish_incident(self, incident_data: Dict[str, Any]) -> str:
-        """Publish incident to real-time stream"""
+        # Streamed rows awaiting insert, each with its Pub/Sub message and the incident
+        # to announce once it lands
+        self._bq_buffer = []
+        self._bq_lock = threading.Lock()
+        self._bq_flushed_at = time.monotonic()
+        self._stopping = threading.Event()
+        
+        # Ack ids of processed messages waiting for the next acknowledge request
+        self._pending_acks = []
+        self._ack_lock = threading.Lock()
+        # Writes to the two BigQuery tables run side by side
+        self._bq_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bq-insert")
+        
+        # Recently embedded texts, so repeated descriptions share one embedding
+        self._embedding_cache = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        
+    def publish_incident(self, incident_data: Dict[str, Any]):
+        """Publish incident to real-time stream, returning the publish future"""
         try:
             # Add processing metadata
             incident_data.update({
@@ -58,17 +202,14 @@ class RealTimeIncidentProcessor:
             })
             
             # Publish to incident stream
-            message_data = json.dumps(incident_data).encode('utf-8')
-            future = self.publisher.publish(self.incident_topic, message_data)
-            message_id = future.result()
-            
-            logger.info(f"Published incident {incident_data.get('id')} to stream: {message_id}")
+            message_data = orjson.dumps(incident_data)
+            future = self._publish(self.incident_topic, message_data)
             
             # Trigger agent tasks for high-priority incidents
             if incident_data.get("priority_score", 0) >= 8.0:
                 self._trigger_high_priority_agents(incident_data)
             
-            return message_id
+            return future
             
         except Exception as e:
             logger.error(f"Error publishing incident: {e}")
@@ -99,46 +240,140 @@ class RealTimeIncidentProcessor:
         ]
         
         for task in agent_tasks:
-            task_data = json.dumps(task).encode('utf-8')
-            self.publisher.publish(self.agent_topic, task_data)
+            task_data = orjson.dumps(task)
+            self._publish(self.agent_topic, task_data)
+    
+    def _publish(self, topic: str, data: bytes):
+        """Publish a message without blocking on the server confirm"""
+        future = self.publisher.publish(topic, data)
+        future.add_done_callback(self._log_publish)
+        with self._publish_lock:
+            self._publish_futures.append(future)
+            self._drain_publish_futures()
+        return future
+    
+    def _log_publish(self, future):
+        """Log the outcome of a publish once the server has answered"""
+        error = future.exception()
+        if error:
+            logger.error(f"Error publishing message: {error}")
+        else:
+            logger.debug(f"Published message {future.result()}")
+    
+    def _drain_publish_futures(self):
+        """Forget publish futures that have already completed; the caller holds _publish_lock"""
+        while self._publish_futures and self._publish_futures[0].done():
+            self._publish_futures.popleft()
+    
+    def flush(self):
+        """Wait for every outstanding publish to be confirmed"""
+        with self._publish_lock:
+            outstanding = list(self._publish_futures)
+            self._publish_futures.clear()
+        wait(outstanding)
     
     def process_incident_stream(self, message):
         """Process incoming incident from stream"""
+        self.process_incident_batch([message])
+    
+    def process_incident_batch(self, messages: List[Any]):
+        """Process incoming incidents from stream, embedding them together"""
+        parsed = []
+        for message in messages:
+            try:
+                incident_data = orjson.loads(message.data)
+                parsed.append((message, incident_data, embedding_text(incident_data)))
+            except Exception as e:
+                logger.error(f"Error processing incident: {e}")
+                message.nack()
+        if not parsed:
+            return
+        
+        # 1. Generate embeddings for the whole batch
+        try:
+            all_embeddings = self.embed_texts([text for _, _, text in parsed])
+        except Exception as e:
+            logger.error(f"Error embedding {len(parsed)} incidents: {e}")
+            for message, _, _ in parsed:
+                message.nack()
+            return
+        
+        for (message, incident_data, _), embeddings in zip(parsed, all_embeddings):
+            self._process_incident(message, incident_data, embeddings)
+    
+    def _process_incident(self, message, incident_data: Dict[str, Any], embeddings: np.ndarray):
+        """Store, index and announce one embedded incident"""
         try:
-            incident_data = json.loads(message.data.decode('utf-8'))
             incident_id = incident_data.get("id")
             
             logger.info(f"Processing incident: {incident_id}")
-            
-            # 1. Generate embeddings
-            embedding_text = f"{incident_data['description']} {' '.join(incident_data.get('keywords', []))}"
-            embeddings = self.embedding_model.get_embeddings([embedding_text])[0].values
+            # One processing time for every event published about this incident
+            now_iso = datetime.utcnow().isoformat()
             
             # 2. Prepare data for BigQuery
             bq_row = self._prepare_bigquery_row(incident_data, embeddings)
             
-            # 3. Insert into BigQuery (both tables)
-            self._insert_to_bigquery([bq_row])
-            
-            # 4. Update Firestore for real-time UI
-            self._update_firestore(incident_data)
-            
-            # 5. Publish analytics events
-            self._publish_analytics_events(incident_data)
-            
-            # 6. Send notifications if needed
-            if incident_data.get("priority_score", 0) >= 7.0:
-                self._send_notifications(incident_data)
-            
-            message.ack()
-            logger.info(f"Successfully processed incident: {incident_id}")
+            # 3. Queue for BigQuery (both tables). Firestore, analytics and notifications
+            # follow once the row is inserted, since their updates are not safe to repeat
+            # when a failed insert is redelivered
+            self._buffer_bigquery_row(bq_row, message, incident_data, now_iso)
+            logger.info(f"Queued incident: {incident_id}")
             
         except Exception as e:
             logger.error(f"Error processing incident: {e}")
             message.nack()
     
-    def _prepare_bigquery_row(self, incident_data: Dict[str, Any], embeddings: List[float]) -> Dict[str, Any]:
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts with as few get_embeddings calls as the request limits allow
+        
+        Returns a float32 array with one row per text; rows stay packed until a
+        BigQuery row is serialized.
+        """
+        # Only distinct texts missing from the cache are sent; repeats reuse one embedding
+        known = {}
+        with self._embedding_cache_lock:
+            for text in dict.fromkeys(texts):
+                if text in self._embedding_cache:
+                    self._embedding_cache.move_to_end(text)
+                    known[text] = self._embedding_cache[text]
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+        
+        for i in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+            chunk = missing[i:i + EMBEDDING_BATCH_SIZE]
+            known.update(zip(chunk, self._embed_chunk(chunk)))
+        
+        if missing:
+            with self._embedding_cache_lock:
+                for text in missing:
+                    # Copied so an evicted row does not keep its whole chunk alive
+                    self._embedding_cache[text] = known[text].copy()
+                while len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+                    self._embedding_cache.popitem(last=False)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([known[text] for text in texts])
+    
+    def _embed_chunk(self, texts: List[str]) -> np.ndarray:
+        """Embed one request's worth of texts, halving the request if it is rejected as too large"""
+        try:
+            return np.array(
+                [embedding.values for embedding in self.embedding_model.get_embeddings(texts)], dtype=np.float32
+            )
+        except google_exceptions.InvalidArgument:
+            if len(texts) == 1:
+                raise
+            mid = len(texts) // 2
+            logger.warning(f"Embedding request of {len(texts)} texts rejected, retrying in halves")
+            return np.concatenate([self._embed_chunk(texts[:mid]), self._embed_chunk(texts[mid:])])
+    
+    def _prepare_bigquery_row(self, incident_data: Dict[str, Any], embeddings: np.ndarray) -> Dict[str, Any]:
         """Prepare incident data for BigQuery insertion"""
+        # Embeddings are stored unit-length so search can rank by Euclidean distance;
+        # normalizing in float64 keeps the rounded values short decimals in JSON
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        embeddings_256 = embeddings[:256] / np.linalg.norm(embeddings[:256])
+        embeddings = embeddings / np.linalg.norm(embeddings)
+        coordinates = incident_coordinates(incident_data)
         return {
             "id": incident_data["id"],
             "event_type": incident_data["event_type"],
@@ -146,8 +381,8 @@ class RealTimeIncidentProcessor:
             "description": incident_data["description"],
             "keywords": incident_data.get("keywords", []),
             "language": incident_data.get("language", "en"),
-            "latitude": float(incident_data["latitude"]),
-            "longitude": float(incident_data["longitude"]),
+            "coordinates": coordinates,
+            "h3_cell_r9": h3.latlng_to_cell(coordinates[0], coordinates[1], 9),
             "location_name": incident_data["location_name"],
             "area_category": incident_data["area_category"],
             "ward_number": incident_data["ward_number"],
@@ -157,8 +392,8 @@ class RealTimeIncidentProcessor:
             "actual_duration": incident_data.get("actual_duration"),
             "peak_hours": incident_data.get("peak_hours", False),
             "severity_level": incident_data["severity_level"],
-            "priority_score": float(incident_data["priority_score"]),
-            "impact_radius": float(incident_data.get("impact_radius", 1.0)),
+            "priority_score": incident_data["priority_score"],
+            "impact_radius": incident_data.get("impact_radius", 1.0),
             "source": incident_data["source"],
             "verified": incident_data.get("verified", False),
             "reporter_id": incident_data.get("reporter_id"),
@@ -170,42 +405,181 @@ class RealTimeIncidentProcessor:
             "resolution_notes": incident_data.get("resolution_notes"),
             "weather_condition": incident_data.get("weather_condition"),
             "traffic_density": incident_data.get("traffic_density"),
-            "embedding": [{"value": float(x)} for x in embeddings]
+            "embedding": np.round(embeddings, EMBEDDING_DECIMALS).tolist(),
+            "embedding_256": np.round(embeddings_256, EMBEDDING_DECIMALS).tolist()
         }
     
-    def _insert_to_bigquery(self, rows: List[Dict[str, Any]]):
-        """Insert rows into BigQuery tables"""
-        # Insert into both embeddings and real-time tables
-        for table_id in [self.embeddings_table, self.realtime_table]:
-            job = self.bq_client.load_table_from_json(rows, table_id)
-            job.result()  # Wait for completion
+    def _insert_to_bigquery(self, rows: List[Dict[str, Any]]) -> set:
+        """Insert rows into BigQuery tables, returning the indexes of rows that were rejected"""
+        # Insert into both embeddings and real-time tables at once
+        futures = {
+            table_id: self._bq_pool.submit(self._insert_into_table, table_id, rows)
+            for table_id in [self.embeddings_table, self.realtime_table]
+        }
+        wait(futures.values())
+        
+        failed = set()
+        table_errors = []
+        for table_id, future in futures.items():
+            try:
+                failed.update(future.result())
+            except Exception as e:
+                logger.error(f"Error inserting {len(rows)} rows into {table_id}: {e}")
+                table_errors.append(table_id)
+        if table_errors:
+            raise RuntimeError(f"BigQuery insert failed for {', '.join(table_errors)}")
+        return failed
     
-    def _update_firestore(self, incident_data: Dict[str, Any]):
-        """Update Firestore for real-time UI updates"""
-        doc_ref = self.firestore_client.collection('incidents').document(incident_data["id"])
+    def _insert_into_table(self, table_id: str, rows: List[Dict[str, Any]]) -> set:
+        """Insert rows into one table, returning the indexes of rows that were rejected"""
+        # Streaming inserts; row ids let BigQuery drop duplicates from redelivered messages
+        failed = set()
+        row_ids = [row["id"] for row in rows]
+        for start in range(0, len(rows), BQ_INSERT_BATCH_ROWS):
+            errors = self.bq_client.insert_rows_json(
+                table_id,
+                rows[start:start + BQ_INSERT_BATCH_ROWS],
+                row_ids=row_ids[start:start + BQ_INSERT_BATCH_ROWS],
+                skip_invalid_rows=False
+            )
+            for error in errors:
+                logger.error(f"BigQuery rejected row {row_ids[start + error['index']]} in {table_id}: {error['errors']}")
+                failed.add(start + error["index"])
+        return failed
+    
+    def _buffer_bigquery_row(self, row: Dict[str, Any], message, incident_data: Dict[str, Any], processed_at: str):
+        """Queue a streamed row, flushing when the buffer is full or has waited long enough"""
+        with self._bq_lock:
+            self._bq_buffer.append((row, message, incident_data, processed_at))
+            if (len(self._bq_buffer) < BQ_INSERT_BATCH_ROWS
+                    and time.monotonic() - self._bq_flushed_at < BQ_FLUSH_INTERVAL_SECONDS):
+                return
+            pending = self._take_bq_buffer()
+        self._flush_rows(pending)
+    
+    def _take_bq_buffer(self) -> List[tuple]:
+        """Swap out the buffered rows; the caller holds _bq_lock"""
+        pending, self._bq_buffer = self._bq_buffer, []
+        self._bq_flushed_at = time.monotonic()
+        return pending
+    
+    def flush_bigquery_buffer(self):
+        """Insert every buffered row now"""
+        with self._bq_lock:
+            pending = self._take_bq_buffer()
+        if pending:
+            self._flush_rows(pending)
+    
+    def _flush_rows(self, pending: List[tuple]):
+        """Insert buffered rows, then announce the inserted incidents and nack the ones that failed"""
+        rows = [entry[0] for entry in pending]
+        try:
+            failed = self._insert_to_bigquery(rows)
+        except Exception as e:
+            logger.error(f"Error inserting {len(rows)} rows into BigQuery: {e}")
+            failed = set(range(len(rows)))
         
-        # Prepare Firestore document
-        firestore_data = {
-            **incident_data,
-            "last_updated": firestore.SERVER_TIMESTAMP,
-            "ui_status": "active" if incident_data.get("event_status") in ["reported", "in_progress"] else "resolved"
-        }
+        inserted = []
+        for i, (_, message, incident_data, processed_at) in enumerate(pending):
+            if i in failed:
+                message.nack()
+            else:
+                inserted.append((message, incident_data, processed_at))
         
-        doc_ref.set(firestore_data, merge=True)
+        for start in range(0, len(inserted), FIRESTORE_BATCH_INCIDENTS):
+            self._announce_incidents(inserted[start:start + FIRESTORE_BATCH_INCIDENTS])
+    
+    def _announce_incidents(self, inserted: List[tuple]):
+        """Update Firestore and publish events for inserted incidents, then ack their messages"""
+        try:
+            self._update_firestore([incident_data for _, incident_data, _ in inserted])
+        except Exception as e:
+            # Nothing in the batch was applied, so the redelivered incidents are counted once
+            logger.error(f"Error updating Firestore for {len(inserted)} incidents: {e}")
+            for message, _, _ in inserted:
+                message.nack()
+            return
         
-        # Update area-wise statistics
-        area_ref = self.firestore_client.collection('area_stats').document(incident_data["area_category"])
-        area_ref.set({
+        for message, incident_data, processed_at in inserted:
+            # Once the area statistics are committed the message is acked even if an
+            # event fails to publish, so a redelivery cannot count the incident twice
+            try:
+                self._publish_analytics_events(incident_data, processed_at)
+                if incident_data.get("priority_score", 0) >= 7.0:
+                    self._send_notifications(incident_data, processed_at)
+            except Exception as e:
+                logger.error(f"Error publishing events for incident {incident_data.get('id')}: {e}")
+            message.ack()
+    
+    def _flush_periodically(self):
+        """Flush rows and acks that arrive too slowly to fill their batches"""
+        while not self._stopping.wait(ACK_FLUSH_INTERVAL_SECONDS):
+            self.flush_acks()
+            if time.monotonic() - self._bq_flushed_at >= BQ_FLUSH_INTERVAL_SECONDS:
+                self.flush_bigquery_buffer()
+    
+    def queue_ack(self, ack_id: str):
+        """Queue a message ack, sending the queue once a full request has built up"""
+        with self._ack_lock:
+            self._pending_acks.append(ack_id)
+            if len(self._pending_acks) < ACK_BATCH_SIZE:
+                return
+            ack_ids, self._pending_acks = self._pending_acks, []
+        self._send_acks(ack_ids)
+    
+    def flush_acks(self):
+        """Send every queued ack now"""
+        with self._ack_lock:
+            ack_ids, self._pending_acks = self._pending_acks, []
+        if ack_ids:
+            self._send_acks(ack_ids)
+    
+    def _send_acks(self, ack_ids: List[str]):
+        """Acknowledge messages in one request; unacked messages are redelivered and deduplicated by row id"""
+        try:
+            self.subscriber.acknowledge(request={"subscription": self.incident_subscription, "ack_ids": ack_ids})
+        except Exception as e:
+            logger.error(f"Error acknowledging {len(ack_ids)} messages: {e}")
+    
+    def _update_firestore(self, incidents: List[Dict[str, Any]]):
+        """Update Firestore for real-time UI updates"""
+        # Incident documents and area statistics go out in a single commit, with
+        # one increment per area
+        area_totals = defaultdict(lambda: [0, 0])
+        batch = self.firestore_client.batch()
+        for incident_data in incidents:
+            batch.set(*self._incident_document(incident_data), merge=True)
+            totals = area_totals[incident_data["area_category"]]
+            totals[0] += 1
+            totals[1] += incident_data.get("priority_score", 0)
+        for area_category, (incident_count, priority_sum) in area_totals.items():
+            batch.set(*self._area_stats_update(area_category, incident_count, priority_sum), merge=True)
+        batch.commit()
+    
+    def _incident_document(self, incident_data: Dict[str, Any]) -> tuple:
+        """Firestore reference and document for an incident"""
+        doc_ref = self.firestore_client.collection('incidents').document(incident_data["id"])
+        
+        # Prepare Firestore document from the UI fields only
+        firestore_data = {key: value for key, value in incident_data.items() if key in FIRESTORE_FIELDS}
+        firestore_data["last_updated"] = firestore.SERVER_TIMESTAMP
+        firestore_data["ui_status"] = "active" if incident_data.get("event_status") in ("reported", "in_progress") else "resolved"
+        return doc_ref, firestore_data
+    
+    def _area_stats_update(self, area_category: str, incident_count: int, priority_sum: float) -> tuple:
+        """Firestore reference and increments for an area's statistics"""
+        area_ref = self.firestore_client.collection('area_stats').document(area_category)
+        return area_ref, {
             "last_incident": firestore.SERVER_TIMESTAMP,
-            "incident_count": firestore.Increment(1),
-            "priority_sum": firestore.Increment(incident_data.get("priority_score", 0))
-        }, merge=True)
+            "incident_count": firestore.Increment(incident_count),
+            "priority_sum": firestore.Increment(priority_sum)
+        }
     
-    def _publish_analytics_events(self, incident_data: Dict[str, Any]):
+    def _publish_analytics_events(self, incident_data: Dict[str, Any], timestamp: str):
         """Publish analytics events for real-time dashboards"""
         analytics_events = [
             {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": timestamp,
                 "metric_name": "incident_count",
                 "metric_value": 1.0,
                 "dimensions": {
@@ -215,7 +589,7 @@ class RealTimeIncidentProcessor:
                 }
             },
             {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": timestamp,
                 "metric_name": "priority_score",
                 "metric_value": float(incident_data.get("priority_score", 0)),
                 "dimensions": {
@@ -226,10 +600,10 @@ class RealTimeIncidentProcessor:
         ]
         
         for event in analytics_events:
-            event_data = json.dumps(event).encode('utf-8')
-            self.publisher.publish(self.analytics_topic, event_data)
+            event_data = orjson.dumps(event)
+            self._publish(self.analytics_topic, event_data)
     
-    def _send_notifications(self, incident_data: Dict[str, Any]):
+    def _send_notifications(self, incident_data: Dict[str, Any], timestamp: str):
         """Send notifications for high-priority incidents"""
         notification_data = {
             "type": "high_priority_incident",
@@ -239,31 +613,62 @@ class RealTimeIncidentProcessor:
             "priority_score": incident_data.get("priority_score", 0),
             "location": incident_data["location_name"],
             "departments": [incident_data["assigned_department"]],
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": timestamp
         }
         
-        notification_json = json.dumps(notification_data).encode('utf-8')
-        self.publisher.publish(self.notification_topic, notification_json)
+        notification_json = orjson.dumps(notification_data)
+        self._publish(self.notification_topic, notification_json)
     
     def start_streaming_processor(self):
         """Start the streaming processor"""
         logger.info("Starting real-time incident processor...")
         
-        flow_control = pubsub_v1.types.FlowControl(max_messages=100)
+        flusher = threading.Thread(target=self._flush_periodically, name="flusher", daemon=True)
+        flusher.start()
         
-        streaming_pull_future = self.subscriber.subscribe(
-            self.incident_subscription,
-            callback=self.process_incident_stream,
-            flow_control=flow_control
-        )
+        # Synchronous pull from a pool of workers sustains more throughput than streaming pull
+        workers = [
+            threading.Thread(target=self._pull_messages, name=f"puller-{i}", daemon=True)
+            for i in range(PULL_WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
         
-        logger.info(f"Listening for messages on {self.incident_subscription}...")
+        logger.info(f"Listening for messages on {self.incident_subscription} with {PULL_WORKERS} workers...")
         
         try:
-            streaming_pull_future.result()
+            while not self._stopping.is_set():
+                self._stopping.wait(1)
         except KeyboardInterrupt:
-            streaming_pull_future.cancel()
+            self._stopping.set()
+            for worker in workers:
+                worker.join()
+            flusher.join()
+            self.flush_bigquery_buffer()
+            self.flush_acks()
+            self.flush()
             logger.info("Streaming processor stopped.")
+    
+    def _pull_messages(self):
+        """Pull and process batches of incidents until the processor stops"""
+        while not self._stopping.is_set():
+            try:
+                response = self.subscriber.pull(
+                    request={"subscription": self.incident_subscription, "max_messages": PULL_MAX_MESSAGES},
+                    timeout=PULL_TIMEOUT_SECONDS
+                )
+            except google_exceptions.DeadlineExceeded:
+                continue
+            except Exception as e:
+                logger.error(f"Error pulling messages: {e}")
+                self._stopping.wait(1)
+                continue
+            
+            if response.received_messages:
+                self.process_incident_batch([
+                    PulledMessage(received, self)
+                    for received in response.received_messages
+                ])
 
 class BulkDataLoader:
     """Load bulk historical data (10k+ incidents) efficiently"""
@@ -271,51 +676,153 @@ class BulkDataLoader:
     def __init__(self, project_id: str):
         self.project_id = project_id
         self.processor = RealTimeIncidentProcessor(project_id)
-        self.batch_size = 100
+        self.batch_size = BULK_BATCH_SIZE
+        self.embedding_workers = EMBEDDING_MAX_WORKERS
+        
+        # Both tables share one schema (infra/embeddings_schema.json)
+        self.arrow_schema = arrow_schema(self.processor.bq_client.get_table(self.processor.embeddings_table).schema)
+        
+        # Batches are gathered into Parquet load jobs, keeping the number of jobs within table quotas
+        self._pending_tables = []
+        self._pending_rows = 0
+        parquet_options = bigquery.ParquetOptions()
+        parquet_options.enable_list_inference = True
+        self.load_job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            parquet_options=parquet_options
+        )
     
     def load_historical_data(self, data_file: str):
         """Load historical incident data in batches"""
         logger.info(f"Loading historical data from {data_file}")
         
-        with open(data_file, 'r') as f:
-            incidents = json.load(f)
+        with open(data_file, 'rb') as f:
+            incidents = orjson.loads(f.read())
         
-        # Process in batches
-        total_batches = len(incidents) // self.batch_size + 1
+        # Process in batches; embedding requests for several batches run concurrently
+        total_batches = -(-len(incidents) // self.batch_size)
+        max_in_flight = 2 * self.embedding_workers
         
-        for i in range(0, len(incidents), self.batch_size):
-            batch = incidents[i:i + self.batch_size]
-            batch_num = i // self.batch_size + 1
-            
-            logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch)} incidents)")
-            
-            # Process batch with embeddings
-            self._process_batch(batch)
+        embed_pool = ThreadPoolExecutor(max_workers=self.embedding_workers, thread_name_prefix="embed")
+        pending = {}
+        stored = 0
+        try:
+            for start in range(0, len(incidents), self.batch_size):
+                batch = incidents[start:start + self.batch_size]
+                pending[embed_pool.submit(self.processor.embed_texts, [embedding_text(incident) for incident in batch])] = batch
+                
+                # Only a bounded window of batches is embedding or waiting to be stored at once
+                if len(pending) >= max_in_flight:
+                    stored = self._store_finished_batches(pending, stored, total_batches)
+            while pending:
+                stored = self._store_finished_batches(pending, stored, total_batches)
+            self._load_pending_tables()
+        finally:
+            embed_pool.shutdown(wait=False, cancel_futures=True)
             
         logger.info(f"Successfully loaded {len(incidents)} historical incidents")
     
-    def _process_batch(self, batch: List[Dict[str, Any]]):
-        """Process a batch of incidents"""
-        rows = []
-        
-        for incident in batch:
-            # Generate embeddings
-            embedding_text = f"{incident['description']} {' '.join(incident.get('keywords', []))}"
-            embeddings = self.processor.embedding_model.get_embeddings([embedding_text])[0].values
+    def _store_finished_batches(self, pending: Dict[Any, List[Dict[str, Any]]], stored: int, total_batches: int) -> int:
+        """Store the batches whose embeddings are ready, returning the running count of stored batches"""
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            batch = pending.pop(future)
+            stored += 1
+            logger.info(f"Processing batch {stored}/{total_batches} ({len(batch)} incidents)")
             
-            # Prepare BigQuery row
-            row = self.processor._prepare_bigquery_row(incident, embeddings)
-            rows.append(row)
-        
-        # Bulk insert to BigQuery
-        self.processor._insert_to_bigquery(rows)
-        
-        # Update Firestore for recent incidents (last 7 days)
-        recent_cutoff = datetime.utcnow() - timedelta(days=7)
-        for incident in batch:
-            incident_time = datetime.fromisoformat(incident["timestamp"].replace('Z', '+00:00'))
-            if incident_time > recent_cutoff:
-                self.processor._update_firestore(incident)
+            # Store batch with its embeddings
+            self._process_batch(batch, future.result())
+        return stored
+    
+    def _process_batch(self, batch: List[Dict[str, Any]], all_embeddings: np.ndarray):
+        """Process a batch of incidents with their embeddings"""
+        # Queue the batch's BigQuery rows for the next load job
+        self._pending_tables.append(self._bigquery_table(batch, all_embeddings))
+        self._pending_rows += len(batch)
+        if self._pending_rows >= BQ_LOAD_JOB_MIN_ROWS:
+            self._load_pending_tables()
+        
+        # Update Firestore for recent incidents (last 7 days) through one bulk writer
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+        recent = [
+            incident for incident in batch
+            if datetime.fromisoformat(incident["timestamp"].replace('Z', '+00:00')) > recent_cutoff
+        ]
+        if not recent:
+            return
+        
+        # Area statistics are summed per area so each area document gets a single increment
+        area_totals = defaultdict(lambda: [0, 0])
+        bulk_writer = self.processor.firestore_client.bulk_writer()
+        for incident in recent:
+            bulk_writer.set(*self.processor._incident_document(incident), merge=True)
+            totals = area_totals[incident["area_category"]]
+            totals[0] += 1
+            totals[1] += incident.get("priority_score", 0)
+        for area_category, (incident_count, priority_sum) in area_totals.items():
+            bulk_writer.set(*self.processor._area_stats_update(area_category, incident_count, priority_sum), merge=True)
+        bulk_writer.close()
+    
+    def _bigquery_table(self, batch: List[Dict[str, Any]], all_embeddings: np.ndarray) -> pa.Table:
+        """Build a batch's BigQuery rows column by column, normalizing all embeddings at once"""
+        embeddings = np.asarray(all_embeddings, dtype=np.float64)
+        embeddings_256 = embeddings[:, :256] / np.linalg.norm(embeddings[:, :256], axis=1, keepdims=True)
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        
+        columns = {
+            name: [incident.get(name, BQ_COLUMN_DEFAULTS.get(name)) for incident in batch]
+            for name in self.arrow_schema.names
+        }
+        columns["coordinates"] = [incident_coordinates(incident) for incident in batch]
+        columns["h3_cell_r9"] = [h3.latlng_to_cell(lat, lon, 9) for lat, lon in columns["coordinates"]]
+        columns["timestamp"] = [
+            datetime.fromisoformat(timestamp.replace('Z', '+00:00')) for timestamp in columns["timestamp"]
+        ]
+        columns["embedding"] = self._list_array(np.round(embeddings, EMBEDDING_DECIMALS))
+        columns["embedding_256"] = self._list_array(np.round(embeddings_256, EMBEDDING_DECIMALS))
+        return pa.Table.from_pydict(columns, schema=self.arrow_schema)
+    
+    @staticmethod
+    def _list_array(matrix: np.ndarray) -> pa.ListArray:
+        """Wrap a 2D array as a list column without copying it row by row"""
+        rows, dim = matrix.shape
+        offsets = pa.array(np.arange(0, (rows + 1) * dim, dim, dtype=np.int32))
+        return pa.ListArray.from_arrays(offsets, pa.array(matrix.ravel()))
+    
+    def _load_pending_tables(self):
+        """Load the queued batches into both BigQuery tables as one Parquet file"""
+        if not self._pending_tables:
+            return
+        parquet_buffer = pa.BufferOutputStream()
+        pq.write_table(pa.concat_tables(self._pending_tables), parquet_buffer)
+        parquet_bytes = parquet_buffer.getvalue().to_pybytes()
+        row_count = self._pending_rows
+        self._pending_tables = []
+        self._pending_rows = 0
+        
+        futures = {
+            table_id: self.processor._bq_pool.submit(self._load_parquet, parquet_bytes, table_id)
+            for table_id in [self.processor.embeddings_table, self.processor.realtime_table]
+        }
+        wait(futures.values())
+        
+        table_errors = []
+        for table_id, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Error loading {row_count} rows into {table_id}: {e}")
+                table_errors.append(table_id)
+        if table_errors:
+            raise RuntimeError(f"BigQuery load failed for {', '.join(table_errors)}")
+        logger.info(f"Loaded {row_count} rows into BigQuery")
+    
+    def _load_parquet(self, parquet_bytes: bytes, table_id: str):
+        """Run one Parquet load job and wait for it to finish"""
+        job = self.processor.bq_client.load_table_from_file(
+            io.BytesIO(parquet_bytes), table_id, job_config=self.load_job_config
+        )
+        job.result()  # Wait for completion
 
 if __name__ == "__main__":
     import sys
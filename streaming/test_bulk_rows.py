@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the columnar BigQuery rows built by the bulk loader
+"""
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import h3
+import numpy as np
+from google.cloud import bigquery
+
+from realtime_processor import BulkDataLoader, arrow_schema
+
+SCHEMA_FILE = Path(__file__).resolve().parent.parent / "infra" / "embeddings_schema.json"
+
+# An incident as data_gen/generate.py writes it
+GENERATED_INCIDENT = {
+    "id": "INC_BLR_2025_000001",
+    "event_type": "traffic",
+    "sub_category": "accident",
+    "description": "Vehicle collision near MG Road junction",
+    "keywords": ["traffic", "accident", "mg road"],
+    "language": "en",
+    "coordinates": [12.9756, 77.6050],
+    "location_name": "MG Road",
+    "area_category": "central",
+    "ward_number": 111,
+    "pincode": "560001",
+    "timestamp": "2025-07-01T08:30:00Z",
+    "estimated_duration": 90,
+    "actual_duration": None,
+    "peak_hours": True,
+    "severity_level": "high",
+    "priority_score": 8.4,
+    "impact_radius": 2,
+    "source": "citizen_report",
+    "verified": 0.87,
+    "reporter_id": "RPT_482910",
+    "verification_count": 4,
+    "media_type": "image",
+    "media_url": "https://storage.googleapis.com/citypulse-media/traffic_1.jpg",
+    "event_status": "in_progress",
+    "assigned_department": "traffic_police",
+    "resolution_notes": None,
+    "weather_condition": "clear",
+    "traffic_density": "heavy"
+}
+
+def test_bigquery_table():
+    """Rows built for a generated incident have the table's types and values"""
+    bq_schema = [bigquery.SchemaField.from_api_repr(field) for field in json.loads(SCHEMA_FILE.read_text())]
+    loader = BulkDataLoader.__new__(BulkDataLoader)
+    loader.arrow_schema = arrow_schema(bq_schema)
+
+    embeddings = np.random.default_rng(0).standard_normal((1, 768)).astype(np.float32)
+    table = loader._bigquery_table([GENERATED_INCIDENT], embeddings)
+    assert table.schema.equals(loader.arrow_schema)
+
+    row = table.to_pylist()[0]
+    assert row["verified"] == 0.87
+    assert row["impact_radius"] == 2
+    assert row["timestamp"] == datetime(2025, 7, 1, 8, 30, tzinfo=timezone.utc)
+    assert row["coordinates"] == [12.9756, 77.6050]
+    assert row["h3_cell_r9"] == h3.latlng_to_cell(12.9756, 77.6050, 9)
+    assert row["actual_duration"] is None
+    assert len(row["embedding"]) == 768 and len(row["embedding_256"]) == 256
+    assert abs(np.linalg.norm(row["embedding"]) - 1) < 1e-5
+    assert abs(np.linalg.norm(row["embedding_256"]) - 1) < 1e-5
+
+if __name__ == "__main__":
+    test_bigquery_table()
+    print("🎉 All tests passed!")